@@ -0,0 +1,167 @@
+import os
+import json
+from typing import Dict, List, NamedTuple, Tuple
+
+from eth_utils import keccak, to_checksum_address
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+COMPILER_VERSION = "v0.8.20+commit.a1b79de6"
+
+IMPLEMENTATION_SLOT = 0x360894a13ba1a3210667c828492db98dca3e2076cc3735a920a3ca505d382bbc
+ADMIN_SLOT = 0xb53127684a568b3173ae13b9f8a6016e243e63b6e8ee1178d6a717850b5d6103
+
+# contracts of a synthetic protocol cycle through these kinds, like example/contracts.json mixes proxies and plain contracts
+KINDS = ["vault", "token", "proxy"]
+# plain tokens have no access control at all, used to measure the triage
+TRIAGE_KINDS = ["vault", "plain", "token", "plain", "proxy", "plain"]
+
+
+class Protocol(NamedTuple):
+    addresses: List[str]
+    # lowercase address -> getsourcecode result
+    sources: Dict[str, dict]
+    # lowercase address -> runtime code
+    code: Dict[str, str]
+    # (lowercase address, slot) -> value
+    storage: Dict[Tuple[str, int], int]
+    # (lowercase address, calldata) -> eth_call result, other calls revert
+    calls: Dict[Tuple[str, str], str]
+
+
+def make_address(label: str) -> str:
+    return to_checksum_address(keccak(text=label)[-20:])
+
+
+def _read(*path: str) -> str:
+    with open(os.path.join(FIXTURES_DIR, *path), "r") as file:
+        return file.read()
+
+
+def _single_file_source(file_name: str) -> str:
+    return _read(file_name)
+
+
+def _multi_file_source(directory: str) -> str:
+    # etherscan returns standard json input wrapped in an extra pair of braces
+    sources = {}
+    for root, _, files in os.walk(os.path.join(FIXTURES_DIR, directory)):
+        for file_name in sorted(files):
+            path = os.path.relpath(os.path.join(root, file_name), os.path.join(FIXTURES_DIR, directory))
+            sources[path] = {"content": _read(directory, path)}
+    standard_json = {
+        "language": "Solidity",
+        "sources": sources,
+        "settings": {
+            "optimizer": {"enabled": False, "runs": 200},
+            "outputSelection": {"*": {"*": ["*"]}},
+        },
+    }
+    return "{" + json.dumps(standard_json) + "}"
+
+
+def contract_info(contract_name: str, source_code: str, implementation: str = "") -> dict:
+    """getsourcecode result of a verified contract, as the explorer returns it."""
+    return {
+        "SourceCode": source_code,
+        "ABI": "[]",
+        "ContractName": contract_name,
+        "CompilerVersion": COMPILER_VERSION,
+        "OptimizationUsed": "0",
+        "Runs": "200",
+        "ConstructorArguments": "",
+        "EVMVersion": "Default",
+        "Library": "",
+        "LicenseType": "MIT",
+        "Proxy": "1" if implementation else "0",
+        "Implementation": implementation,
+        "SwarmSource": "",
+    }
+
+
+def _code(kind: str) -> str:
+    # same runtime code for every contract of a kind, like clones of a factory
+    return "0x608060405234801561001057600080fd5b50" + keccak(text=kind).hex()
+
+
+def _short_string(value: str) -> int:
+    # strings shorter than 32 bytes are stored with their length * 2 in the lowest byte
+    data = value.encode()
+    return int.from_bytes(data.ljust(31, b"\0") + bytes([len(data) * 2]), "big")
+
+
+def _word(value: int) -> str:
+    return value.to_bytes(32, "big").hex()
+
+
+def _owner_contracts(code: Dict[str, str], calls: Dict[Tuple[str, str], str]) -> Tuple[int, int]:
+    """
+    Owners as found in production: a 2/3 Safe owning the contracts, and a proxy admin (Ownable)
+    owned by a 2 day timelock, whose admin is the Safe. Returns the owner and the admin.
+    """
+    safe = make_address("benchmark-owner").lower()
+    signers = [make_address(f"benchmark-signer-{i}") for i in range(3)]
+    code[safe] = _code("safe")
+    calls[(safe, "0xe75235b8")] = "0x" + _word(2)
+    calls[(safe, "0xa0e67e2b")] = "0x" + _word(32) + _word(len(signers)) + "".join(_word(int(s, 16)) for s in signers)
+
+    timelock = make_address("benchmark-timelock").lower()
+    code[timelock] = _code("timelock")
+    calls[(timelock, "0x6a42b8f8")] = "0x" + _word(2 * 86400)
+    calls[(timelock, "0xf851a440")] = "0x" + _word(int(safe, 16))
+
+    admin = make_address("benchmark-admin").lower()
+    code[admin] = _code("proxy-admin")
+    calls[(admin, "0x8da5cb5b")] = "0x" + _word(int(timelock, 16))
+    return int(safe, 16), int(admin, 16)
+
+
+def synthetic_protocol(size: int, kinds: List[str] = KINDS) -> Protocol:
+    """A protocol of `size` contracts cycling through `kinds`, all proxies share one implementation."""
+    guardian = int(make_address("benchmark-guardian"), 16)
+    implementation = make_address("benchmark-implementation")
+
+    vault_source = _single_file_source("Vault.sol")
+    token_source = _single_file_source("MintableToken.sol")
+    proxy_source = _single_file_source("AdminUpgradeabilityProxy.sol")
+    plain_source = _single_file_source("PlainToken.sol")
+
+    addresses = []
+    sources = {implementation.lower(): contract_info("VaultV2", _multi_file_source("VaultV2"))}
+    code = {implementation.lower(): _code("implementation")}
+    storage = {}
+    calls = {}
+    owner, admin = _owner_contracts(code, calls)
+
+    for i in range(size):
+        kind = kinds[i % len(kinds)]
+        address = make_address(f"benchmark-{i}")
+        key = address.lower()
+        addresses.append(address)
+        code[key] = _code(kind)
+
+        if kind == "vault":
+            sources[key] = contract_info("Vault", vault_source)
+            storage[(key, 0)] = owner
+            storage[(key, 1)] = guardian
+            storage[(key, 2)] = 30
+        elif kind == "token":
+            sources[key] = contract_info("MintableToken", token_source)
+            storage[(key, 0)] = _short_string("Benchmark Token")
+            storage[(key, 1)] = _short_string("BENCH")
+            storage[(key, 2)] = owner
+            storage[(key, 5)] = 10 ** 24
+        elif kind == "plain":
+            sources[key] = contract_info("PlainToken", plain_source)
+            storage[(key, 0)] = _short_string("Plain Token")
+            storage[(key, 1)] = _short_string("PLAIN")
+            storage[(key, 2)] = 10 ** 24
+        else:
+            sources[key] = contract_info("AdminUpgradeabilityProxy", proxy_source, implementation)
+            storage[(key, IMPLEMENTATION_SLOT)] = int(implementation, 16)
+            storage[(key, ADMIN_SLOT)] = admin
+            # `_initialized` and `owner` of the implementation, packed
+            storage[(key, 0)] = (owner << 8) | 1
+            storage[(key, 2)] = 10 ** 21
+
+    return Protocol(addresses, sources, code, storage, calls)
@@ -0,0 +1,97 @@
+// SPDX-License-Identifier: MIT
+pragma solidity 0.8.20;
+
+contract AdminUpgradeabilityProxy {
+    // bytes32(uint256(keccak256("eip1967.proxy.implementation")) - 1)
+    bytes32 internal constant IMPLEMENTATION_SLOT = 0x360894a13ba1a3210667c828492db98dca3e2076cc3735a920a3ca505d382bbc;
+    // bytes32(uint256(keccak256("eip1967.proxy.admin")) - 1)
+    bytes32 internal constant ADMIN_SLOT = 0xb53127684a568b3173ae13b9f8a6016e243e63b6e8ee1178d6a717850b5d6103;
+
+    event Upgraded(address indexed implementation);
+    event AdminChanged(address previousAdmin, address newAdmin);
+
+    constructor(address implementation_, address admin_) {
+        _setImplementation(implementation_);
+        _setAdmin(admin_);
+    }
+
+    modifier ifAdmin() {
+        if (msg.sender == _admin()) {
+            _;
+        } else {
+            _fallback();
+        }
+    }
+
+    function admin() external ifAdmin returns (address) {
+        return _admin();
+    }
+
+    function implementation() external ifAdmin returns (address) {
+        return _implementation();
+    }
+
+    function upgradeTo(address newImplementation) external ifAdmin {
+        _setImplementation(newImplementation);
+        emit Upgraded(newImplementation);
+    }
+
+    function changeAdmin(address newAdmin) external ifAdmin {
+        require(newAdmin != address(0), "Proxy: new admin is the zero address");
+        emit AdminChanged(_admin(), newAdmin);
+        _setAdmin(newAdmin);
+    }
+
+    function _admin() internal view returns (address adm) {
+        bytes32 slot = ADMIN_SLOT;
+        assembly {
+            adm := sload(slot)
+        }
+    }
+
+    function _setAdmin(address newAdmin) internal {
+        bytes32 slot = ADMIN_SLOT;
+        assembly {
+            sstore(slot, newAdmin)
+        }
+    }
+
+    function _implementation() internal view returns (address impl) {
+        bytes32 slot = IMPLEMENTATION_SLOT;
+        assembly {
+            impl := sload(slot)
+        }
+    }
+
+    function _setImplementation(address newImplementation) internal {
+        require(newImplementation.code.length > 0, "Proxy: implementation is not a contract");
+        bytes32 slot = IMPLEMENTATION_SLOT;
+        assembly {
+            sstore(slot, newImplementation)
+        }
+    }
+
+    function _fallback() internal {
+        address impl = _implementation();
+        assembly {
+            calldatacopy(0, 0, calldatasize())
+            let result := delegatecall(gas(), impl, 0, calldatasize(), 0, 0)
+            returndatacopy(0, 0, returndatasize())
+            switch result
+            case 0 {
+                revert(0, returndatasize())
+            }
+            default {
+                return(0, returndatasize())
+            }
+        }
+    }
+
+    fallback() external payable {
+        _fallback();
+    }
+
+    receive() external payable {
+        _fallback();
+    }
+}
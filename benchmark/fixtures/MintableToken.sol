@@ -0,0 +1,47 @@
+// SPDX-License-Identifier: MIT
+pragma solidity 0.8.20;
+
+contract MintableToken {
+    string public name;
+    string public symbol;
+    address public owner;
+    mapping(address => bool) public minters;
+    mapping(address => uint256) public balanceOf;
+    uint256 public totalSupply;
+
+    event Transfer(address indexed from, address indexed to, uint256 value);
+
+    constructor(string memory name_, string memory symbol_) {
+        name = name_;
+        symbol = symbol_;
+        owner = msg.sender;
+    }
+
+    function _checkOwner() internal view {
+        require(msg.sender == owner, "MintableToken: caller is not the owner");
+    }
+
+    function transferOwnership(address newOwner) external {
+        _checkOwner();
+        owner = newOwner;
+    }
+
+    function setMinter(address minter, bool allowed) external {
+        _checkOwner();
+        minters[minter] = allowed;
+    }
+
+    function mint(address to, uint256 amount) external {
+        require(minters[msg.sender], "MintableToken: caller is not a minter");
+        balanceOf[to] += amount;
+        totalSupply += amount;
+        emit Transfer(address(0), to, amount);
+    }
+
+    function transfer(address to, uint256 amount) external returns (bool) {
+        balanceOf[msg.sender] -= amount;
+        balanceOf[to] += amount;
+        emit Transfer(msg.sender, to, amount);
+        return true;
+    }
+}
@@ -0,0 +1,61 @@
+// SPDX-License-Identifier: MIT
+pragma solidity 0.8.20;
+
+contract Ownable {
+    address public owner;
+
+    event OwnershipTransferred(address indexed previousOwner, address indexed newOwner);
+
+    constructor() {
+        owner = msg.sender;
+    }
+
+    modifier onlyOwner() {
+        require(msg.sender == owner, "Ownable: caller is not the owner");
+        _;
+    }
+
+    function transferOwnership(address newOwner) external onlyOwner {
+        emit OwnershipTransferred(owner, newOwner);
+        owner = newOwner;
+    }
+}
+
+contract Vault is Ownable {
+    address public guardian;
+    uint256 public fee;
+    bool public paused;
+    mapping(address => uint256) public balances;
+
+    modifier onlyGuardian() {
+        require(msg.sender == guardian || msg.sender == owner, "Vault: caller is not the guardian");
+        _;
+    }
+
+    function setFee(uint256 newFee) external onlyOwner {
+        fee = newFee;
+    }
+
+    function setGuardian(address newGuardian) external onlyOwner {
+        guardian = newGuardian;
+    }
+
+    function pause() external onlyGuardian {
+        paused = true;
+    }
+
+    function unpause() external onlyOwner {
+        paused = false;
+    }
+
+    function deposit() external payable {
+        require(!paused, "Vault: paused");
+        balances[msg.sender] += msg.value;
+    }
+
+    function withdraw(uint256 amount) external {
+        require(!paused, "Vault: paused");
+        balances[msg.sender] -= amount;
+        payable(msg.sender).transfer(amount);
+    }
+}
@@ -0,0 +1,12 @@
+// SPDX-License-Identifier: MIT
+pragma solidity 0.8.20;
+
+abstract contract Initializable {
+    bool private _initialized;
+
+    modifier initializer() {
+        require(!_initialized, "Initializable: already initialized");
+        _initialized = true;
+        _;
+    }
+}
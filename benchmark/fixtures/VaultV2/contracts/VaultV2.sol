@@ -0,0 +1,46 @@
+// SPDX-License-Identifier: MIT
+pragma solidity 0.8.20;
+
+import "./Initializable.sol";
+
+contract VaultV2 is Initializable {
+    // packed into slot 0 with `_initialized`
+    address public owner;
+    address public pendingOwner;
+    uint256 public withdrawalLimit;
+    mapping(address => uint256) public balances;
+
+    modifier onlyOwner() {
+        require(msg.sender == owner, "VaultV2: caller is not the owner");
+        _;
+    }
+
+    function initialize(address owner_, uint256 withdrawalLimit_) external initializer {
+        owner = owner_;
+        withdrawalLimit = withdrawalLimit_;
+    }
+
+    function setWithdrawalLimit(uint256 newLimit) external onlyOwner {
+        withdrawalLimit = newLimit;
+    }
+
+    function transferOwnership(address newOwner) external onlyOwner {
+        pendingOwner = newOwner;
+    }
+
+    function acceptOwnership() external {
+        require(msg.sender == pendingOwner, "VaultV2: caller is not the pending owner");
+        owner = pendingOwner;
+        pendingOwner = address(0);
+    }
+
+    function deposit() external payable {
+        balances[msg.sender] += msg.value;
+    }
+
+    function withdraw(uint256 amount) external {
+        require(amount <= withdrawalLimit, "VaultV2: above withdrawal limit");
+        balances[msg.sender] -= amount;
+        payable(msg.sender).transfer(amount);
+    }
+}
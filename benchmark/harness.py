@@ -0,0 +1,48 @@
+"""
+Runs main() of the scanner in the current directory and saves the stage timings it recorded.
+Started by run.py in a fresh process for every run: python harness.py <result.json> [scanner args...]
+"""
+import os
+import sys
+import json
+import time
+import resource
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+sys.path.insert(0, SRC_DIR)
+
+start = time.perf_counter()
+import main as scanner_main  # noqa: E402
+import instrumentation  # noqa: E402
+import_time = time.perf_counter() - start
+
+
+def main():
+    result_path = sys.argv[1]
+    sys.argv = ["main.py"] + sys.argv[2:]
+
+    start = time.perf_counter()
+    scanner_main.main()
+    total = time.perf_counter() - start
+
+    # ru_maxrss is in kilobytes on linux; children are the --jobs workers and solc
+    peak_rss = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    )
+    stages = {}
+    for group in instrumentation.summary():
+        name = group["name"] if group["cat"] == "stage" else f"{group['cat']}: {group['name']}"
+        stages[name] = {"calls": group["count"], "seconds": group["seconds"], "failed": group["failed"]}
+
+    with open(result_path, "w") as file:
+        json.dump({
+            "import": import_time,
+            "total": total,
+            "peak_rss_kb": peak_rss,
+            "stages": stages,
+        }, file, indent=4)
+
+
+if __name__ == "__main__":
+    main()
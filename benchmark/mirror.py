@@ -0,0 +1,77 @@
+"""
+Offline check of the installation of solc from a mirror: a temporary directory with the layout of
+binaries.soliditylang.org (`<platform>/list.json` and the binaries next to it) holds a fake binary listed with its
+sha256, one listed with a wrong sha256, and a version missing from the list. The compilers are installed into a
+temporary solc-select directory: only the first one must be installed, with the content of the mirror.
+
+    python benchmark/mirror.py
+"""
+import os
+import sys
+import json
+import shutil
+import hashlib
+import tempfile
+from typing import Dict
+
+from prettytable import PrettyTable
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from compilers import install_from_mirror, is_installed, provision_compilers, solc_path  # noqa: E402
+
+VALID, MISMATCH, MISSING = "0.8.20", "0.8.21", "0.8.22"
+
+
+def make_mirror(mirror: str, platform: str) -> Dict[str, bytes]:
+    """Mirror with a valid and a corrupted build; returns the binaries served for each version."""
+    binaries = {version: f"#!/bin/sh\necho solc {version}\n".encode() for version in [VALID, MISMATCH]}
+    builds = []
+    for version, binary in binaries.items():
+        sha256 = hashlib.sha256(binary if version == VALID else binary + b"corrupted").hexdigest()
+        builds.append({"path": f"solc-{platform}-v{version}+commit.00000000", "version": version, "sha256": "0x" + sha256})
+    os.makedirs(os.path.join(mirror, platform))
+    for build in builds:
+        with open(os.path.join(mirror, platform, build["path"]), "wb") as file:
+            file.write(binaries[build["version"]])
+    with open(os.path.join(mirror, platform, "list.json"), "w") as file:
+        json.dump({"builds": builds}, file)
+    return binaries
+
+
+def install_error(version: str, mirror: str) -> str:
+    try:
+        install_from_mirror(version, mirror)
+    except Exception as e:
+        return type(e).__name__
+    return "-"
+
+
+def main():
+    root = tempfile.mkdtemp(prefix="permission-scanner-mirror-")
+    # solc-select keeps its binaries under $VIRTUAL_ENV, so nothing is installed outside of the temporary directory
+    os.environ["VIRTUAL_ENV"] = os.path.join(root, "venv")
+    from solc_select.solc_select import soliditylang_platform
+
+    table = PrettyTable()
+    table.field_names = ["Build", "Version", "Error", "Installed", "Correct"]
+    try:
+        mirror = os.path.join(root, "mirror")
+        binaries = make_mirror(mirror, soliditylang_platform())
+        artifacts = os.path.dirname(os.path.dirname(solc_path(VALID)))
+
+        installed = provision_compilers([VALID, MISMATCH, MISSING], mirror)
+        with open(solc_path(VALID), "rb") as file:
+            valid = set(installed) == {VALID} and file.read() == binaries[VALID]
+        table.add_row(["sha256 matches", VALID, "-", is_installed(VALID), valid])
+
+        for build, version, expected in [("sha256 mismatch", MISMATCH, "ValueError"), ("not in list.json", MISSING, "LookupError")]:
+            error = install_error(version, mirror)
+            leftovers = [name for name in os.listdir(artifacts) if name != f"solc-{VALID}"]
+            table.add_row([build, version, error, is_installed(version), error == expected and not is_installed(version) and not leftovers])
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    print(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Offline benchmark of the AccessControl role enumeration: synthetic role logs of many contracts are served by the
+local JSON-RPC stub, with the block range and result limits of a hosted node. Reports the eth_getLogs requests and
+time of a first sync, of a sync after new blocks (from the persisted cursors), and checks the members found.
+
+    python benchmark/roles.py --contracts 50 --events 200 --max-log-range 100000
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import tempfile
+from argparse import ArgumentParser, Namespace
+from typing import Dict, List
+
+from prettytable import PrettyTable
+
+from fixtures import make_address
+from stubs import RpcStub
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from access_control import RoleCursors, read_roles, role_hash, ROLE_GRANTED, ROLE_REVOKED, DEFAULT_CHUNK_SIZE  # noqa: E402
+
+ROLES = ["DEFAULT_ADMIN_ROLE", "MINTER_ROLE", "PAUSER_ROLE", "UPGRADER_ROLE"]
+
+
+def init_benchmark_args() -> Namespace:
+    parser = ArgumentParser(description="Benchmark the role enumeration from logs against a local JSON-RPC stub")
+    parser.add_argument("--contracts", type=int, help="Number of AccessControl contracts", default=50)
+    parser.add_argument("--events", type=int, help="Role events per contract", default=200)
+    parser.add_argument("--blocks", type=int, help="Blocks of the first sync", default=20_000_000)
+    parser.add_argument("--new-blocks", type=int, help="Blocks added before the second sync", default=50_000)
+    parser.add_argument("--max-log-range", type=int, help="Maximum blocks per eth_getLogs request of the stub", default=None)
+    parser.add_argument("--max-logs", type=int, help="Maximum results per eth_getLogs request of the stub", default=10_000)
+    parser.add_argument("--chunk-size", type=int, help="Initial blocks per eth_getLogs request", default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--rpc-concurrency", type=int, help="eth_getLogs requests in flight", default=4)
+    parser.add_argument("--rpc-latency", type=float, help="Seconds added to every JSON-RPC response", default=0.0)
+    return parser.parse_args()
+
+
+def _topic(value: str) -> str:
+    return "0x" + value[2:].lower().rjust(64, "0")
+
+
+def role_logs(addresses: List[str], events: int, first_block: int, last_block: int, seed: int) -> List[dict]:
+    """Random grants and revokes of a few accounts per contract, spread over the blocks."""
+    rng = random.Random(seed)
+    accounts = [make_address(f"member-{i}") for i in range(8)]
+    sender = _topic(make_address("sender"))
+    logs = []
+    for address in addresses:
+        for block in sorted(rng.randint(first_block, last_block) for _ in range(events)):
+            event = ROLE_GRANTED if rng.random() < 0.7 else ROLE_REVOKED
+            logs.append({
+                "address": address.lower(),
+                "topics": [event, role_hash(rng.choice(ROLES)), _topic(rng.choice(accounts)), sender],
+                "data": "0x",
+                "blockNumber": hex(block),
+                "logIndex": hex(len(logs)),
+            })
+    return logs
+
+
+def expected_members(logs: List[dict]) -> Dict[str, Dict[str, set]]:
+    members: Dict[str, Dict[str, set]] = {}
+    for log in logs:
+        role_members = members.setdefault(log["address"], {}).setdefault(log["topics"][1], set())
+        account = "0x" + log["topics"][2][-40:]
+        if log["topics"][0] == ROLE_GRANTED:
+            role_members.add(account)
+        else:
+            role_members.discard(account)
+    return members
+
+
+def check(states: Dict[str, dict], logs: List[dict]) -> bool:
+    for address, roles in expected_members(logs).items():
+        found = {role: {m.lower() for m in members} for role, members in states[address]["members"].items()}
+        if found != {role: members for role, members in roles.items() if members}:
+            return False
+    return True
+
+
+def main():
+    args = init_benchmark_args()
+    addresses = [make_address(f"access-control-{i}") for i in range(args.contracts)]
+    rpc = RpcStub(args.rpc_latency, block=args.blocks).start()
+    rpc.max_log_range = args.max_log_range
+    rpc.max_logs = args.max_logs
+    rpc.logs = role_logs(addresses, args.events, 1, args.blocks, seed=1)
+
+    cursors_dir = tempfile.mkdtemp(prefix="permission-scanner-roles-")
+    cursors = RoleCursors(cursors_dir)
+    table = PrettyTable()
+    table.field_names = ["Sync", "Blocks", "Logs", "eth_getLogs requests", "Rejected requests", "Time (s)", "Members correct"]
+    try:
+        for sync in ["first", "new blocks"]:
+            if sync == "new blocks":
+                first_block = rpc.block + 1
+                rpc.block += args.new_blocks
+                rpc.logs += role_logs(addresses, max(1, args.events // 20), first_block, rpc.block, seed=2)
+            rpc.reset()
+            start = time.perf_counter()
+            states = read_roles(rpc.url, "mainnet", addresses, rpc.block, cursors, chunk_size=args.chunk_size, concurrency=args.rpc_concurrency)
+            seconds = time.perf_counter() - start
+            blocks = args.blocks if sync == "first" else args.new_blocks
+            table.add_row([sync, blocks, len(rpc.logs), rpc.calls["eth_getLogs"], rpc.rejected_logs, f"{seconds:.2f}", check(states, rpc.logs)])
+    finally:
+        rpc.stop()
+        shutil.rmtree(cursors_dir, ignore_errors=True)
+    print(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Offline benchmark of the scanner: runs the full pipeline of main() on synthetic protocols,
+against a local explorer stub and a local JSON-RPC stub, and reports per stage timings,
+peak RSS and the number of HTTP/RPC requests, and the startup time of every CLI command.
+
+    python benchmark/run.py --sizes 1 10 100
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import subprocess
+from argparse import ArgumentParser, Namespace
+from typing import List
+
+from prettytable import PrettyTable
+
+from fixtures import synthetic_protocol
+from stubs import ExplorerStub, RpcStub
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from checkpoint import DEFAULT_CHECKPOINT  # noqa: E402
+from cli import COMMANDS  # noqa: E402
+
+HARNESS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "harness.py")
+STARTUP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup.py")
+
+
+def init_benchmark_args() -> Namespace:
+    parser = ArgumentParser(description="Benchmark the scanner against local explorer and JSON-RPC stubs")
+    parser.add_argument("--sizes", type=int, nargs="+", help="Number of contracts of the synthetic protocols", default=[1, 10, 100])
+    parser.add_argument("--jobs", "-j", type=int, help="Worker processes of the scanner", default=1)
+    parser.add_argument("--warm", action="store_true", help="Run every size a second time with the cache of the first run")
+    parser.add_argument("--explorer-latency", type=float, help="Seconds added to every explorer response", default=0.0)
+    parser.add_argument("--rpc-latency", type=float, help="Seconds added to every JSON-RPC response", default=0.0)
+    parser.add_argument("--output", help="Write the raw results to this JSON file")
+    parser.add_argument("--keep", action="store_true", help="Keep the working directories of the runs")
+    parser.add_argument("--startup-runs", type=int, help="Measure the startup of every CLI command N times (best is reported), 0 to skip", default=3)
+    return parser.parse_known_args()
+
+
+def run_scanner(workdir: str, explorer: ExplorerStub, rpc: RpcStub, scanner_args: List[str]) -> dict:
+    explorer.reset()
+    rpc.reset()
+    env = dict(
+        os.environ,
+        ETHERSCAN_API_KEY="benchmark",
+        ETHERSCAN_API_URL=explorer.url + "api",
+        MAINNET_RPC=rpc.url,
+    )
+    result_path = os.path.join(workdir, "benchmark-result.json")
+    log_path = os.path.join(workdir, "scanner.log")
+    with open(log_path, "w") as log:
+        process = subprocess.run([sys.executable, HARNESS, result_path, *scanner_args], cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+    if process.returncode != 0:
+        with open(log_path, "r") as log:
+            print(log.read()[-4000:])
+        raise RuntimeError(f"Scanner failed with exit code {process.returncode}, see {log_path}")
+
+    with open(result_path, "r") as file:
+        result = json.load(file)
+    # a failed contract is fast to "scan", failures must show up next to the timings
+    with open(os.path.join(workdir, DEFAULT_CHECKPOINT), "r") as file:
+        records = [json.loads(line) for line in file if line.strip()]
+    result["scanned"] = sum(1 for r in records if r["name"] is not None)
+    result["failed"] = sum(1 for r in records if r["name"] is None)
+    result["explorer_requests"] = explorer.requests
+    result["rpc_requests"] = rpc.requests
+    result["rpc_calls"] = dict(rpc.calls)
+    return result
+
+
+def measure_startup(runs: int) -> dict:
+    """Best import time and process wall time of every command of the CLI, each in a fresh interpreter."""
+    startup = {}
+    for command in COMMANDS:
+        imports, totals = [], []
+        for _ in range(runs):
+            start = time.perf_counter()
+            output = subprocess.run([sys.executable, STARTUP, command], capture_output=True, text=True, check=True).stdout
+            totals.append(time.perf_counter() - start)
+            imports.append(json.loads(output)["import"])
+        startup[command] = {"import": min(imports), "process": min(totals)}
+    return startup
+
+
+def print_startup(startup: dict) -> None:
+    table = PrettyTable()
+    table.field_names = ["Command", "Import (s)", "Process (s)"]
+    table.align["Command"] = "l"
+    for command, s in startup.items():
+        table.add_row([command, f"{s['import']:.2f}", f"{s['process']:.2f}"])
+    print(table)
+
+
+def print_results(results: List[dict]) -> None:
+    table = PrettyTable()
+    table.field_names = ["Contracts", "Run", "Scanned", "Failed", "Total (s)", "Import (s)", "Peak RSS (MB)", "Explorer requests", "RPC requests", "RPC calls"]
+    for r in results:
+        table.add_row([
+            r["size"], r["run"], r["scanned"], r["failed"], f"{r['total']:.2f}", f"{r['import']:.2f}", f"{r['peak_rss_kb'] / 1024:.0f}",
+            r["explorer_requests"], r["rpc_requests"], sum(r["rpc_calls"].values())
+        ])
+    print(table)
+
+    stages = list(dict.fromkeys(stage for r in results for stage in r["stages"]))
+    table = PrettyTable()
+    table.field_names = ["Stage"] + [f"{r['size']} {r['run']}" for r in results]
+    table.align["Stage"] = "l"
+    for stage in stages:
+        row = [stage]
+        for r in results:
+            s = r["stages"].get(stage)
+            row.append(f"{s['seconds']:.2f}s / {s['calls']}" if s else "-")
+        table.add_row(row)
+    print(table)
+
+
+def main():
+    args, scanner_args = init_benchmark_args()
+    startup = measure_startup(args.startup_runs) if args.startup_runs > 0 else {}
+    explorer = ExplorerStub(args.explorer_latency).start()
+    rpc = RpcStub(args.rpc_latency).start()
+
+    results = []
+    try:
+        for size in args.sizes:
+            protocol = synthetic_protocol(size)
+            explorer.load(protocol)
+            rpc.load(protocol)
+
+            workdir = tempfile.mkdtemp(prefix=f"permission-scanner-benchmark-{size}-")
+            with open(os.path.join(workdir, "contracts.json"), "w") as file:
+                json.dump({"Chain_Name": "mainnet", "Project_Name": f"benchmark-{size}", "Contracts": protocol.addresses}, file, indent=4)
+            run_args = ["--cache-dir", os.path.join(workdir, "cache"), "--jobs", str(args.jobs), *scanner_args]
+
+            for run in ["cold", "warm"] if args.warm else ["cold"]:
+                print(f"Scanning {size} contracts ({run})")
+                result = run_scanner(workdir, explorer, rpc, run_args)
+                results.append({"size": size, "run": run, **result})
+
+            if not args.keep:
+                shutil.rmtree(workdir, ignore_errors=True)
+    finally:
+        explorer.stop()
+        rpc.stop()
+
+    if startup:
+        print_startup(startup)
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"startup": startup, "runs": results}, file, indent=4)
+
+
+if __name__ == "__main__":
+    main()
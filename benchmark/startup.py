@@ -0,0 +1,22 @@
+"""
+Measures the startup of one command of the CLI: the time to import everything the command needs.
+Started by run.py in a fresh process for every measurement: python startup.py <command>
+"""
+import os
+import sys
+import json
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+sys.path.insert(0, SRC_DIR)
+
+
+def main():
+    start = time.perf_counter()
+    import cli
+    cli.load_command(sys.argv[1])
+    print(json.dumps({"import": time.perf_counter() - start}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+import time
+import socket
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+from fixtures import Protocol
+
+
+class StubServer(ABC):
+    """
+    Local HTTP server running on its own event loop in a background thread, bound to a free port.
+    Counts requests, and can add a fixed `latency` to every response to simulate a remote service.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.requests = 0
+        self.latencies: List[float] = []
+        self.url: Optional[str] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[web.AppRunner] = None
+
+    @abstractmethod
+    def routes(self, app: web.Application) -> None:
+        ...
+
+    def reset(self) -> None:
+        self.requests = 0
+        self.latencies = []
+
+    def start(self) -> "StubServer":
+        ready = threading.Event()
+        self._loop = asyncio.new_event_loop()
+
+        def run() -> None:
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self._start())
+            ready.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self._runner.cleanup())
+
+        threading.Thread(target=run, daemon=True).start()
+        ready.wait()
+        return self
+
+    async def _start(self) -> None:
+        app = web.Application(middlewares=[self._count])
+        self.routes(app)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(("127.0.0.1", 0))
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.SockSite(self._runner, sock).start()
+        self.url = f"http://127.0.0.1:{sock.getsockname()[1]}/"
+
+    @web.middleware
+    async def _count(self, request: web.Request, handler):
+        start = time.perf_counter()
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        response = await handler(request)
+        self.latencies.append(time.perf_counter() - start)
+        return response
+
+    def stop(self) -> None:
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+class ExplorerStub(StubServer):
+    """Serves `getsourcecode` of the etherscan v2 api from the fixture sources."""
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__(latency)
+        self.sources: Dict[str, dict] = {}
+
+    def load(self, protocol: Protocol) -> None:
+        self.sources = protocol.sources
+
+    def routes(self, app: web.Application) -> None:
+        app.router.add_get("/", self.handle)
+        app.router.add_get("/api", self.handle)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        params = request.query
+        if params.get("module") != "contract" or params.get("action") != "getsourcecode":
+            return web.json_response({"status": "0", "message": "NOTOK", "result": "Error! Missing Or invalid Action name"})
+        contract_info = self.sources.get(params.get("address", "").lower())
+        if contract_info is None:
+            return web.json_response({"status": "1", "message": "OK", "result": [{"SourceCode": "", "ABI": "Contract source code not verified", "ContractName": "", "Proxy": "0", "Implementation": ""}]})
+        return web.json_response({"status": "1", "message": "OK", "result": [contract_info]})
+
+
+class RpcStub(StubServer):
+    """
+    JSON-RPC node serving the fixture code, storage and logs at a fixed block. Supports batch requests.
+    Slots with a `storage_history` of (block, value) changes are served at past blocks too, like an archive node.
+    Like hosted nodes, eth_getLogs can be limited to `max_log_range` blocks and `max_logs` results per request.
+    """
+
+    def __init__(self, latency: float = 0.0, block: int = 20_000_000):
+        super().__init__(latency)
+        self.block = block
+        self.code: Dict[str, str] = {}
+        self.storage: Dict[tuple, int] = {}
+        self.storage_history: Dict[tuple, List[tuple]] = {}
+        self.call_results: Dict[tuple, str] = {}
+        self.logs: List[dict] = []
+        self.max_log_range: Optional[int] = None
+        self.max_logs: Optional[int] = None
+        self.calls: Counter = Counter()
+        self.rejected_logs = 0
+
+    def load(self, protocol: Protocol) -> None:
+        self.code = protocol.code
+        self.storage = protocol.storage
+        self.call_results = protocol.calls
+
+    def reset(self) -> None:
+        super().reset()
+        self.calls = Counter()
+        self.rejected_logs = 0
+
+    def routes(self, app: web.Application) -> None:
+        app.router.add_post("/", self.handle)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        if isinstance(body, list):
+            return web.json_response([self._call(call) for call in body])
+        return web.json_response(self._call(body))
+
+    def _call(self, call: dict) -> dict:
+        method, params = call["method"], call.get("params", [])
+        self.calls[method] += 1
+        if method == "eth_blockNumber":
+            result = hex(self.block)
+        elif method == "eth_chainId":
+            result = hex(1)
+        elif method == "eth_getCode":
+            result = self.code.get(params[0].lower(), "0x")
+        elif method == "eth_getStorageAt":
+            result = "0x" + self._storage_at(params[0].lower(), int(params[1], 16), params[2] if len(params) > 2 else "latest").to_bytes(32, "big").hex()
+        elif method == "eth_call":
+            result = self.call_results.get((params[0]["to"].lower(), params[0].get("data", params[0].get("input"))))
+            if result is None:
+                return {"jsonrpc": "2.0", "id": call.get("id"), "error": {"code": 3, "message": "execution reverted"}}
+        elif method == "eth_getLogs":
+            result = self._get_logs(params[0])
+            if isinstance(result, str):
+                self.rejected_logs += 1
+                return {"jsonrpc": "2.0", "id": call.get("id"), "error": {"code": -32005, "message": result}}
+        else:
+            return {"jsonrpc": "2.0", "id": call.get("id"), "error": {"code": -32601, "message": f"Method {method} not supported by the stub"}}
+        return {"jsonrpc": "2.0", "id": call.get("id"), "result": result}
+
+    def _storage_at(self, address: str, slot: int, block: str) -> int:
+        history = self.storage_history.get((address, slot))
+        if history is None or block == "latest":
+            return self.storage.get((address, slot), 0)
+        value = 0
+        for changed_at, changed_to in history:
+            if changed_at > int(block, 16):
+                break
+            value = changed_to
+        return value
+
+    def _get_logs(self, log_filter: dict):
+        """Logs matching the filter, or the error message of a rejected request."""
+        start = int(log_filter.get("fromBlock", "0x0"), 16)
+        end = self.block if log_filter.get("toBlock", "latest") == "latest" else int(log_filter["toBlock"], 16)
+        if self.max_log_range is not None and end - start + 1 > self.max_log_range:
+            return f"block range is too wide, maximum is {self.max_log_range}"
+        addresses = log_filter.get("address", [])
+        addresses = {a.lower() for a in ([addresses] if isinstance(addresses, str) else addresses)}
+        topics = log_filter.get("topics", [])
+
+        def matches(log: dict) -> bool:
+            if addresses and log["address"].lower() not in addresses:
+                return False
+            for position, expected in enumerate(topics):
+                if expected is None:
+                    continue
+                expected = expected if isinstance(expected, list) else [expected]
+                if position >= len(log["topics"]) or log["topics"][position] not in expected:
+                    return False
+            return start <= int(log["blockNumber"], 16) <= end
+
+        found = [log for log in self.logs if matches(log)]
+        if self.max_logs is not None and len(found) > self.max_logs:
+            return f"query returned more than {self.max_logs} results"
+        return found
@@ -0,0 +1,77 @@
+"""
+Offline benchmark of the timeline: owner slots with a synthetic history of changes are served at past blocks by
+the local JSON-RPC stub. Reports the storage reads and rounds of the bisection, compared to reading every block,
+checks the change blocks found, and runs again to show the reuse of the cached probes.
+
+    python benchmark/timeline.py --slots 100 --changes 5 --blocks 20000000
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import tempfile
+from argparse import ArgumentParser, Namespace
+from typing import Dict, List, Tuple
+
+from prettytable import PrettyTable
+
+from fixtures import make_address
+from stubs import RpcStub
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from timeline import ProbeCache, SlotTimeline, DEFAULT_SAMPLES  # noqa: E402
+
+
+def init_benchmark_args() -> Namespace:
+    parser = ArgumentParser(description="Benchmark the timeline bisection against a local JSON-RPC stub")
+    parser.add_argument("--slots", type=int, help="Number of owner slots", default=100)
+    parser.add_argument("--changes", type=int, help="Maximum changes per slot", default=5)
+    parser.add_argument("--blocks", type=int, help="Blocks of the timeline", default=20_000_000)
+    parser.add_argument("--samples", type=int, help="Evenly spaced reads before the bisection", default=DEFAULT_SAMPLES)
+    parser.add_argument("--rpc-concurrency", type=int, help="JSON-RPC batch requests in flight", default=4)
+    parser.add_argument("--rpc-latency", type=float, help="Seconds added to every JSON-RPC response", default=0.0)
+    return parser.parse_args()
+
+
+def slot_histories(slots: int, changes: int, blocks: int, seed: int) -> Dict[Tuple[str, int], List[tuple]]:
+    """Owner slots set to a new owner at random blocks, never back to a previous one, so every change can be found."""
+    rng = random.Random(seed)
+    histories = {}
+    for i in range(slots):
+        address = make_address(f"owned-{i}").lower()
+        changed_at = sorted(rng.sample(range(1, blocks), rng.randint(0, changes)))
+        histories[(address, i % 3)] = [(block, int(make_address(f"owner-{i}-{n}"), 16)) for n, block in enumerate(changed_at)]
+    return histories
+
+
+def main():
+    args = init_benchmark_args()
+    histories = slot_histories(args.slots, args.changes, args.blocks, seed=1)
+    rpc = RpcStub(args.rpc_latency, block=args.blocks).start()
+    rpc.storage_history = histories
+    keys = list(histories)
+    expected = {key: [block for block, _ in history] for key, history in histories.items()}
+
+    cache_dir = tempfile.mkdtemp(prefix="permission-scanner-timeline-")
+    table = PrettyTable()
+    table.field_names = ["Run", "Slots", "Changes", "Storage reads", "Rounds", "RPC requests", "Reads block by block", "Time (s)", "Changes correct"]
+    try:
+        for run in ["cold", "cached"]:
+            rpc.reset()
+            timeline = SlotTimeline(rpc.url, ProbeCache(cache_dir, "mainnet"), concurrency=args.rpc_concurrency)
+            start = time.perf_counter()
+            found = timeline.changes(keys, 0, args.blocks, args.samples)
+            seconds = time.perf_counter() - start
+            table.add_row([
+                run, len(keys), sum(len(blocks) for blocks in expected.values()), timeline.reads, timeline.rounds, rpc.requests,
+                len(keys) * (args.blocks + 1), f"{seconds:.2f}", found == expected,
+            ])
+    finally:
+        rpc.stop()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    print(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark of the source level triage: scans a synthetic protocol where half of the contracts are plain tokens
+without access control, once with the full analysis of every contract and once with `--triage skip`.
+Reports the end-to-end speedup, and the recall of the triage: the permissioned functions of the full analysis
+which are still found, over everything written to permissions.json. This includes constructors calling a base
+constructor, which Slither lists as modifiers and the triage patterns do not look for.
+
+    python benchmark/triage.py --size 60
+"""
+import os
+import json
+import shutil
+import tempfile
+from argparse import ArgumentParser, Namespace
+from typing import Set, Tuple
+
+from prettytable import PrettyTable
+
+from fixtures import synthetic_protocol, TRIAGE_KINDS
+from stubs import ExplorerStub, RpcStub
+from run import run_scanner
+
+
+def init_benchmark_args() -> Namespace:
+    parser = ArgumentParser(description="Benchmark the triage against the full analysis of every contract")
+    parser.add_argument("--size", type=int, help="Number of contracts of the synthetic protocol", default=60)
+    parser.add_argument("--jobs", "-j", type=int, help="Worker processes of the scanner", default=1)
+    parser.add_argument("--keep", action="store_true", help="Keep the working directories of the runs")
+    return parser.parse_known_args()
+
+
+def permissioned_functions(permissions: dict) -> Set[Tuple[str, str, str]]:
+    """(contract, analysed contract, function) of every permissioned function in permissions.json."""
+    found = set()
+    for name, entries in permissions.items():
+        for key in ["proxy_permissions", "permissions"]:
+            if key in entries:
+                for function in entries[key]["Functions"]:
+                    found.add((name, entries[key]["Contract_Name"], function["Function"]))
+    return found
+
+
+def main():
+    args, scanner_args = init_benchmark_args()
+    protocol = synthetic_protocol(args.size, TRIAGE_KINDS)
+    explorer = ExplorerStub().start()
+    rpc = RpcStub().start()
+    explorer.load(protocol)
+    rpc.load(protocol)
+
+    runs = {}
+    try:
+        for triage in ["off", "skip"]:
+            # cold runs, every contract is fetched and compiled again
+            workdir = tempfile.mkdtemp(prefix=f"permission-scanner-triage-{triage}-")
+            with open(os.path.join(workdir, "contracts.json"), "w") as file:
+                json.dump({"Chain_Name": "mainnet", "Project_Name": f"triage-{triage}", "Contracts": protocol.addresses}, file, indent=4)
+            print(f"Scanning {args.size} contracts (triage {triage})")
+            result = run_scanner(workdir, explorer, rpc, ["--cache-dir", os.path.join(workdir, "cache"), "--jobs", str(args.jobs), "--triage", triage, *scanner_args])
+            with open(os.path.join(workdir, "permissions.json"), "r") as file:
+                result["functions"] = permissioned_functions(json.load(file))
+            if triage != "off":
+                with open(os.path.join(workdir, "triage.json"), "r") as file:
+                    result["skipped"] = sum(1 for d in json.load(file).values() if d["decision"] == "skip")
+            runs[triage] = result
+            if not args.keep:
+                shutil.rmtree(workdir, ignore_errors=True)
+    finally:
+        explorer.stop()
+        rpc.stop()
+
+    full, triaged = runs["off"], runs["skip"]
+    found = triaged["functions"] & full["functions"]
+    table = PrettyTable()
+    table.field_names = ["Run", "Contracts", "Skipped", "Permissioned functions", "Total (s)", "Compilation (s)", "Analysis (s)"]
+    for name, r in [("full analysis", full), ("triage skip", triaged)]:
+        stages = r["stages"]
+        table.add_row([
+            name, args.size, r.get("skipped", 0), len(r["functions"]), f"{r['total']:.2f}",
+            f"{stages.get('compile', {}).get('seconds', 0):.2f}", f"{stages.get('slither', {}).get('seconds', 0):.2f}",
+        ])
+    print(table)
+    recall = len(found) / len(full["functions"]) if full["functions"] else 1.0
+    print(f"Speedup {full['total'] / triaged['total']:.2f}x, recall {recall:.1%} ({len(found)} of {len(full['functions'])} permissioned functions)")
+    for missed in sorted(full["functions"] - triaged["functions"]):
+        print(f"\033[33mMissed by the triage: {'.'.join(missed)}\033[0m")
+
+
+if __name__ == "__main__":
+    main()
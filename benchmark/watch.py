@@ -0,0 +1,109 @@
+"""
+Offline check of the watcher: contracts with an owner, a fee and an EIP-1967 admin slot are served by the local
+JSON-RPC stub. The watcher sets its baseline, the owners, admins and fees of some contracts change at the next block,
+and the JSONL events written by the watcher must be the owner and admin changes, and nothing for the fees.
+
+    python benchmark/watch.py --contracts 100 --changes 10
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import shutil
+import tempfile
+from argparse import ArgumentParser, Namespace
+from typing import List, Tuple
+
+from prettytable import PrettyTable
+
+from fixtures import make_address
+from stubs import RpcStub
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+from watch import SlotWatcher, load_watch_slots  # noqa: E402
+
+ADMIN_SLOT = 0xb53127684a568b3173ae13b9f8a6016e243e63b6e8ee1178d6a717850b5d6103
+
+
+def init_benchmark_args() -> Namespace:
+    parser = ArgumentParser(description="Check the watcher against a local JSON-RPC stub")
+    parser.add_argument("--contracts", type=int, help="Number of watched contracts", default=100)
+    parser.add_argument("--changes", type=int, help="Contracts whose owner, admin and fee change", default=10)
+    parser.add_argument("--rpc-latency", type=float, help="Seconds added to every JSON-RPC response", default=0.0)
+    return parser.parse_args()
+
+
+def scan_results(contracts: int) -> Tuple[dict, dict]:
+    """Manifest and permissions.json of contracts with an `owner` checked against the caller and a `fee` that is not."""
+    manifest = {"Chain_Name": "mainnet", "Contracts": {}}
+    permissions = {}
+    for i in range(contracts):
+        address = make_address(f"watched-{i}")
+        name = f"Vault{i}"
+        manifest["Contracts"][address] = {"name": name, "storage": {"address": address, "slots": [
+            {"name": "owner", "slot": 0, "offset": 0, "size": 160, "type": "address"},
+            {"name": "fee", "slot": 1, "offset": 0, "size": 256, "type": "uint256"},
+        ]}}
+        permissions[name] = {"permissions": {"Functions": [
+            {"function": "setFee(uint256)", "state_variables_read": ["owner", "fee"], "msg.sender_variables": ["owner"]},
+            {"function": "upgradeTo(address)", "immutables_and_constants": [{"name": "ADMIN_SLOT", "slot": hex(ADMIN_SLOT)}],
+             "msg.sender_variables": ["ADMIN_SLOT"]},
+        ]}}
+    return manifest, permissions
+
+
+def set_storage(rpc: RpcStub, contracts: int, changed: int) -> List[tuple]:
+    """Owner, admin and fee of every contract, new ones for the first `changed`; returns the expected events."""
+    expected = []
+    for i in range(contracts):
+        address = make_address(f"watched-{i}").lower()
+        suffix = "-new" if i < changed else ""
+        owner, admin = make_address(f"owner-{i}{suffix}"), make_address(f"admin-{i}{suffix}")
+        rpc.storage[(address, 0)] = int(owner, 16)
+        rpc.storage[(address, ADMIN_SLOT)] = int(admin, 16)
+        rpc.storage[(address, 1)] = 30 + (i < changed)
+        if suffix:
+            expected += [(address, "owner", owner.lower()), (address, "ADMIN_SLOT", admin.lower())]
+    return sorted(expected)
+
+
+def main():
+    args = init_benchmark_args()
+    manifest, permissions = scan_results(args.contracts)
+    slots = load_watch_slots(manifest, permissions)
+    fees = sum(slot_info["name"] == "fee" for slot_info in slots)
+    rpc = RpcStub(args.rpc_latency).start()
+
+    output_dir = tempfile.mkdtemp(prefix="permission-scanner-watch-")
+    output_path = os.path.join(output_dir, "owner-changes.jsonl")
+    table = PrettyTable()
+    table.field_names = ["Contracts", "Variables watched", "Fees watched", "Changes", "Events", "RPC requests", "Time (s)", "Events correct"]
+    try:
+        with open(output_path, "a") as output:
+            def emit(event: dict) -> None:
+                output.write(json.dumps(event) + "\n")
+                output.flush()
+
+            watcher = SlotWatcher(rpc.url, slots, emit, interval=0)
+            set_storage(rpc, args.contracts, 0)
+            start = time.perf_counter()
+            asyncio.run(watcher.run(max_polls=1))
+            expected = set_storage(rpc, args.contracts, args.changes)
+            rpc.block += 1
+            asyncio.run(watcher.run(max_polls=1))
+            seconds = time.perf_counter() - start
+
+        with open(output_path) as file:
+            events = [json.loads(line) for line in file]
+        found = sorted((event["address"].lower(), event["name"], str(event["new"]).lower()) for event in events)
+        correct = found == expected and all(event["block"] == rpc.block for event in events)
+        table.add_row([args.contracts, len(slots), fees, len(expected), len(events), rpc.requests, f"{seconds:.2f}", correct])
+    finally:
+        rpc.stop()
+        shutil.rmtree(output_dir, ignore_errors=True)
+    print(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+Members of OpenZeppelin AccessControl roles. Role membership is a mapping, so it cannot be enumerated
+from storage: the members are rebuilt from the RoleGranted, RoleRevoked and RoleAdminChanged logs.
+"""
+import os
+import json
+import asyncio
+from typing import Dict, Iterable, List, Optional
+
+from eth_utils import keccak, to_checksum_address
+
+from owners import label
+from rpc import JsonRpcClient, RpcError, DEFAULT_BATCH_SIZE, DEFAULT_CONCURRENCY
+
+DEFAULT_CHUNK_SIZE = 100_000  # blocks per eth_getLogs request, adapted to what the node accepts
+MAX_CHUNK_SIZE = 10_000_000
+
+ROLE_GRANTED = "0x" + keccak(text="RoleGranted(bytes32,address,address)").hex()
+ROLE_REVOKED = "0x" + keccak(text="RoleRevoked(bytes32,address,address)").hex()
+ROLE_ADMIN_CHANGED = "0x" + keccak(text="RoleAdminChanged(bytes32,bytes32,bytes32)").hex()
+ROLE_TOPICS = [[ROLE_GRANTED, ROLE_REVOKED, ROLE_ADMIN_CHANGED]]
+
+DEFAULT_ADMIN_ROLE = "0x" + "00" * 32
+
+# roles of the OpenZeppelin contracts, other names are taken from the constants read by the permissioned functions
+KNOWN_ROLES = ["MINTER_ROLE", "BURNER_ROLE", "PAUSER_ROLE", "UPGRADER_ROLE", "PROPOSER_ROLE", "EXECUTOR_ROLE", "CANCELLER_ROLE", "TIMELOCK_ADMIN_ROLE"]
+
+ROLE_CHECKS = ["hasRole(", "_checkRole("]
+
+
+def uses_roles(temp_global: dict) -> bool:
+    """Whether a permissioned function of the contract is guarded by an AccessControl role."""
+    for key in ["proxy_permissions", "permissions"]:
+        if key not in temp_global:
+            continue
+        for functionData in temp_global[key]["Functions"]:
+            if any(modifier.startswith("onlyRole") for modifier in functionData["Modifiers"]):
+                return True
+            if any(check in condition for condition in functionData["msg.sender_conditions"] for check in ROLE_CHECKS):
+                return True
+    return False
+
+
+def role_hash(name: str) -> str:
+    return DEFAULT_ADMIN_ROLE if name == "DEFAULT_ADMIN_ROLE" else "0x" + keccak(text=name).hex()
+
+
+def _role_variables(functionData: dict) -> List[str]:
+    names = functionData.get("state_variables_read", []) + [c["name"] for c in functionData.get("immutables_and_constants", [])]
+    return [name for name in dict.fromkeys(names) if name.upper().endswith("ROLE")]
+
+
+def role_names(temp_global: dict) -> Dict[str, str]:
+    """Role hash -> name, for the known roles and the `*_ROLE` constants (keccak256 of their name, by convention) of the contract."""
+    names = {role_hash(name): name for name in ["DEFAULT_ADMIN_ROLE"] + KNOWN_ROLES}
+    for key in ["proxy_permissions", "permissions"]:
+        if key in temp_global:
+            for functionData in temp_global[key]["Functions"]:
+                names.update((role_hash(name), name) for name in _role_variables(functionData))
+    return names
+
+
+def new_role_state() -> dict:
+    """Roles of a contract: members and admin role of every role, synced up to `block`."""
+    return {"block": None, "members": {}, "admins": {}}
+
+
+def apply_role_logs(state: dict, logs: Iterable[dict]) -> None:
+    """Replay role logs of one contract, in chain order, on its role state."""
+    for log in logs:
+        topics = log["topics"]
+        if len(topics) < 3:
+            continue
+        event, role = topics[0], topics[1]
+        if event == ROLE_ADMIN_CHANGED and len(topics) == 4:
+            state["admins"][role] = topics[3]
+            continue
+        account = to_checksum_address("0x" + topics[2][-40:])
+        members = state["members"].setdefault(role, [])
+        if event == ROLE_GRANTED and account not in members:
+            members.append(account)
+        elif event == ROLE_REVOKED and account in members:
+            members.remove(account)
+            if not members:
+                del state["members"][role]
+
+
+class RoleCursors:
+    """
+    Role state of every contract synced so far, one JSON file per contract under `directory`/<chain>/.
+    The block of the state is the cursor: the next sync only fetches the logs after it.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, chain_name: str, address: str) -> str:
+        return os.path.join(self.directory, chain_name, f"{address.lower()}.json")
+
+    def get(self, chain_name: str, address: str) -> Optional[dict]:
+        try:
+            with open(self._path(chain_name, address), "r") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, chain_name: str, address: str, state: dict) -> None:
+        path = self._path(chain_name, address)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(state, file)
+        os.replace(tmp_path, path)
+
+
+class LogFetcher:
+    """
+    Fetches the logs of a block range with eth_getLogs, in chunks of `chunk_size` blocks with up to
+    `concurrency` chunks in flight. A chunk the node rejects (too many results, range too large) is split
+    in halves until it passes. The chunk size adapts for the next chunks: it is halved after a rejected chunk,
+    and doubled after an accepted one, but never back above half of a rejected size.
+    """
+
+    def __init__(self, client: JsonRpcClient, chunk_size: int = DEFAULT_CHUNK_SIZE, concurrency: int = DEFAULT_CONCURRENCY):
+        self.client = client
+        self.chunk_size = chunk_size
+        self.max_chunk_size = MAX_CHUNK_SIZE
+        self.concurrency = concurrency
+
+    async def fetch(self, addresses: List[str], topics: list, start: int, end: int) -> List[dict]:
+        """All logs of `addresses` matching `topics` from block `start` to `end` (inclusive), in chain order."""
+        logs = []
+        pending = set()
+        next_start = start
+        try:
+            while next_start <= end or pending:
+                while next_start <= end and len(pending) < self.concurrency:
+                    chunk_end = min(end, next_start + self.chunk_size - 1)
+                    pending.add(asyncio.ensure_future(self._fetch_chunk(addresses, topics, next_start, chunk_end)))
+                    next_start = chunk_end + 1
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    logs.extend(task.result())
+        finally:
+            for task in pending:
+                task.cancel()
+        return sorted(logs, key=lambda log: (int(log["blockNumber"], 16), int(log["logIndex"], 16)))
+
+    async def _fetch_chunk(self, addresses: List[str], topics: list, start: int, end: int) -> List[dict]:
+        log_filter = {"address": addresses, "topics": topics, "fromBlock": hex(start), "toBlock": hex(end)}
+        try:
+            logs = await self.client.call("eth_getLogs", [log_filter])
+            if not isinstance(logs, list):
+                raise RpcError(f"Unexpected eth_getLogs result {logs}")
+        except RpcError:
+            if start == end:
+                raise
+            size = end - start + 1
+            self.max_chunk_size = min(self.max_chunk_size, max(1, size // 2))
+            self.chunk_size = min(self.chunk_size, self.max_chunk_size)
+            middle = (start + end) // 2
+            left, right = await asyncio.gather(
+                self._fetch_chunk(addresses, topics, start, middle),
+                self._fetch_chunk(addresses, topics, middle + 1, end),
+            )
+            return left + right
+
+        self.chunk_size = min(self.chunk_size * 2, self.max_chunk_size)
+        return logs
+
+
+def read_roles(rpc_url: str, chain_name: str, addresses: List[str], block: int, cursors: RoleCursors, from_block: int = 0,
+               chunk_size: int = DEFAULT_CHUNK_SIZE, batch_size: int = DEFAULT_BATCH_SIZE, concurrency: int = DEFAULT_CONCURRENCY) -> Dict[str, dict]:
+    """
+    Role state of every address at `block`, keyed by lowercase address.
+    Each address continues from its cursor, addresses synced up to the same block share their eth_getLogs requests.
+    Addresses whose logs could not be fetched are left out, their cursor is kept.
+    """
+    states = {}
+    # first block to fetch -> addresses
+    groups: Dict[int, List[str]] = {}
+    for address in dict.fromkeys(a.lower() for a in addresses):
+        state = cursors.get(chain_name, address)
+        if state is None or state["block"] is None or state["block"] > block:
+            state = new_role_state()
+        states[address] = state
+        start = from_block if state["block"] is None else state["block"] + 1
+        groups.setdefault(start, []).append(address)
+
+    async def sync(fetcher: LogFetcher, start: int, group: List[str]) -> None:
+        try:
+            logs = await fetcher.fetch([to_checksum_address(a) for a in group], ROLE_TOPICS, start, block) if start <= block else []
+        except RpcError as e:
+            print(f"\033[33mFailed to fetch the role logs of {len(group)} contracts: {e}\033[0m")
+            for address in group:
+                del states[address]
+            return
+        by_address: Dict[str, List[dict]] = {}
+        for log in logs:
+            by_address.setdefault(log["address"].lower(), []).append(log)
+        for address in group:
+            apply_role_logs(states[address], by_address.get(address, []))
+            states[address]["block"] = block
+            cursors.put(chain_name, address, states[address])
+
+    async def run() -> None:
+        async with JsonRpcClient(rpc_url, batch_size, concurrency) as client:
+            fetcher = LogFetcher(client, chunk_size, concurrency)
+            await asyncio.gather(*[sync(fetcher, start, group) for start, group in groups.items()])
+
+    asyncio.run(run())
+    return states
+
+
+def role_addresses(scanned_contracts: Iterable[dict]) -> List[str]:
+    """Addresses of the scanned contracts using AccessControl, the proxy for proxies since it emits the logs."""
+    return [
+        scanned["address"] for scanned in scanned_contracts
+        if scanned["name"] is not None and uses_roles(scanned["permissions"])
+    ]
+
+
+def role_members(states: Dict[str, dict]) -> List[str]:
+    """All members of all roles, e.g. to classify them like owners."""
+    return list(dict.fromkeys(m for state in states.values() for members in state["members"].values() for m in members))
+
+
+def annotate_roles(temp_global: dict, state: dict, resolved: Optional[Dict[str, dict]] = None) -> None:
+    """
+    Add the role members of a contract to its permissions: `Roles` maps each role to its admin role and members,
+    and each function reading a role constant lists the members in `roles`, with their classification if `resolved`.
+    """
+    resolved = resolved or {}
+    names = role_names(temp_global)
+
+    def member(address: str) -> dict:
+        info = resolved.get(address.lower())
+        if info is None:
+            return {"address": address}
+        return {"address": address, "type": info["type"], "label": label(info)}
+
+    roles = {}
+    for role in dict.fromkeys(list(state["members"]) + list(state["admins"])):
+        admin = state["admins"].get(role, DEFAULT_ADMIN_ROLE)
+        roles[names.get(role, role)] = {"role": role, "admin": names.get(admin, admin), "members": state["members"].get(role, [])}
+    temp_global["Roles"] = roles
+    temp_global["Roles_Block_Number"] = state["block"]
+
+    for key in ["proxy_permissions", "permissions"]:
+        if key not in temp_global:
+            continue
+        for functionData in temp_global[key]["Functions"]:
+            function_roles = [
+                {"name": name, "members": [member(m) for m in state["members"].get(role_hash(name), [])]}
+                for name in _role_variables(functionData)
+            ]
+            if function_roles:
+                functionData["roles"] = function_roles
+
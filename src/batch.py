@@ -0,0 +1,231 @@
+import os
+import itertools
+from argparse import Namespace
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from parse import init_batch_args, DEFAULT_TRIAGE_REPORT
+from get_rpc_url import get_rpc_url, get_chain_id
+from etherscan import prefetch_targets, API_TIERS
+from cache import ScanCache, CompilationCache
+from compilers import required_versions, provision_compilers
+from scanner import group_by_code, scanned_for_address, read_storage_values, read_immutable_values
+from rpc import get_block_number
+from owners import OwnerResolver
+from checkpoint import CheckpointStore, DEFAULT_CHECKPOINT
+from incremental import get_onchain_state, DEFAULT_MANIFEST
+from instrumentation import stage, print_summary, write_trace
+from main import load_config_from_file, get_implementation, drop_upgraded_proxies, contract_infos_to_compile, triage_addresses, scan_all, read_scanned_roles, resolve_owners, write_results
+
+# environment variable holding the explorer api key of a project, set "Etherscan_Key_Env" in its config to use another key
+DEFAULT_KEY_ENV = "ETHERSCAN_API_KEY"
+
+
+def load_projects(paths: List[str]) -> List[dict]:
+    """Project configs (contracts.json format) from files, or from the *.json files of directories."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, f) for f in sorted(os.listdir(path)) if f.endswith(".json"))
+        else:
+            files.append(path)
+    return [load_config_from_file(f) for f in files]
+
+
+def init_project(config: dict, args: Namespace) -> Namespace:
+    """Everything a worker needs to scan a contract of this project, and its checkpoint in results/{Project_Name}."""
+    chain_name = config["Chain_Name"]
+    output_dir = os.path.join(args.results_dir, config["Project_Name"])
+    os.makedirs(output_dir, exist_ok=True)
+
+    key_env = config.get("Etherscan_Key_Env", DEFAULT_KEY_ENV)
+    platform_key = "" if args.offline else os.getenv(key_env)
+    if platform_key is None:
+        raise KeyError(f"Please set {key_env} in your .env for {config['Project_Name']}")
+
+    checkpoint_path = os.path.join(output_dir, DEFAULT_CHECKPOINT)
+    checkpoint = CheckpointStore(checkpoint_path, resume=args.resume)
+    completed = checkpoint.completed() if args.resume else set()
+    if completed:
+        print(f"Resuming {config['Project_Name']} from {checkpoint_path}, {len(completed)} contracts already scanned")
+
+    return Namespace(
+        project_name=config["Project_Name"],
+        chain_name=chain_name,
+        chain_id=get_chain_id(chain_name),
+        rpc_url=get_rpc_url(chain_name),
+        platform_key=platform_key,
+        addresses=config["Contracts"],
+        pending=[a for a in config["Contracts"] if a not in completed],
+        output_dir=output_dir,
+        checkpoint=checkpoint,
+    )
+
+
+def _worker_project(project: Namespace) -> Namespace:
+    # only the fields used by scan_contract are sent to the worker processes
+    return Namespace(
+        project_name=project.project_name,
+        chain_name=project.chain_name,
+        chain_id=project.chain_id,
+        rpc_url=project.rpc_url,
+        platform_key=project.platform_key,
+    )
+
+
+def prefetch_projects(projects: List[Namespace], cache: ScanCache, calls_per_second: float) -> None:
+    """
+    Fetch the pending contracts of all projects into the cache, with one client per explorer key.
+    Each key is limited to the rate of its tier, clients of different keys run side by side.
+    """
+    # an address shared by projects is fetched once per key, dicts keep the targets in order without duplicates
+    targets_by_key: Dict[str, Dict[Tuple[int, str], None]] = {}
+    for project in projects:
+        targets = targets_by_key.setdefault(project.platform_key, {})
+        targets.update(dict.fromkeys((project.chain_id, a) for a in project.pending))
+
+    with ThreadPoolExecutor(max_workers=max(1, len(targets_by_key))) as executor:
+        futures = [executor.submit(prefetch_targets, list(targets), key, cache, calls_per_second) for key, targets in targets_by_key.items()]
+    failed = {}
+    for future in futures:
+        failed.update(future.result())
+
+    for project in projects:
+        for contract_address in project.pending:
+            e = failed.get((project.chain_id, contract_address))
+            if e is not None:
+                print(f"\033[33mFailed to fetch contract at {contract_address} of {project.project_name} from the explorer, skipping it: {e}\033[0m")
+        project.pending = [a for a in project.pending if (project.chain_id, a) not in failed]
+
+
+def chain_concurrency(args: Namespace, chain_name: str) -> int:
+    return args.chain_rpc_concurrency.get(chain_name, args.rpc_concurrency)
+
+
+def read_chain_state(chain_name: str, projects: List[Namespace], args: Namespace) -> Tuple[int, Dict[str, dict]]:
+    """Block and on-chain state of every address of the projects on one chain, read at once."""
+    rpc_url = projects[0].rpc_url
+    addresses = list(dict.fromkeys(a for project in projects for a in project.addresses))
+    with stage("onchain state", chain=chain_name):
+        block = get_block_number(rpc_url)
+        state = get_onchain_state(rpc_url, addresses, block, args.rpc_batch_size, chain_concurrency(args, chain_name))
+    return block, state
+
+
+def read_chain_storage(chain_name: str, projects: List[Namespace], block: int, args: Namespace) -> Tuple[dict, dict, dict, OwnerResolver]:
+    """Storage values, immutables, role members and owners of all projects on one chain, with deduplicated batches and one owner resolver."""
+    rpc_url = projects[0].rpc_url
+    concurrency = chain_concurrency(args, chain_name)
+
+    def scanned_contracts():
+        return itertools.chain.from_iterable(p.checkpoint.iter_in_order(p.addresses) for p in projects)
+
+    with stage("read storage", chain=chain_name):
+        values = read_storage_values(scanned_contracts(), rpc_url, block, args.rpc_batch_size, concurrency)
+    with stage("read immutables", chain=chain_name):
+        immutable_values = read_immutable_values(scanned_contracts(), rpc_url, block, args.rpc_batch_size, concurrency)
+    roles = read_scanned_roles(args, chain_name, rpc_url, scanned_contracts(), block, concurrency)
+    resolver = OwnerResolver(rpc_url, block, args.owner_depth, args.rpc_batch_size, concurrency)
+    resolve_owners(resolver, scanned_contracts(), values, immutable_values, roles)
+    return values, immutable_values, roles, resolver
+
+
+def main(argv: Optional[List[str]] = None):
+    load_dotenv()  # Load environment variables from .env file
+    args = init_batch_args(argv)
+
+    # one cache, compilation cache and set of compilers for all projects
+    cache = ScanCache(
+        args.cache_dir,
+        ttl=args.cache_ttl,
+        metadata_ttl=args.cache_metadata_ttl,
+        max_size=args.cache_max_size * 1024 * 1024,
+        offline=args.offline
+    )
+    compilation_cache = None
+    if not args.no_compilation_cache:
+        compilation_cache = CompilationCache(os.path.join(args.cache_dir, "compilations"))
+
+    projects = [init_project(config, args) for config in load_projects(args.projects)]
+    if args.invalidate_cache:
+        for chain_id in {p.chain_id for p in projects}:
+            cache.invalidate(chainid=chain_id)
+    chains: Dict[str, List[Namespace]] = {}
+    for project in projects:
+        chains.setdefault(project.chain_name, []).append(project)
+    if not projects:
+        print(f"\033[33mNo project configs found in {', '.join(args.projects)}\033[0m")
+        return
+    print(f"Scanning {len(projects)} projects on {len(chains)} chains")
+
+    # the chains are read side by side, each with its own limit of requests in flight
+    with ThreadPoolExecutor(max_workers=len(chains)) as executor:
+        chain_states = dict(zip(chains, executor.map(lambda c: read_chain_state(c, chains[c], args), chains)))
+
+    for project in projects:
+        drop_upgraded_proxies(cache, project.chain_id, project.pending, chain_states[project.chain_name][1])
+    with stage("prefetch sources"):
+        prefetch_projects(projects, cache, API_TIERS[args.etherscan_tier])
+
+    for project in projects:
+        report_path = os.path.join(project.output_dir, DEFAULT_TRIAGE_REPORT)
+        project.pending = triage_addresses(args, cache, project.chain_id, project.pending, project.checkpoint, report_path)
+
+    # addresses with the same code on a chain are analysed once, also across projects,
+    # all contracts of all projects go through one pool of workers
+    tasks: List[Tuple[str, Namespace]] = []
+    members: Dict[Tuple[str, str], List[Tuple[str, Namespace]]] = {}
+    for chain_name, chain_projects in chains.items():
+        chain_id = chain_projects[0].chain_id
+        pending = list(dict.fromkeys(a for p in chain_projects for a in p.pending))
+        owners: Dict[str, List[Namespace]] = {}
+        for project in chain_projects:
+            for address in project.pending:
+                owners.setdefault(address, []).append(project)
+
+        _, state = chain_states[chain_name]
+        groups = group_by_code(pending, state, {a: get_implementation(cache, chain_id, a) for a in pending})
+        for representative, addresses in groups.items():
+            tasks.append((representative, _worker_project(owners[representative][0])))
+            members[(chain_name, representative)] = [(a, p) for a in addresses for p in owners[a]]
+    pending_count = sum(len(p.pending) for p in projects)
+    if len(tasks) < pending_count:
+        print(f"{len(tasks)} unique contracts to analyse for {pending_count} addresses")
+
+    # only the contracts which are analysed need a compiler
+    with stage("solc provisioning"):
+        contract_infos = [
+            contract_info
+            for representative, project in tasks
+            for contract_info in contract_infos_to_compile(cache, project.chain_id, [representative], compilation_cache, args.crytic_args)
+        ]
+        solc_binaries = provision_compilers(required_versions(contract_infos), args.solc_mirror)
+
+    def save(task: Tuple[str, Namespace], scanned: dict) -> None:
+        contract_address, project = task
+        for address, member in members[(project.chain_name, contract_address)]:
+            member.checkpoint.append(address, scanned if address == contract_address else scanned_for_address(scanned, address))
+
+    settings = Namespace(**vars(args), solc_binaries=solc_binaries)
+    scan_all(tasks, settings, save)
+
+    with ThreadPoolExecutor(max_workers=len(chains)) as executor:
+        chain_values = dict(zip(chains, executor.map(lambda c: read_chain_storage(c, chains[c], chain_states[c][0], args), chains)))
+
+    for chain_name, chain_projects in chains.items():
+        block, state = chain_states[chain_name]
+        values, immutable_values, roles, resolver = chain_values[chain_name]
+        for project in chain_projects:
+            write_results(project.output_dir, chain_name, project.addresses, project.checkpoint, values, immutable_values, block, state, resolver,
+                          os.path.join(project.output_dir, DEFAULT_MANIFEST), report_formats=args.report_format, roles=roles)
+            print(f"Wrote the results of {project.project_name} to {project.output_dir}")
+
+    print_summary()
+    if args.trace:
+        write_trace(args.trace)
+
+
+if __name__ == "__main__":
+    main()
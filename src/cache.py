@@ -0,0 +1,268 @@
+import os
+import json
+import time
+import hashlib
+from importlib import metadata
+from typing import Iterable, Optional, Sequence
+
+DEFAULT_CACHE_DIR = ".cache/permission-scanner"
+DEFAULT_MAX_SIZE = 512 * 1024 * 1024  # bytes
+# the implementation of a proxy changes with every upgrade, its metadata is fetched again more often than the sources
+DEFAULT_METADATA_TTL = 24 * 3600  # seconds
+
+# The explorer's getsourcecode result is split in three parts,
+# so that e.g. many proxies pointing to the same implementation share one source blob
+METADATA_FIELDS = ["ContractName", "Proxy", "Implementation"]
+SETTINGS_FIELDS = ["CompilerVersion", "OptimizationUsed", "Runs", "EVMVersion", "Library", "LicenseType", "SwarmSource"]
+SOURCE_FIELDS = ["SourceCode", "ABI", "ConstructorArguments"]
+
+KINDS = {
+    "metadata": METADATA_FIELDS,
+    "settings": SETTINGS_FIELDS,
+    "source": SOURCE_FIELDS,
+}
+
+# what goes into a compilation, besides the compiler settings
+COMPILATION_FIELDS = ["ContractName", "SourceCode"]
+
+# packages writing and reading the cached artifacts, an artifact of another version may not load the same way
+TOOLCHAIN_PACKAGES = ["crytic-compile", "slither-analyzer"]
+
+
+class ScanCache:
+    """
+    Content-addressed on-disk cache for explorer data.
+
+    Blobs are stored once under objects/<sha256>, entries under
+    entries/<chainid>/<address>/<kind>.json only point to a blob.
+    The mtime of an entry file is its last access, used for LRU eviction.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, ttl: Optional[float] = None, max_size: int = DEFAULT_MAX_SIZE, offline: bool = False,
+                 metadata_ttl: Optional[float] = DEFAULT_METADATA_TTL):
+        self.directory = directory
+        self.ttl = ttl
+        self.metadata_ttl = metadata_ttl
+        self.max_size = max_size
+        self.offline = offline
+
+    def _entry_path(self, chainid: int, address: str, kind: str) -> str:
+        return os.path.join(self.directory, "entries", str(chainid), address.lower(), f"{kind}.json")
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.directory, "objects", digest[:2], digest)
+
+    def _is_fresh(self, stored_at: float, kind: str) -> bool:
+        # offline runs replay whatever is in the cache, regardless of its age
+        if self.offline:
+            return True
+        ttls = [t for t in [self.ttl, self.metadata_ttl if kind == "metadata" else None] if t is not None]
+        return not ttls or time.time() - stored_at <= min(ttls)
+
+    def get(self, chainid: int, address: str, kind: str) -> Optional[dict]:
+        entry_path = self._entry_path(chainid, address, kind)
+        try:
+            with open(entry_path, "r") as file:
+                entry = json.load(file)
+            if not self._is_fresh(entry["stored_at"], kind):
+                return None
+            with open(self._object_path(entry["digest"]), "r") as file:
+                value = json.load(file)
+        except (OSError, ValueError, KeyError):
+            return None
+
+        # mark as recently used
+        os.utime(entry_path)
+        return value
+
+    def put(self, chainid: int, address: str, kind: str, value: dict) -> str:
+        blob = json.dumps(value, sort_keys=True).encode()
+        digest = hashlib.sha256(blob).hexdigest()
+
+        object_path = self._object_path(digest)
+        if not os.path.exists(object_path):
+            _atomic_write(object_path, blob)
+
+        entry = {"digest": digest, "stored_at": time.time()}
+        _atomic_write(self._entry_path(chainid, address, kind), json.dumps(entry).encode())
+        return digest
+
+    def get_contract(self, chainid: int, address: str) -> Optional[dict]:
+        """Reassemble a cached getsourcecode result, or None if any part is missing or stale."""
+        contract_info = {}
+        for kind in KINDS:
+            value = self.get(chainid, address, kind)
+            if value is None:
+                return None
+            contract_info.update(value)
+        return contract_info
+
+    def put_contract(self, chainid: int, address: str, contract_info: dict) -> None:
+        """Store a getsourcecode result, call `evict` once after a series of puts to bound the cache."""
+        for kind, fields in KINDS.items():
+            self.put(chainid, address, kind, {f: contract_info.get(f) for f in fields})
+
+    def invalidate(self, chainid: Optional[int] = None, address: Optional[str] = None) -> None:
+        """Drop cached entries, for one address, one chain or everything."""
+        for entry_path in self._entry_paths():
+            parts = entry_path.split(os.sep)
+            entry_chainid, entry_address = parts[-3], parts[-2]
+            if chainid is not None and entry_chainid != str(chainid):
+                continue
+            if address is not None and entry_address != address.lower():
+                continue
+            _remove(entry_path)
+        self._collect_garbage()
+
+    def invalidate_addresses(self, chainid: int, addresses: Iterable[str]) -> None:
+        """Drop the cached entries of some addresses of a chain, without walking the entries of the others."""
+        for address in addresses:
+            for kind in KINDS:
+                _remove(self._entry_path(chainid, address, kind))
+        self._collect_garbage()
+
+    def evict(self) -> None:
+        """Drop the least recently used entries until the referenced objects fit in max_size."""
+        sizes = {os.path.basename(p): os.path.getsize(p) for p in self._object_paths()}
+        if sum(sizes.values()) <= self.max_size:
+            return
+
+        # digest -> number of entries pointing to it
+        entries = []
+        references = {}
+        for entry_path in self._entry_paths():
+            digest = _read_digest(entry_path)
+            entries.append((os.path.getmtime(entry_path), entry_path, digest))
+            references[digest] = references.get(digest, 0) + 1
+
+        total = sum(sizes.get(d, 0) for d in references)
+        for _, entry_path, digest in sorted(entries):
+            if total <= self.max_size:
+                break
+            _remove(entry_path)
+            references[digest] -= 1
+            if references[digest] == 0:
+                total -= sizes.get(digest, 0)
+
+        self._collect_garbage()
+
+    def _entry_paths(self):
+        for root, _, files in os.walk(os.path.join(self.directory, "entries")):
+            for name in files:
+                if name.endswith(".json"):
+                    yield os.path.join(root, name)
+
+    def _object_paths(self):
+        for root, _, files in os.walk(os.path.join(self.directory, "objects")):
+            for name in files:
+                if not name.endswith(".tmp"):
+                    yield os.path.join(root, name)
+
+    def _collect_garbage(self) -> None:
+        referenced = {_read_digest(p) for p in self._entry_paths()}
+        for object_path in list(self._object_paths()):
+            if os.path.basename(object_path) not in referenced:
+                _remove(object_path)
+
+
+_toolchain_versions: Optional[dict] = None
+
+
+def toolchain(crytic_args: Sequence[str] = ()) -> dict:
+    """Versions of crytic-compile and Slither, and the crytic-compile flags (remappings, --solc, ...) of a run."""
+    global _toolchain_versions
+    if _toolchain_versions is None:
+        _toolchain_versions = {}
+        for package in TOOLCHAIN_PACKAGES:
+            try:
+                _toolchain_versions[package] = metadata.version(package)
+            except metadata.PackageNotFoundError:
+                _toolchain_versions[package] = None
+    return {"versions": _toolchain_versions, "crytic_args": list(crytic_args)}
+
+
+def compilation_key(contract_info: dict, toolchain_info: Optional[dict] = None) -> str:
+    """
+    Hash of the source files and compiler settings of a getsourcecode result,
+    and of the `toolchain` compiling it if given (the key of the compilation cache).
+    """
+    compilation_input = {f: contract_info.get(f) for f in COMPILATION_FIELDS + SETTINGS_FIELDS}
+    if toolchain_info is not None:
+        compilation_input["toolchain"] = toolchain_info
+    return hashlib.sha256(json.dumps(compilation_input, sort_keys=True).encode()).hexdigest()
+
+
+class CompilationCache:
+    """
+    Compiled artifacts (crytic-compile standard export), one file per key under `directory`.
+    Same LRU policy as ScanCache: the mtime of a file is its last access.
+    """
+
+    def __init__(self, directory: str, max_size: int = DEFAULT_MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}_export.json")
+
+    def _immutables_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}_immutables.json")
+
+    def get(self, key: str) -> Optional[str]:
+        """Path of the cached artifact, or None."""
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        os.utime(path)
+        return path
+
+    def get_immutables(self, key: str) -> Optional[dict]:
+        """Immutable references stored next to the artifact, None for artifacts cached without them."""
+        path = self._immutables_path(key)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as file:
+            return json.load(file)
+
+    def put(self, key: str, artifact: dict, immutables: Optional[dict] = None) -> str:
+        if immutables is not None:
+            # written first, an artifact is only used together with its immutable references
+            _atomic_write(self._immutables_path(key), json.dumps(immutables).encode())
+        path = self._path(key)
+        _atomic_write(path, json.dumps(artifact).encode())
+        self.evict()
+        return path
+
+    def evict(self) -> None:
+        artifacts = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith("_export.json")]
+        total = sum(os.path.getsize(p) for p in artifacts)
+        for path in sorted(artifacts, key=os.path.getmtime):
+            if total <= self.max_size:
+                break
+            total -= os.path.getsize(path)
+            _remove(path)
+            _remove(path[:-len("_export.json")] + "_immutables.json")
+
+
+def _read_digest(entry_path: str) -> Optional[str]:
+    try:
+        with open(entry_path, "r") as file:
+            return json.load(file)["digest"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _remove(path: str) -> None:
+    # another scanner process may have evicted it already
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(data)
+    os.replace(tmp_path, path)
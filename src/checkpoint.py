@@ -0,0 +1,93 @@
+import os
+import json
+from typing import Dict, Iterator, List, Tuple
+
+DEFAULT_CHECKPOINT = "permissions.checkpoint.jsonl"
+
+
+class CheckpointStore:
+    """
+    Append-only JSONL file with one line per scanned contract, written as soon as the contract is done.
+    Readers stream it line by line, so memory does not grow with the number of contracts.
+    """
+
+    def __init__(self, path: str = DEFAULT_CHECKPOINT, resume: bool = False):
+        self.path = path
+        if not resume and os.path.exists(path):
+            os.remove(path)
+        if resume and os.path.exists(path):
+            self._drop_partial_line()
+
+    def _drop_partial_line(self) -> None:
+        # a crash while writing can leave the last line incomplete, new lines must not be appended to it
+        with open(self.path, "rb+") as file:
+            size = file.seek(0, os.SEEK_END)
+            end = size
+            while end > 0:
+                start = max(0, end - 4096)
+                file.seek(start)
+                chunk = file.read(end - start)
+                if end == size and chunk.endswith(b"\n"):
+                    return
+                newline = chunk.rfind(b"\n")
+                if newline != -1:
+                    file.truncate(start + newline + 1)
+                    return
+                end = start
+            file.truncate(0)
+
+    def append(self, address: str, scanned: dict) -> None:
+        with open(self.path, "a") as file:
+            file.write(json.dumps({"address": address, **scanned}) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+    def completed(self) -> set:
+        """Addresses which were scanned successfully, failed contracts are scanned again on resume."""
+        return {record["address"] for record in self if record["name"] is not None}
+
+    def __iter__(self) -> Iterator[dict]:
+        for _, record in self._records():
+            yield record
+
+    def _records(self) -> Iterator[Tuple[int, dict]]:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r") as file:
+            while True:
+                offset = file.tell()
+                line = file.readline()
+                if not line:
+                    break
+                try:
+                    yield offset, json.loads(line)
+                except ValueError:
+                    # line cut off by a crash while writing
+                    continue
+
+    def iter_in_order(self, addresses: List[str]) -> Iterator[dict]:
+        """Stream the latest record of every address, in the order of `addresses`."""
+        offsets: Dict[str, int] = {}
+        for offset, record in self._records():
+            offsets[record["address"]] = offset
+        if not offsets:
+            return
+
+        with open(self.path, "r") as file:
+            for address in addresses:
+                if address not in offsets:
+                    continue
+                file.seek(offsets[address])
+                yield json.loads(file.readline())
+
+
+def write_json_object(file, items: Iterator[Tuple[str, dict]]) -> None:
+    """Write (key, value) pairs as one JSON object, formatted like json.dump(..., indent=4), without building the dict."""
+    file.write("{")
+    empty = True
+    for key, value in items:
+        file.write("\n" if empty else ",\n")
+        value_json = json.dumps(value, indent=4).replace("\n", "\n    ")
+        file.write(f"    {json.dumps(key)}: {value_json}")
+        empty = False
+    file.write("}" if empty else "\n}")
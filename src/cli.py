@@ -0,0 +1,43 @@
+"""
+Command line of the permission scanner: python src/cli.py <command> [args...]
+Only the module of the chosen command is imported, so light commands (e.g. report) start fast.
+"""
+import sys
+import importlib
+from argparse import ArgumentParser, RawDescriptionHelpFormatter
+from typing import Callable, List, Optional
+
+# command -> (module, function taking argv, help)
+COMMANDS = {
+    "fetch": ("main", "fetch_main", "Download the verified sources into the cache and install the compilers"),
+    "scan": ("main", "main", "Analyse the contracts of contracts.json and write permissions.json and the reports"),
+    "read-storage": ("main", "read_storage_main", "Read the storage values of the last scan again, without analysing the contracts"),
+    "refresh": ("main", "refresh_main", "Read the storage values again from manifest.json and permissions.json only"),
+    "report": ("report", "main", "Regenerate the reports from a permissions.json"),
+    "batch": ("batch", "main", "Scan several projects in one run"),
+    "watch": ("watch", "main", "Watch the owner slots of a scan for changes"),
+    "timeline": ("timeline", "main", "Find the blocks where the owner slots of a scan changed, between two blocks"),
+}
+
+
+def load_command(name: str) -> Callable[[Optional[List[str]]], None]:
+    """Import the module of a command and return its entry point."""
+    module_name, function_name, _ = COMMANDS[name]
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    parser = ArgumentParser(
+        prog="cli.py",
+        description="Scan deployed contracts for permissioned functions and their owners",
+        epilog="commands:\n" + "\n".join(f"  {name:<14}{help}" for name, (_, _, help) in COMMANDS.items()),
+        formatter_class=RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("command", choices=COMMANDS.keys(), metavar="command", help="see below, `<command> --help` for its arguments")
+    args = parser.parse_args(argv[:1])
+    load_command(args.command)(argv[1:])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import os
+import re
+import json
+from json.decoder import JSONDecodeError
+from argparse import Namespace
+from typing import Dict, Optional, Sequence
+
+from crytic_compile import CryticCompile
+from crytic_compile.compilation_unit import CompilationUnit
+from crytic_compile.compiler.compiler import CompilerVersion
+from crytic_compile.platform import solc_standard_json
+from crytic_compile.platform.etherscan import (
+    Etherscan,
+    _convert_version,
+    _handle_multiple_files,
+    _handle_single_file,
+)
+from crytic_compile.platform.exceptions import InvalidCompilation
+from crytic_compile.platform.standard import Standard, generate_standard_export
+from slither.slither import Slither
+
+from cache import CompilationCache, compilation_key, toolchain
+from immutables import immutable_references
+from instrumentation import stage
+
+
+class CachedEtherscan(Etherscan):
+    """
+    Etherscan platform that compiles an already fetched getsourcecode result
+    instead of downloading the sources from the explorer again.
+    Mirrors `Etherscan.compile` of crytic-compile, minus the HTTP requests.
+    """
+
+    def __init__(self, target: str, contract_info: dict, solc_binaries: Optional[Dict[str, str]] = None, **kwargs):
+        super().__init__(target, **kwargs)
+        self._contract_info = contract_info
+        # version -> binary installed up front, see compilers.provision_compilers
+        self._solc_binaries = solc_binaries or {}
+        # kept from the solc output, crytic-compile drops them
+        self.immutable_references = {}
+
+    def compile(self, crytic_compile: CryticCompile, **kwargs) -> None:
+        target = self._target
+        if ":" in target:
+            prefix, addr = target.split(":", 1)
+        else:
+            prefix, addr = None, target
+
+        result = self._contract_info
+        source_code = result.get("SourceCode") or ""
+        contract_name = result.get("ContractName") or ""
+
+        if source_code == "":
+            raise InvalidCompilation(f"Contract has no public source code: {target}")
+
+        export_dir = os.path.join(
+            kwargs.get("export_dir", "crytic-export"),
+            kwargs.get("etherscan_export_dir", "etherscan-contracts")
+        )
+        os.makedirs(export_dir, exist_ok=True)
+
+        compiler_version = re.findall(r"\d+\.\d+\.\d+", _convert_version(result["CompilerVersion"]))[0]
+
+        # etherscan can report "default" which is not a valid EVM version
+        evm_version = result.get("EVMVersion")
+        if evm_version in (None, "", "Default"):
+            evm_version = None
+
+        optimization_used = result.get("OptimizationUsed") == "1"
+        optimize_runs = int(result["Runs"]) if optimization_used else None
+
+        working_dir = None
+        remappings = None
+        dict_source_code = None
+        try:
+            # etherscan might return an object with two curly braces, {{ content }}
+            dict_source_code = json.loads(source_code[1:-1])
+            filenames, working_dir, remappings = _handle_multiple_files(dict_source_code, addr, prefix, contract_name, export_dir)
+        except JSONDecodeError:
+            try:
+                # or an object with single curly braces, { content }
+                dict_source_code = json.loads(source_code)
+                filenames, working_dir, remappings = _handle_multiple_files(dict_source_code, addr, prefix, contract_name, export_dir)
+            except JSONDecodeError:
+                filenames = [_handle_single_file(source_code, addr, prefix, contract_name, export_dir)]
+
+        via_ir = None
+        if isinstance(dict_source_code, dict):
+            via_ir = dict_source_code.get("settings", {}).get("viaIR", None)
+
+        # pinned to the binary of its version when it was installed up front, else solc-select picks it
+        solc_binary = self._solc_binaries.get(compiler_version)
+        compilation_unit = CompilationUnit(crytic_compile, contract_name)
+        compilation_unit.compiler_version = CompilerVersion(
+            compiler=solc_binary or kwargs.get("solc", "solc"),
+            version=compiler_version,
+            optimized=optimization_used,
+            optimize_runs=optimize_runs,
+        )
+        if solc_binary is None:
+            with stage("solc install", target, version=compiler_version):
+                compilation_unit.compiler_version.look_for_installed_version()
+
+        if result.get("Proxy") == "1" and result.get("Implementation"):
+            compilation_unit.implementation_address = f"{prefix}:{result['Implementation']}" if prefix else result["Implementation"]
+
+        # same as solc_standard_json.standalone_compile, which does not return the solc output
+        standard_json_dict = {}
+        solc_standard_json.build_standard_json_default(standard_json_dict)
+        for filename in filenames:
+            solc_standard_json.add_source_file(standard_json_dict, filename)
+        for remap in remappings or []:
+            solc_standard_json.add_remapping(standard_json_dict, remap)
+        if evm_version is not None:
+            solc_standard_json.add_evm_version(standard_json_dict, evm_version)
+        if via_ir is not None:
+            solc_standard_json.add_via_ir(standard_json_dict, via_ir)
+        solc_standard_json.add_optimization(standard_json_dict, optimization_used, optimize_runs)
+
+        with stage("solc", target, version=compiler_version):
+            targets_json = solc_standard_json.run_solc_standard_json(
+                standard_json_dict,
+                compiler_version=compilation_unit.compiler_version,
+                solc_disable_warnings=False,
+                working_dir=working_dir,
+            )
+        solc_standard_json.parse_standard_json_output(targets_json, compilation_unit, solc_working_dir=working_dir)
+        self.immutable_references = immutable_references(targets_json)
+
+
+def load_slither(target: str, contract_info: dict, args: Namespace, compilation_cache: CompilationCache = None, solc_binaries: Optional[Dict[str, str]] = None,
+                 crytic_args: Sequence[str] = ()) -> Slither:
+    """
+    Build a Slither object for an explorer target (e.g. mainnet:0x0) from its cached source bundle.
+    With a `compilation_cache`, unchanged sources are loaded from the previous compilation instead of running solc,
+    as long as they were compiled with the same crytic-compile flags `crytic_args` and toolchain versions.
+    `solc_binaries` pins the compiler of each solc version to an installed binary.
+    The immutable references of its contracts (see immutables.immutable_references) are set as `immutable_references`.
+    """
+    kwargs = vars(args)
+
+    key = compilation_key(contract_info, toolchain(crytic_args))
+    if compilation_cache is not None:
+        artifact = compilation_cache.get(key)
+        references = compilation_cache.get_immutables(key)
+        # artifacts cached before immutable references were kept are compiled again
+        if artifact is not None and references is not None:
+            with stage("load compilation", target):
+                crytic_compile = CryticCompile(Standard(artifact), **kwargs)
+            with stage("slither", target):
+                slither = Slither(crytic_compile, **kwargs)
+            slither.immutable_references = references
+            return slither
+
+    with stage("compile", target):
+        platform = CachedEtherscan(target, contract_info, solc_binaries, **kwargs)
+        crytic_compile = CryticCompile(platform, **kwargs)
+    if compilation_cache is not None:
+        compilation_cache.put(key, generate_standard_export(crytic_compile), platform.immutable_references)
+    with stage("slither", target):
+        slither = Slither(crytic_compile, **kwargs)
+    slither.immutable_references = platform.immutable_references
+    return slither
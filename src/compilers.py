@@ -0,0 +1,104 @@
+import os
+import re
+import json
+import hashlib
+import tempfile
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+DEFAULT_INSTALL_WORKERS = 8
+
+
+def required_versions(contract_infos: Iterable[dict]) -> List[str]:
+    """solc versions (e.g. 0.8.20) needed to compile the given getsourcecode results, vyper contracts are left out."""
+    from crytic_compile.platform.etherscan import _convert_version
+
+    versions = []
+    for contract_info in contract_infos:
+        compiler_version = contract_info.get("CompilerVersion") or ""
+        if not compiler_version or compiler_version.startswith("vyper"):
+            continue
+        found = re.findall(r"\d+\.\d+\.\d+", _convert_version(compiler_version))
+        if found:
+            versions.append(found[0])
+    return sorted(set(versions))
+
+
+def solc_path(version: str) -> str:
+    """Where solc-select keeps the binary of a version, shared by all runs."""
+    from solc_select.constants import ARTIFACTS_DIR
+
+    return os.path.join(str(ARTIFACTS_DIR), f"solc-{version}", f"solc-{version}")
+
+
+def is_installed(version: str) -> bool:
+    path = solc_path(version)
+    return os.path.isfile(path) and os.access(path, os.X_OK)
+
+
+def _read(mirror: str, name: str) -> bytes:
+    # the mirror is a directory or a url with the layout of binaries.soliditylang.org
+    from solc_select.solc_select import soliditylang_platform
+
+    if os.path.isdir(mirror):
+        with open(os.path.join(mirror, soliditylang_platform(), name), "rb") as file:
+            return file.read()
+    with urllib.request.urlopen(f"{mirror.rstrip('/')}/{soliditylang_platform()}/{name}") as response:
+        return response.read()
+
+
+def install_from_mirror(version: str, mirror: str) -> str:
+    """Install a solc version from a mirror of binaries.soliditylang.org, checking its sha256."""
+    builds = json.loads(_read(mirror, "list.json"))
+    matches = [b for b in builds["builds"] if b["version"] == version and "nightly" not in b.get("path", "")]
+    if not matches:
+        raise LookupError(f"solc {version} is not available from {mirror}")
+    build = matches[-1]
+
+    binary = _read(mirror, build["path"])
+    if build.get("sha256") and "0x" + hashlib.sha256(binary).hexdigest() != build["sha256"]:
+        raise ValueError(f"Checksum mismatch of solc {version} from {mirror}")
+
+    # written to a temporary file first, a concurrent scan must never run a partial binary
+    path = solc_path(version)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, "wb") as file:
+        file.write(binary)
+    os.chmod(tmp_path, 0o775)
+    os.replace(tmp_path, path)
+    return path
+
+
+def install(version: str, mirror: Optional[str] = None) -> str:
+    if mirror is None:
+        from solc_select.solc_select import install_artifacts
+
+        if not install_artifacts([version]) or not is_installed(version):
+            raise LookupError(f"solc {version} could not be installed with solc-select")
+        return solc_path(version)
+    return install_from_mirror(version, mirror)
+
+
+def provision_compilers(versions: Iterable[str], mirror: Optional[str] = None, max_workers: int = DEFAULT_INSTALL_WORKERS) -> Dict[str, str]:
+    """
+    Install all missing solc versions concurrently, before any compilation starts.
+    Returns the binary of every available version; versions which failed to install are left out,
+    their contracts fall back to the installation by crytic-compile.
+    """
+    versions = list(dict.fromkeys(versions))
+    missing = [v for v in versions if not is_installed(v)]
+    binaries = {v: solc_path(v) for v in versions if v not in missing}
+    if not missing:
+        return binaries
+
+    print(f"Installing solc {', '.join(missing)}")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {v: executor.submit(install, v, mirror) for v in missing}
+    for version, future in futures.items():
+        try:
+            binaries[version] = future.result()
+        except Exception as e:
+            print(f"\033[33mFailed to install solc {version}: {e}\033[0m")
+    return binaries
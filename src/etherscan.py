@@ -1,45 +1,220 @@
 import os
 
-import urllib.request
-import urllib.parse
-import json
+import re
+import time
+import random
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+
+from instrumentation import record_request
+
+API_URL = "https://api.etherscan.io/v2/api"
+
+# calls per second allowed by the etherscan api plans
+API_TIERS = {
+    "free": 5,
+    "standard": 10,
+    "advanced": 20,
+    "professional": 30,
+}
+
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5  # seconds
+BACKOFF_CAP = 16  # seconds
+
 
 def get_etherscan_url() -> str:
     etherscan_url = os.getenv("ETHERSCAN_API_KEY")
-    
+
     if etherscan_url is None:
         raise KeyError("Please set a etherscan api key in your .env")
 
     return etherscan_url
 
 
-def fetch_contract_metadata(address, apikey, chainid=1):
-    base_url = "https://api.etherscan.io/v2/api"
-    params = {
-        "chainid": chainid,
-        "module": "contract",
-        "action": "getsourcecode",
-        "address": address,
-        "apikey": apikey
-    }
-    url = f"{base_url}?{urllib.parse.urlencode(params)}"
-    
+def get_etherscan_api_url() -> str:
+    """Explorer api endpoint, ETHERSCAN_API_URL in the .env overrides it (e.g. a local stand-in for benchmarks)."""
+    return os.getenv("ETHERSCAN_API_URL") or API_URL
+
+
+class RetryableError(Exception):
+    """A request that failed but is worth trying again (rate limit, 5xx, timeout)."""
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, with bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            while True:
+                now = loop.time()
+                if self._updated is not None:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class EtherscanClient:
+    """
+    Shared explorer client: one pooled keep-alive session, a token bucket sized to the api tier,
+    jittered exponential backoff on transient errors, and coalescing of concurrent lookups of the same address.
+    Use as `async with EtherscanClient(...) as client:`.
+    """
+
+    def __init__(self, apikey: str, calls_per_second: float = API_TIERS["free"], cache=None, max_retries: int = MAX_RETRIES):
+        self.apikey = apikey
+        self.cache = cache
+        self.max_retries = max_retries
+        self.api_url = get_etherscan_api_url()
+        self._bucket = TokenBucket(calls_per_second)
+        self._connections = max(1, int(calls_per_second))
+        self._session: Optional[aiohttp.ClientSession] = None
+        # (chainid, address) -> task fetching it, shared by all callers
+        self._requests: Dict[Tuple[int, str], asyncio.Task] = {}
+
+    async def __aenter__(self) -> "EtherscanClient":
+        connector = aiohttp.TCPConnector(limit=self._connections)
+        self._session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=60))
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self._session.close()
+
+    async def fetch_contract_source(self, address: str, chainid: int = 1) -> dict:
+        """Return the raw getsourcecode result of a verified contract, served from the cache when possible."""
+        key = (chainid, address.lower())
+        if key not in self._requests:
+            self._requests[key] = asyncio.ensure_future(self._fetch_contract_source(address, chainid))
+        return await self._requests[key]
+
+    async def _fetch_contract_source(self, address: str, chainid: int) -> dict:
+        if self.cache is not None:
+            contract_info = self.cache.get_contract(chainid, address)
+            if contract_info is not None:
+                return contract_info
+            if self.cache.offline:
+                raise LookupError(f"Contract {address} on chain {chainid} is not in the cache, cannot fetch it in offline mode")
+
+        params = {
+            "chainid": chainid,
+            "module": "contract",
+            "action": "getsourcecode",
+            "address": address,
+            "apikey": self.apikey
+        }
+        data = await self._get(params)
+
+        if data.get("status") != "1":
+            raise ValueError(f"API error: {data.get('message', 'Unknown error')}")
+
+        result = data.get("result", [])
+        if not result:
+            raise ValueError("No contract data found")
+
+        contract_info = result[0]
+        if self.cache is not None:
+            self.cache.put_contract(chainid, address, contract_info)
+        return contract_info
+
+    async def _get(self, params: dict) -> dict:
+        for attempt in range(self.max_retries + 1):
+            await self._bucket.acquire()
+            started = time.perf_counter()
+            outcome = "ok"
+            try:
+                async with self._session.get(self.api_url, params=params) as response:
+                    if response.status == 429 or response.status >= 500:
+                        raise RetryableError(f"HTTP error {response.status}")
+                    if response.status != 200:
+                        outcome = f"HTTP {response.status}"
+                        raise RuntimeError(f"Request failed: HTTP error {response.status}")
+                    data = await response.json(content_type=None)
+                # etherscan reports rate limits with status 200 and a NOTOK message
+                if data.get("status") == "0" and "rate limit" in str(data.get("result", "")).lower():
+                    raise RetryableError(data["result"])
+                return data
+            except (RetryableError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                outcome = type(e).__name__
+                if attempt == self.max_retries:
+                    raise RuntimeError(f"Request failed after {attempt + 1} attempts: {e}")
+            finally:
+                record_request("http", f"etherscan {params.get('action')}", started, outcome, attempt=attempt)
+            # full jitter, so that concurrent retries do not hit the api at the same time again
+            await asyncio.sleep(random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt)))
+
+    async def fetch_with_implementation(self, address: str, chainid: int = 1) -> List[dict]:
+        """Fetch a contract and, if it is a proxy, its implementation."""
+        contract_info = await self.fetch_contract_source(address, chainid)
+        implementation = contract_info.get("Implementation")
+        if contract_info.get("Proxy") == "1" and implementation and re.fullmatch(r"0x[a-fA-F0-9]{40}", implementation):
+            return [contract_info, await self.fetch_contract_source(implementation, chainid)]
+        return [contract_info]
+
+
+async def _prefetch(targets: List[Tuple[int, str]], apikey: str, cache, calls_per_second: float) -> Dict[Tuple[int, str], Exception]:
+    async with EtherscanClient(apikey, calls_per_second, cache=cache) as client:
+        results = await asyncio.gather(
+            *[client.fetch_with_implementation(address, chainid) for chainid, address in targets],
+            return_exceptions=True
+        )
+    return {target: r for target, r in zip(targets, results) if isinstance(r, Exception)}
+
+
+def prefetch_targets(targets: List[Tuple[int, str]], apikey: str, cache, calls_per_second: float = API_TIERS["free"]) -> Dict[Tuple[int, str], Exception]:
+    """
+    Concurrently fetch (chainid, address) targets of any chains and their implementations into `cache`,
+    through one client, i.e. at the maximum rate of the api tier for this api key.
+    Returns the targets which could not be fetched and the reason.
+    """
     try:
-        with urllib.request.urlopen(url) as response:
-            if response.status != 200:
-                raise Exception(f"HTTP error {response.status}")
-            data = json.load(response)
-    except Exception as e:
-        raise RuntimeError(f"Request failed: {e}")
-    
-    if data.get("status") != "1":
-        raise ValueError(f"API error: {data.get('message', 'Unknown error')}")
-
-    result = data.get("result", [])
-    if not result:
-        raise ValueError("No contract data found")
-
-    contract_info = result[0]
+        return asyncio.run(_prefetch(targets, apikey, cache, calls_per_second))
+    finally:
+        # the size of the cache is bounded once for the whole prefetch, not after every contract
+        if cache is not None:
+            cache.evict()
+
+
+def prefetch_contract_sources(addresses: List[str], apikey: str, chainid: int, cache, calls_per_second: float = API_TIERS["free"]) -> Dict[str, Exception]:
+    """
+    Concurrently fetch all addresses and their implementations into `cache`, at the maximum rate of the api tier.
+    Returns the addresses which could not be fetched and the reason.
+    """
+    failed = prefetch_targets([(chainid, address) for address in addresses], apikey, cache, calls_per_second)
+    return {address: e for (_, address), e in failed.items()}
+
+
+def fetch_contract_source(address, apikey, chainid=1, cache=None) -> dict:
+    """Return the raw getsourcecode result of a verified contract, served from `cache` when possible."""
+    if cache is not None:
+        contract_info = cache.get_contract(chainid, address)
+        if contract_info is not None:
+            return contract_info
+
+    async def fetch() -> dict:
+        async with EtherscanClient(apikey, cache=cache) as client:
+            return await client.fetch_contract_source(address, chainid)
+
+    contract_info = asyncio.run(fetch())
+    if cache is not None:
+        cache.evict()
+    return contract_info
+
+
+def fetch_contract_metadata(address, apikey, chainid=1, cache=None):
+    contract_info = fetch_contract_source(address, apikey, chainid, cache)
     return {
         "ContractName": contract_info.get("ContractName"),
         "Proxy": contract_info.get("Proxy") == "1",
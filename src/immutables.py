@@ -0,0 +1,57 @@
+from typing import Dict, Iterator, List, Union
+
+from rpc import decode_storage_value
+
+# contract name -> immutable variable name -> [[start, length], ...] byte ranges in the runtime code
+ImmutableReferences = Dict[str, Dict[str, List[List[int]]]]
+
+
+def _variable_declarations(node: Union[dict, list]) -> Iterator[dict]:
+    if isinstance(node, list):
+        for child in node:
+            yield from _variable_declarations(child)
+    elif isinstance(node, dict):
+        if node.get("nodeType") == "VariableDeclaration":
+            yield node
+        for child in node.values():
+            if isinstance(child, (dict, list)):
+                yield from _variable_declarations(child)
+
+
+def immutable_references(targets_json: dict) -> ImmutableReferences:
+    """
+    Where solc placed the value of every immutable in the runtime code of each contract,
+    from `evm.deployedBytecode.immutableReferences` of the standard json output, with the ast ids resolved to names.
+    """
+    names = {}
+    for source in targets_json.get("sources", {}).values():
+        for declaration in _variable_declarations(source.get("ast") or {}):
+            if declaration.get("mutability") == "immutable":
+                names[str(declaration["id"])] = declaration["name"]
+
+    references = {}
+    for file_contracts in targets_json.get("contracts", {}).values():
+        for contract_name, info in file_contracts.items():
+            deployed = info.get("evm", {}).get("deployedBytecode", {})
+            references[contract_name] = {
+                names[ast_id]: [[r["start"], r["length"]] for r in ranges]
+                for ast_id, ranges in (deployed.get("immutableReferences") or {}).items()
+                if ast_id in names
+            }
+    return references
+
+
+def decode_immutable(code: bytes, offsets: List[List[int]], size: int, type_string: str) -> Union[int, bool, str, None]:
+    """
+    Value of an immutable from the runtime code, read at its first reference.
+    Immutables are stored as full 32 byte words, fixed size bytes left aligned, everything else right aligned.
+    """
+    if not offsets:
+        return None
+    start, length = offsets[0]
+    word = code[start:start + length]
+    if len(word) != length:
+        return None
+    if type_string.startswith("bytes") and type_string != "bytes":
+        return word[:size // 8].hex()
+    return decode_storage_value(word, size, 0, type_string)
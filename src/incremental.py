@@ -0,0 +1,194 @@
+import copy
+import json
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from eth_utils import keccak, to_checksum_address
+
+from rpc import batch_call, DEFAULT_BATCH_SIZE, DEFAULT_CONCURRENCY
+
+DEFAULT_MANIFEST = "manifest.json"
+DEFAULT_DIFF = "permissions.diff.json"
+
+# bytes32(uint256(keccak256("eip1967.proxy.implementation")) - 1)
+EIP1967_IMPLEMENTATION_SLOT = "0x360894a13ba1a3210667c828492db98dca3e2076cc3735a920a3ca505d382bbc"
+
+
+def load_json(path: str) -> dict:
+    with open(path, "r") as file:
+        return json.load(file)
+
+
+def get_onchain_state(rpc_url: str, addresses: List[str], block: int, batch_size: int = DEFAULT_BATCH_SIZE, concurrency: int = DEFAULT_CONCURRENCY) -> Dict[str, dict]:
+    """
+    Runtime code hash and EIP-1967 implementation of every address at `block`, with one batch of calls.
+    Addresses whose code could not be read are left out.
+    """
+    calls = []
+    for address in addresses:
+        calls.append(("eth_getCode", [to_checksum_address(address), hex(block)]))
+        calls.append(("eth_getStorageAt", [to_checksum_address(address), EIP1967_IMPLEMENTATION_SLOT, hex(block)]))
+    results = batch_call(rpc_url, calls, batch_size, concurrency)
+
+    state = {}
+    for i, address in enumerate(addresses):
+        code, implementation_slot = results[2 * i], results[2 * i + 1]
+        if isinstance(code, Exception) or not isinstance(code, str):
+            continue
+        implementation = None
+        if isinstance(implementation_slot, str) and int(implementation_slot, 16) != 0:
+            implementation = to_checksum_address("0x" + implementation_slot[-40:])
+        state[address.lower()] = {
+            "code_hash": "0x" + keccak(hexstr=code).hex(),
+            "implementation": implementation,
+        }
+    return state
+
+
+def build_manifest(chain_name: str, block: int, records: Iterable[dict], state: Dict[str, dict]) -> dict:
+    """
+    Manifest of a finished scan: per address the code hash and implementation it was analysed with,
+    and what is needed to refresh it without analysing it again (permissions key, report rows, storage layout).
+    The storage layout is the index of the refresh mode: the address holding the storage (the proxy),
+    name, slot, offset, size and type of every variable, and the code offsets of the immutables.
+    """
+    contracts = {}
+    for record in records:
+        if record["name"] is None:
+            continue
+        address = record["address"]
+        onchain = state.get(address.lower(), {})
+        contracts[address] = {
+            "code_hash": onchain.get("code_hash"),
+            "implementation": record["permissions"].get("Implementation_Address"),
+            "implementation_slot": onchain.get("implementation"),
+            "name": record["name"],
+            "contracts": record["contracts"],
+            "storage": record["storage"],
+        }
+    return {"Chain_Name": chain_name, "Block_Number": block, "Contracts": contracts}
+
+
+def find_unchanged(manifest: dict, previous_permissions: dict, state: Dict[str, dict], implementations: Dict[str, Optional[str]]) -> List[str]:
+    """
+    Addresses whose runtime code and proxy implementation did not change since the manifest was written,
+    and whose previous permissions are available.
+    `implementations` is the implementation currently reported by the explorer for each address.
+    """
+    unchanged = []
+    for address, entry in manifest["Contracts"].items():
+        current = state.get(address.lower())
+        if current is None or entry["code_hash"] is None:
+            continue
+        if current["code_hash"] != entry["code_hash"]:
+            continue
+        if current["implementation"] != entry["implementation_slot"]:
+            continue
+        if (implementations.get(address) or None) != (entry["implementation"] or None):
+            continue
+        if entry["name"] not in previous_permissions:
+            continue
+        unchanged.append(address)
+    return unchanged
+
+
+# keys of permissions.json filled from the chain after the analysis, by apply_storage_values, annotate_owners and annotate_roles
+READ_KEYS = ["Block_Number", "Owners", "Roles", "Roles_Block_Number"]
+FUNCTION_READ_KEYS = ["owners", "roles"]
+# keys of a function written by the analysis, a storage variable with one of these names does not overwrite them
+BASE_FUNCTION_KEYS = ["Function", "Modifiers", "msg.sender_conditions", "state_variables_read", "state_variables_written", "msg.sender_variables", "immutables_and_constants"]
+
+
+def strip_values(permissions: dict) -> dict:
+    """Copy of the permissions of a contract without the values read from the chain, only what the analysis found."""
+    permissions = {k: v for k, v in copy.deepcopy(permissions).items() if k not in READ_KEYS}
+    for key in ["proxy_permissions", "permissions"]:
+        if key not in permissions:
+            continue
+        permissions[key].pop("storage_values", None)
+        for function in permissions[key]["Functions"]:
+            # storage values are added to a function under the name of the variable
+            for name in FUNCTION_READ_KEYS + function.get("state_variables_read", []):
+                if name not in BASE_FUNCTION_KEYS:
+                    function.pop(name, None)
+            for constant in function.get("immutables_and_constants", []):
+                constant.pop("value", None)
+    return permissions
+
+
+def unchanged_record(address: str, manifest: dict, previous_permissions: dict) -> dict:
+    """
+    Scan result of an unchanged contract, rebuilt from the previous run without the values read then;
+    only its storage is read again.
+    """
+    entry = manifest["Contracts"][address]
+    return {
+        "name": entry["name"],
+        "permissions": strip_values(previous_permissions[entry["name"]]),
+        "contracts": entry["contracts"],
+        "storage": entry["storage"],
+    }
+
+
+def _functions(entries: dict) -> Dict[Tuple[str, str], dict]:
+    functions = {}
+    for key in ["proxy_permissions", "permissions"]:
+        if key in entries:
+            for function in entries[key]["Functions"]:
+                functions[(entries[key]["Contract_Name"], function["Function"])] = function
+    return functions
+
+
+def _values(entries: dict) -> Dict[str, object]:
+    """Owners and other values read from the chain: storage values, constants/immutables and role members."""
+    values = {}
+    for key in ["proxy_permissions", "permissions"]:
+        if key not in entries:
+            continue
+        values.update(entries[key].get("storage_values", {}))
+        for function in entries[key]["Functions"]:
+            for constant in function.get("immutables_and_constants", []):
+                if "value" in constant:
+                    values[constant["name"]] = constant["value"]
+    for role, info in entries.get("Roles", {}).items():
+        values[role] = info["members"]
+    return values
+
+
+def diff_permissions(previous_permissions: dict, current_items: Iterator[Tuple[str, dict]]) -> dict:
+    """Added/removed contracts and permissioned functions, and changed owner values, between two permissions.json."""
+    diff = {"added_contracts": [], "removed_contracts": [], "changed_contracts": {}}
+    seen = set()
+    for name, entries in current_items:
+        seen.add(name)
+        if name not in previous_permissions:
+            diff["added_contracts"].append(name)
+            continue
+
+        previous = previous_permissions[name]
+        changes = {}
+
+        previous_functions, current_functions = _functions(previous), _functions(entries)
+        added = [f"{c}.{f}" for (c, f) in current_functions if (c, f) not in previous_functions]
+        removed = [f"{c}.{f}" for (c, f) in previous_functions if (c, f) not in current_functions]
+        if added:
+            changes["added_functions"] = added
+        if removed:
+            changes["removed_functions"] = removed
+
+        previous_values, current_values = _values(previous), _values(entries)
+        changed_values = {
+            var: {"old": previous_values.get(var), "new": current_values.get(var)}
+            for var in sorted(set(previous_values) | set(current_values))
+            if previous_values.get(var) != current_values.get(var)
+        }
+        if changed_values:
+            changes["changed_values"] = changed_values
+
+        if previous.get("Implementation_Address") != entries.get("Implementation_Address"):
+            changes["implementation"] = {"old": previous.get("Implementation_Address"), "new": entries.get("Implementation_Address")}
+
+        if changes:
+            diff["changed_contracts"][name] = changes
+
+    diff["removed_contracts"] = [name for name in previous_permissions if name not in seen]
+    return diff
@@ -0,0 +1,140 @@
+import os
+import json
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from prettytable import PrettyTable
+
+# one record per finished stage or request of this process:
+#   name, cat ("stage", "http" or "rpc"), start (µs since epoch), dur (µs), pid, contract, outcome, args
+_records: List[dict] = []
+
+
+def _record(name: str, cat: str, start: int, seconds: float, outcome: str, contract: Optional[str], args: dict) -> None:
+    _records.append({
+        "name": name,
+        "cat": cat,
+        "start": start,
+        "dur": int(seconds * 1_000_000),
+        "pid": os.getpid(),
+        "contract": contract,
+        "outcome": outcome,
+        "args": args,
+    })
+
+
+@contextmanager
+def stage(name: str, contract: Optional[str] = None, **args) -> Iterator[dict]:
+    """
+    Time a stage of the scan, e.g. `with stage("compile", address):`.
+    The outcome is "ok", or the exception type if the block raised; set `info["outcome"]` on the yielded dict to override it.
+    """
+    info = {"outcome": "ok"}
+    start = time.time_ns() // 1000
+    started = time.perf_counter()
+    try:
+        yield info
+    except BaseException as e:
+        info["outcome"] = type(e).__name__
+        raise
+    finally:
+        _record(name, "stage", start, time.perf_counter() - started, info["outcome"], contract, args)
+
+
+def record_request(cat: str, name: str, started: float, outcome: str, **args) -> None:
+    """Record an HTTP ("http") or JSON-RPC ("rpc") request which started at `started` (time.perf_counter())."""
+    seconds = time.perf_counter() - started
+    start = time.time_ns() // 1000 - int(seconds * 1_000_000)
+    _record(name, cat, start, seconds, outcome, None, args)
+
+
+def drain() -> List[dict]:
+    """Take the records of this process, e.g. to send them from a worker to the main process."""
+    records = _records[:]
+    _records.clear()
+    return records
+
+
+def merge(records: List[dict]) -> None:
+    _records.extend(records)
+
+
+def run_traced(function: Callable, *args) -> Tuple[Any, List[dict]]:
+    """Run `function` in a worker process and return its result together with the records it produced."""
+    drain()
+    result = function(*args)
+    return result, drain()
+
+
+def summary() -> List[dict]:
+    """Count, failures and durations per stage and request kind, in the order they first occurred."""
+    groups: Dict[Tuple[str, str], dict] = {}
+    for r in _records:
+        group = groups.setdefault((r["cat"], r["name"]), {
+            "cat": r["cat"], "name": r["name"], "count": 0, "failed": 0, "seconds": 0.0, "max_seconds": 0.0, "calls": 0
+        })
+        seconds = r["dur"] / 1_000_000
+        group["count"] += 1
+        group["failed"] += r["outcome"] != "ok"
+        group["seconds"] += seconds
+        group["max_seconds"] = max(group["max_seconds"], seconds)
+        group["calls"] += r["args"].get("calls", 1)
+    return list(groups.values())
+
+
+def slowest_contracts(stage_name: str = "scan contract", limit: int = 10) -> List[dict]:
+    records = [r for r in _records if r["cat"] == "stage" and r["name"] == stage_name and r["contract"]]
+    return sorted(records, key=lambda r: r["dur"], reverse=True)[:limit]
+
+
+def print_summary() -> None:
+    table = PrettyTable()
+    table.field_names = ["Stage", "Count", "Failed", "Total (s)", "Mean (ms)", "Max (ms)"]
+    table.align["Stage"] = "l"
+    for group in summary():
+        label = group["name"] if group["cat"] == "stage" else f"{group['cat']}: {group['name']}"
+        if group["cat"] == "rpc":
+            label += f" ({group['calls']} calls)"
+        table.add_row([
+            label,
+            group["count"],
+            group["failed"],
+            f"{group['seconds']:.2f}",
+            f"{group['seconds'] / group['count'] * 1000:.0f}",
+            f"{group['max_seconds'] * 1000:.0f}",
+        ])
+    print(table)
+
+    slowest = slowest_contracts()
+    if slowest:
+        table = PrettyTable()
+        table.field_names = ["Slowest contracts", "Seconds", "Outcome"]
+        table.align["Slowest contracts"] = "l"
+        for r in slowest:
+            table.add_row([r["contract"], f"{r['dur'] / 1_000_000:.2f}", r["outcome"]])
+        print(table)
+
+
+def write_trace(path: str) -> None:
+    """Export all records in Chrome trace-event format (chrome://tracing, Perfetto)."""
+    main_pid = os.getpid()
+    events = []
+    for pid in dict.fromkeys(r["pid"] for r in _records):
+        name = "scanner" if pid == main_pid else f"worker {pid}"
+        events.append({"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": name}})
+
+    for i, r in enumerate(_records):
+        args = {**r["args"], "outcome": r["outcome"]}
+        if r["contract"]:
+            args["contract"] = r["contract"]
+        if r["cat"] == "stage":
+            events.append({"name": r["name"], "cat": r["cat"], "ph": "X", "ts": r["start"], "dur": r["dur"], "pid": r["pid"], "tid": 0, "args": args})
+        else:
+            # concurrent requests overlap, async events keep them apart
+            common = {"name": r["name"], "cat": r["cat"], "id": i, "pid": r["pid"], "tid": 0}
+            events.append({**common, "ph": "b", "ts": r["start"], "args": args})
+            events.append({**common, "ph": "e", "ts": r["start"] + r["dur"]})
+
+    with open(path, "w") as file:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
@@ -1,21 +1,26 @@
-from slither.slither import Slither
-from slither.core.declarations.function import Function
-from slither.core.declarations.contract import Contract
-
-from slither.tools.read_storage.read_storage import SlitherReadStorage, RpcInfo, get_storage_data
-
+import os
 import json
-from typing import  List
-import urllib.error
+import tempfile
+from argparse import Namespace
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-from parse import init_args
+from parse import init_scanner_args
 from get_rpc_url import get_rpc_url, get_chain_id
-from etherscan import get_etherscan_url, fetch_contract_metadata
+from etherscan import get_etherscan_url, prefetch_contract_sources, API_TIERS
+from cache import ScanCache, CompilationCache, compilation_key, toolchain
+from compilers import required_versions, provision_compilers
+from scanner import init_worker, scan_contract, group_by_code, scanned_for_address, read_storage_values, apply_storage_values, read_immutable_values, apply_immutable_values
+from rpc import get_block_number
+from owners import OwnerResolver, owner_addresses, annotate_owners
+from access_control import RoleCursors, read_roles, role_addresses, role_members, annotate_roles
+from triage import triage_contract, skipped_record
+from checkpoint import CheckpointStore, write_json_object
+from incremental import load_json, get_onchain_state, build_manifest, find_unchanged, unchanged_record, diff_permissions
+from instrumentation import stage, run_traced, merge, print_summary, write_trace
 from dotenv import load_dotenv
 
-import re
-
-from markdown_generator import generate_full_markdown
+from report import REPORT_FILES, write_report
 
 
 def load_config_from_file(file_path: str) -> dict:
@@ -23,304 +28,426 @@ def load_config_from_file(file_path: str) -> dict:
         return json.load(file)
 
 
-def is_valid_eth_address(address: str) -> bool:
-    return bool(re.fullmatch(r"0x[a-fA-F0-9]{40}", address))
+def get_implementation(cache: ScanCache, chain_id: int, address: str):
+    """Implementation of a proxy as currently reported by the explorer, None for other contracts."""
+    contract_info = cache.get_contract(chain_id, address)
+    if contract_info is None or contract_info.get("Proxy") != "1":
+        return None
+    return contract_info.get("Implementation") or None
+
+
+def drop_upgraded_proxies(cache: ScanCache, chain_id: int, addresses: List[str], onchain_state: Dict[str, dict]) -> None:
+    """
+    Drop the cached explorer data of proxies whose EIP-1967 implementation on chain is not the cached one,
+    so that the next fetch gets the implementation they were upgraded to.
+    """
+    upgraded = []
+    for contract_address in addresses:
+        onchain_implementation = onchain_state.get(contract_address.lower(), {}).get("implementation")
+        cached_implementation = get_implementation(cache, chain_id, contract_address)
+        if onchain_implementation is None or cached_implementation is None or cached_implementation.lower() == onchain_implementation.lower():
+            continue
+        if cache.offline:
+            print(f"\033[33m{contract_address} was upgraded to {onchain_implementation}, the cached implementation {cached_implementation} is used in offline mode\033[0m")
+            continue
+        upgraded.append(contract_address)
+    if upgraded:
+        cache.invalidate_addresses(chain_id, upgraded)
+
+
+def contract_infos_to_compile(cache: ScanCache, chain_id: int, addresses: List[str], compilation_cache: Optional[CompilationCache],
+                              crytic_args: Sequence[str] = ()) -> List[dict]:
+    """Sources of the addresses and their implementations, without those already in the compilation cache for these crytic-compile flags."""
+    toolchain_info = toolchain(crytic_args)
+    contract_infos = []
+    for contract_address in addresses:
+        for address in [contract_address, get_implementation(cache, chain_id, contract_address)]:
+            contract_info = cache.get_contract(chain_id, address) if address else None
+            if contract_info is None:
+                continue
+            if compilation_cache is not None and compilation_cache.get(compilation_key(contract_info, toolchain_info)) is not None:
+                continue
+            contract_infos.append(contract_info)
+    return contract_infos
+
+
+def triage_addresses(args: Namespace, cache: ScanCache, chain_id: int, addresses: List[str], checkpoint: CheckpointStore, report_path: str) -> List[str]:
+    """
+    Source level triage of the fetched addresses (`--triage`). Contracts without any access control pattern are
+    saved to the checkpoint without permissioned functions (skip), or analysed after all others (defer).
+    The decisions are written to `report_path`. Returns the addresses to analyse, in order.
+    """
+    if args.triage == "off":
+        return addresses
+    with stage("triage"):
+        decisions = {}
+        # clones share their sources, they are looked at once
+        by_sources: Dict[tuple, dict] = {}
+        for contract_address in addresses:
+            implementation_address = get_implementation(cache, chain_id, contract_address)
+            infos = [cache.get_contract(chain_id, a) for a in [contract_address, implementation_address] if a]
+            key = tuple(compilation_key(info) if info else None for info in infos)
+            if key not in by_sources:
+                by_sources[key] = triage_contract(infos)
+            decision = by_sources[key]
+            decisions[contract_address] = {
+                "name": (infos[-1] or infos[0] or {}).get("ContractName"),
+                "decision": "analyse" if decision["candidate"] else args.triage,
+                "patterns": decision["patterns"],
+            }
+            if not decision["candidate"] and args.triage == "skip":
+                checkpoint.append(contract_address, skipped_record(contract_address, infos[0], implementation_address, infos[-1] if implementation_address else None))
+
+        with open(report_path, "w") as file:
+            json.dump(decisions, file, indent=4)
+
+    analyse = [a for a in addresses if decisions[a]["decision"] == "analyse"]
+    deferred = [a for a in addresses if decisions[a]["decision"] == "defer"]
+    print(f"Triage: {len(addresses) - len(analyse)} of {len(addresses)} contracts have no access control pattern, "
+          f"{'analysed last' if args.triage == 'defer' else 'skipped'}, see {report_path}")
+    return analyse + deferred
+
+
+def scan_all(tasks: List[Tuple[str, Optional[Namespace]]], settings: Namespace, save: Callable[[Tuple[str, Optional[Namespace]], dict], None]) -> None:
+    """
+    Scan (address, project) tasks in `settings.jobs` worker processes, a project of None is the one of `settings`.
+    Every result is passed to `save` as soon as it is done.
+    """
+    if settings.jobs > 1:
+        with ProcessPoolExecutor(max_workers=settings.jobs, initializer=init_worker, initargs=(settings,)) as executor:
+            # the stages timed in a worker come back with its result
+            futures = {executor.submit(run_traced, scan_contract, *task): task for task in tasks}
+            try:
+                for future in as_completed(futures):
+                    scanned, records = future.result()
+                    merge(records)
+                    save(futures[future], scanned)
+            except BaseException:
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+    else:
+        init_worker(settings)
+        for task in tasks:
+            save(task, scan_contract(*task))
+
+
+def read_scanned_roles(args: Namespace, chain_name: str, rpc_url: str, scanned_contracts: Iterable[dict], block: int, concurrency: int) -> Dict[str, dict]:
+    """Members of the AccessControl roles of the scanned contracts at `block`, from their role logs since the last sync."""
+    addresses = role_addresses(scanned_contracts)
+    if args.no_roles or not addresses:
+        return {}
+    with stage("read roles"):
+        cursors = RoleCursors(os.path.join(args.cache_dir, "roles"))
+        return read_roles(rpc_url, chain_name, addresses, block, cursors, args.roles_from_block, args.logs_chunk_size, args.rpc_batch_size, concurrency)
+
+
+def resolve_owners(resolver: OwnerResolver, scanned_contracts: Iterable[dict], values: Dict[Tuple[str, int], bytes],
+                   immutable_values: Optional[Dict[Tuple[str, str], object]] = None, roles: Optional[Dict[str, dict]] = None) -> None:
+    """
+    Classify the owners found in storage and immutables, and the role members (EOA, Safe, Timelock, Ownable),
+    and the addresses controlling them.
+    """
+    if resolver.depth > 0:
+        with stage("resolve owners"):
+            owners = [
+                owner
+                for scanned in scanned_contracts
+                for owner in owner_addresses(scanned, values, immutable_values)
+            ]
+            resolver.resolve(owners + role_members(roles or {}))
+
+
+def write_results(output_dir: str, chain_name: str, addresses: List[str], checkpoint: CheckpointStore, values: Dict[Tuple[str, int], bytes],
+                  immutable_values: Dict[Tuple[str, str], object], block: int, onchain_state: Dict[str, dict], resolver: OwnerResolver, manifest_path: str,
+                  previous_permissions: Optional[dict] = None, diff_path: Optional[str] = None, report_formats: Iterable[str] = ("markdown",),
+                  roles: Optional[Dict[str, dict]] = None) -> None:
+    """
+    Write permissions.json and the reports (markdown.md, ...) to `output_dir`, the manifest, and the diff to the previous scan if given.
+    Everything is streamed from the checkpoint, one contract at a time.
+    """
+    # the outputs are assembled in the order of the config, streaming from the checkpoint
+    # a contract name found at several addresses is only written once, like keys of a dict
+    contract_data_for_markdown = []
+    last_address_of_name = {}
+    for scanned in checkpoint.iter_in_order(addresses):
+        contract_data_for_markdown.extend(scanned["contracts"])
+        if scanned["name"] is not None:
+            last_address_of_name[scanned["name"]] = scanned["address"]
+
+    def result_items():
+        for scanned in checkpoint.iter_in_order(addresses):
+            if scanned["name"] is None or last_address_of_name[scanned["name"]] != scanned["address"]:
+                continue
+            apply_storage_values(scanned, values, block)
+            apply_immutable_values(scanned, immutable_values)
+            annotate_owners(scanned["permissions"], resolver)
+            if roles and scanned["address"].lower() in roles:
+                annotate_roles(scanned["permissions"], roles[scanned["address"].lower()], resolver.resolved)
+            yield scanned["name"], scanned["permissions"]
+
+    with stage("write outputs"):
+        with open(os.path.join(output_dir, "permissions.json"), "w") as file:
+            write_json_object(file, result_items())
+
+        for report_format in report_formats:
+            with open(os.path.join(output_dir, REPORT_FILES[report_format]), "w", newline="" if report_format == "csv" else None) as file:
+                write_report(file, report_format, contract_data_for_markdown, result_items())
+
+        manifest = build_manifest(chain_name, block, checkpoint.iter_in_order(addresses), onchain_state)
+        with open(manifest_path, "w") as file:
+            json.dump(manifest, file, indent=4)
+
+        if previous_permissions is not None:
+            with open(diff_path, "w") as file:
+                json.dump(diff_permissions(previous_permissions, result_items()), file, indent=4)
+
+
+def load_project(args: Namespace) -> Namespace:
+    """Chain, rpc, explorer key and cache of the project in `args.config` (contracts.json)."""
+    config_json = load_config_from_file(args.config)
+    chain_name = config_json["Chain_Name"]
+    chain_id = get_chain_id(chain_name)
+
+    cache = ScanCache(
+        args.cache_dir,
+        ttl=args.cache_ttl,
+        metadata_ttl=args.cache_metadata_ttl,
+        max_size=args.cache_max_size * 1024 * 1024,
+        offline=args.offline
+    )
+    if args.invalidate_cache:
+        cache.invalidate(chainid=chain_id)
+
+    return Namespace(
+        addresses=config_json["Contracts"],
+        project_name=config_json["Project_Name"],
+        chain_name=chain_name,
+        chain_id=chain_id,
+        rpc_url=get_rpc_url(chain_name),
+        platform_key="" if args.offline else get_etherscan_url(),
+        cache=cache,
+    )
 
-# check for msg.sender checks
-def get_msg_sender_checks(function: Function) -> List[str]:
-    all_functions = (
-        [f for f in function.all_internal_calls() if isinstance(f, Function)]
-        + [m for f in function.all_internal_calls() if isinstance(f, Function) for m in f.modifiers]
-        + [function]
-        + [m for m in function.modifiers if isinstance(m, Function)]
-        + [call for call in function.all_library_calls() if isinstance(call, Function)]
-        + [m for call in function.all_library_calls() if isinstance(call, Function) for m in call.modifiers]
+
+def prefetch(args: Namespace, project: Namespace, addresses: List[str]) -> List[str]:
+    """
+    Fetch all metadata and sources (including implementations) concurrently into the cache,
+    the scan itself then only reads from the cache. Returns the addresses which could be fetched.
+    """
+    with stage("prefetch sources"):
+        failed = prefetch_contract_sources(addresses, project.platform_key, project.chain_id, project.cache, API_TIERS[args.etherscan_tier])
+    for contract_address, e in failed.items():
+        print(f"\033[33mFailed to fetch contract at {contract_address} from the explorer, skipping it: {e}\033[0m")
+    return [a for a in addresses if a not in failed]
+
+
+def provision(args: Namespace, project: Namespace, addresses: List[str]) -> Dict[str, str]:
+    """
+    Install every compiler version needed by the contracts at once, compilations are pinned to these binaries.
+    Contracts already in the compilation cache do not need a compiler.
+    """
+    compilation_cache = None
+    if not args.no_compilation_cache:
+        compilation_cache = CompilationCache(os.path.join(args.cache_dir, "compilations"))
+    contract_infos = contract_infos_to_compile(project.cache, project.chain_id, addresses, compilation_cache, args.crytic_args)
+    with stage("solc provisioning"):
+        return provision_compilers(required_versions(contract_infos), args.solc_mirror)
+
+
+def read_onchain_state(args: Namespace, project: Namespace) -> Tuple[int, Dict[str, dict]]:
+    """
+    Block of the run (`--block`, else the latest) and code hash and implementation of every address,
+    everything read from the chain in a run is read at this block.
+    """
+    with stage("onchain state"):
+        block = args.block if args.block is not None else get_block_number(project.rpc_url)
+        return block, get_onchain_state(project.rpc_url, project.addresses, block, args.rpc_batch_size, args.rpc_concurrency)
+
+
+def finish(args: Namespace, project: Namespace, checkpoint: CheckpointStore, block: int, onchain_state: Dict[str, dict],
+           previous_permissions: Optional[dict] = None) -> None:
+    """Read the storage, immutables, role members and owners of all scanned contracts at `block`, and write the results."""
+    addresses = project.addresses
+
+    # read the storage of all contracts at once, everything at the same block
+    with stage("read storage"):
+        values = read_storage_values(checkpoint.iter_in_order(addresses), project.rpc_url, block, args.rpc_batch_size, args.rpc_concurrency)
+
+    # immutables are decoded from the runtime code, one eth_getCode per address
+    with stage("read immutables"):
+        immutable_values = read_immutable_values(checkpoint.iter_in_order(addresses), project.rpc_url, block, args.rpc_batch_size, args.rpc_concurrency)
+
+    # role members of AccessControl contracts are not in storage, they are rebuilt from the role logs
+    roles = read_scanned_roles(args, project.chain_name, project.rpc_url, checkpoint.iter_in_order(addresses), block, args.rpc_concurrency)
+
+    resolver = OwnerResolver(project.rpc_url, block, args.owner_depth, args.rpc_batch_size, args.rpc_concurrency)
+    resolve_owners(resolver, checkpoint.iter_in_order(addresses), values, immutable_values, roles)
+
+    write_results(args.output_dir, project.chain_name, addresses, checkpoint, values, immutable_values, block, onchain_state, resolver,
+                  args.manifest, previous_permissions, args.diff, args.report_format, roles)
+
+
+def fetch(args: Namespace) -> None:
+    """Download the sources of all contracts into the cache and install their compilers, without analysing them."""
+    project = load_project(args)
+    fetched = prefetch(args, project, project.addresses)
+    solc_binaries = provision(args, project, fetched)
+    print(f"Fetched {len(fetched)} of {len(project.addresses)} contracts, {len(solc_binaries)} solc versions installed")
+
+
+def scan(args: Namespace) -> None:
+    """Scan the project of `args.config` and write permissions.json, the reports and the manifest."""
+    project = load_project(args)
+    chain_id = project.chain_id
+    cache = project.cache
+    contracts_addresses = project.addresses
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    checkpoint = CheckpointStore(args.checkpoint, resume=args.resume)
+    completed = checkpoint.completed() if args.resume else set()
+    if completed:
+        print(f"Resuming from {args.checkpoint}, {len(completed)} contracts already scanned")
+    pending = [a for a in contracts_addresses if a not in completed]
+
+    block, onchain_state = read_onchain_state(args, project)
+    drop_upgraded_proxies(cache, chain_id, pending, onchain_state)
+    pending = prefetch(args, project, pending)
+
+    # incremental mode: contracts whose code and implementation did not change since the previous scan
+    # are taken over from the previous permissions.json, only their storage values are read again
+    previous_permissions = None
+    if args.previous:
+        previous_permissions = load_json(args.previous)
+        manifest = load_json(args.manifest)
+        implementations = {a: get_implementation(cache, chain_id, a) for a in pending}
+        unchanged = set(find_unchanged(manifest, previous_permissions, onchain_state, implementations))
+        for contract_address in pending:
+            if contract_address in unchanged:
+                checkpoint.append(contract_address, unchanged_record(contract_address, manifest, previous_permissions))
+        pending = [a for a in pending if a not in unchanged]
+        print(f"{len(unchanged)} contracts unchanged since the previous scan, {len(pending)} to analyse")
+
+        # the cached explorer data of a changed contract can be from before the change (e.g. its old implementation),
+        # it is fetched again so that the analysis sees the current code
+        changed = [a for a in pending if a in manifest["Contracts"]]
+        if changed and not cache.offline:
+            cache.invalidate_addresses(chain_id, changed)
+            refetched = set(prefetch(args, project, changed))
+            pending = [a for a in pending if a not in changed or a in refetched]
+
+    pending = triage_addresses(args, cache, chain_id, pending, checkpoint, args.triage_report)
+
+    # contracts with the same runtime code (and the same implementation, for proxies) are analysed once,
+    # the other addresses of the group get a copy of the result, only their storage is read separately
+    groups = group_by_code(pending, onchain_state, {a: get_implementation(cache, chain_id, a) for a in pending})
+    if len(groups) < len(pending):
+        print(f"{len(groups)} unique contracts to analyse for {len(pending)} addresses")
+
+    # only the contracts which are analysed need a compiler
+    solc_binaries = provision(args, project, list(groups))
+
+    # everything a worker process needs to scan a contract on its own
+    settings = Namespace(
+        **vars(args),
+        project_name=project.project_name,
+        chain_name=project.chain_name,
+        chain_id=chain_id,
+        rpc_url=project.rpc_url,
+        platform_key=project.platform_key,
+        solc_binaries=solc_binaries
     )
 
-    all_nodes_ = [f.nodes for f in all_functions]
-    all_nodes = [item for sublist in all_nodes_ for item in sublist]
-
-    all_conditional_nodes = [
-        n for n in all_nodes if n.contains_if() or n.contains_require_or_assert()
-    ]
-    all_conditional_nodes_on_msg_sender = [
-        str(n.expression)
-        for n in all_conditional_nodes
-        if "msg.sender" in [v.name for v in n.solidity_variables_read]
-    ]
-    return all_conditional_nodes_on_msg_sender
-
-
-def get_permissions(contract: Contract, result: dict, all_state_variables_read: List[str], isProxy: bool, index: int):
-    
-    temp = {
-        "Contract_Name": contract.name,
-        "Functions": []
-    }
-
-    for function in contract.functions:
-        # 1) list all modifiers in function
-        # for output analysis
-        modifiers = function.modifiers
-        for call in function.all_internal_calls():
-            if isinstance(call, Function):
-                modifiers += call.modifiers
-        for call in function.all_library_calls():
-            if isinstance(call, Function):
-                modifiers += call.modifiers
-
-        listOfModifiers = sorted([m.name for m in set(modifiers)])
-
-        
-        # 2) detect conditions on msg.sender
-        # in the full function scope
-        msg_sender_condition = get_msg_sender_checks(function)
-
-        if (len(modifiers) == 0 and len(msg_sender_condition) == 0):
-            # no permission detected
-            continue
+    def save(task: Tuple[str, None], scanned: dict) -> None:
+        contract_address = task[0]
+        for address in groups[contract_address]:
+            checkpoint.append(address, scanned if address == contract_address else scanned_for_address(scanned, address))
+
+    # every contract goes to the checkpoint as soon as it is scanned,
+    # so an interrupted run can continue with --resume
+    scan_all([(a, None) for a in groups], settings, save)
+
+    finish(args, project, checkpoint, block, onchain_state, previous_permissions)
+
+
+def read_storage(args: Namespace) -> None:
+    """Read the storage values of the contracts in the checkpoint of a previous scan again, and write the results."""
+    project = load_project(args)
+    if not os.path.exists(args.checkpoint):
+        raise FileNotFoundError(f"No checkpoint at {args.checkpoint}, run a scan first")
+    checkpoint = CheckpointStore(args.checkpoint, resume=True)
+    block, onchain_state = read_onchain_state(args, project)
+    finish(args, project, checkpoint, block, onchain_state)
+
+
+def refresh(args: Namespace) -> None:
+    """
+    Read the storage values of a finished scan again from its manifest (the storage layout of every address)
+    and the permissions.json in `args.output_dir`, without the explorer, the compiler or Slither.
+    Rewrites the results like a scan. The checkpoint of the scan is left as it is, for a later --resume.
+    """
+    manifest = load_json(args.manifest)
+    permissions = load_json(os.path.join(args.output_dir, "permissions.json"))
+    chain_name = manifest["Chain_Name"]
+    project = Namespace(
+        addresses=[a for a, entry in manifest["Contracts"].items() if entry["name"] in permissions],
+        chain_name=chain_name,
+        rpc_url=get_rpc_url(chain_name),
+    )
 
-        # list all state variables that are read
-        # the variables available in storage will be read
-        state_variables_read_inside_modifiers = [
-            v.name
-            for modifier in modifiers if modifier is not None
-            for v in modifier.all_variables_read() if v is not None and v.name
-        ]
-
-        state_variables_read_inside_function = [
-            v.name for v in function.all_state_variables_read() if v.name
-        ]
-        
-        all_state_variables_read_this_func = []
-        all_state_variables_read_this_func.extend(state_variables_read_inside_modifiers)
-        all_state_variables_read_this_func.extend(state_variables_read_inside_function)
-        all_state_variables_read_this_func = list(set(all_state_variables_read_this_func))
-
-        all_state_variables_read.extend(all_state_variables_read_this_func)
-
-        # 3) list all state variables that are written to inside this function
-        state_variables_written = [
-            v.name for v in function.all_state_variables_written() if v.name
-        ]
-
-        # 4) write everything to dict
-        temp['Functions'].append({
-            "Function": function.name,
-            "Modifiers": listOfModifiers,
-            "msg.sender_conditions": msg_sender_condition,
-            "state_variables_read": all_state_variables_read_this_func,
-            "state_variables_written": state_variables_written
-        })
-    
-    # dump to result dict
-    if isProxy and index == 0:
-        result["proxy_permissions"] = temp
-    elif isProxy and index == 1:
-        result["permissions"] = temp
-    else:
-        # is normal contract
-        result["permissions"] = temp
+    # the records are only streamed to write the results, in a checkpoint of their own
+    fd, checkpoint_path = tempfile.mkstemp(prefix=".refresh-", suffix=".jsonl", dir=args.output_dir)
+    os.close(fd)
+    try:
+        _refresh(args, project, manifest, permissions, CheckpointStore(checkpoint_path, resume=True))
+    finally:
+        os.remove(checkpoint_path)
+
+
+def _refresh(args: Namespace, project: Namespace, manifest: dict, permissions: dict, checkpoint: CheckpointStore) -> None:
+    for contract_address in project.addresses:
+        checkpoint.append(contract_address, unchanged_record(contract_address, manifest, permissions))
 
-def main():
+    block, onchain_state = read_onchain_state(args, project)
+
+    # the layout of a contract whose code or implementation changed may be wrong, its values are still read,
+    # but the manifest keeps the state it was analysed with, so that the next scan with --previous analyses it again
+    changed = set(project.addresses) - set(find_unchanged(manifest, permissions, onchain_state, {
+        a: entry["implementation"] for a, entry in manifest["Contracts"].items()
+    }))
+    for contract_address in project.addresses:
+        if contract_address in changed:
+            entry = manifest["Contracts"][contract_address]
+            onchain_state[contract_address.lower()] = {"code_hash": entry["code_hash"], "implementation": entry["implementation_slot"]}
+            print(f"\033[33m{entry['name']} at {contract_address} changed since the scan at block {manifest['Block_Number']}, scan it again for an up to date layout\033[0m")
+
+    finish(args, project, checkpoint, block, onchain_state)
+    print(f"Refreshed {len(project.addresses)} contracts at block {block}")
+
+
+def run(command: Callable[[Namespace], None], argv: Optional[List[str]] = None) -> None:
     load_dotenv()  # Load environment variables from .env file
+    args = init_scanner_args(argv)
+    command(args)
+    print_summary()
+    if args.trace:
+        write_trace(args.trace)
 
-    # load contracts from json
-    config_json = load_config_from_file("contracts.json")
-    
-    contracts_addresses = config_json["Contracts"]
-    contract_data_for_markdown = []
-    project_name = config_json["Project_Name"]
-    chain_name = config_json["Chain_Name"]
-    
-    rpc_url = get_rpc_url(chain_name)
-    platform_key = get_etherscan_url()
-
-    result = {}
-
-    # instantiate slither rpc class
-    rpc_info = RpcInfo(rpc_url, "latest")
-
-    for contract_address in contracts_addresses:
-        contract_result = fetch_contract_metadata(address=contract_address, apikey=platform_key, chainid=get_chain_id(chain_name))
-        contract_name = contract_result["ContractName"]
-        isProxy = contract_result["Proxy"] == 1
-        implementation_address = contract_result["Implementation"]
-        implementation_name = ""
-        contract_data_for_markdown.append({"name": contract_name, "address": contract_address})
-        
-        if isProxy and implementation_address:
-            if not isinstance(implementation_address, str) or not is_valid_eth_address(implementation_address):
-                raise ValueError(f"Invalid implementation address for proxy: {implementation_address}")
-            try:
-                implementation_result = fetch_contract_metadata(
-                    address=implementation_address,
-                    apikey=platform_key,
-                    chainid=get_chain_id(chain_name)
-                )
-                implementation_name = implementation_result.get("ContractName") or ""
-                contract_data_for_markdown.append({"name": implementation_name, "address": implementation_address})
-            except Exception as e:
-                raise f"Failed to get Implementation contract from Etherscan. \n\n\n  + {e}"
-        
-
-        target_storage_vars = [] # target storage variables of this contract
-        temp_global = {}
-
-        # setup args for slither
-        args = init_args(project_name, contract_address, chain_name, rpc_url, platform_key, contract_name)
-        target = args.contract_source
-        
-        try:
-            slither = Slither(target, **vars(args))
-        except urllib.error.HTTPError as e:
-            print(f"\033[33mFailed to compile contract at {contract_address} due to HTTP error: {e}\033[0m")
-            continue  # Skip this contract and move to the next one
-        except Exception as e:
-            print(f"\033[33mAn error occurred while analyzing {contract_address}: {e}\033[0m")
-            continue
 
-        # retrieved contracts from the address (inherited and interacted contracts)
-        contracts = slither.contracts
-
-        # only take the one contract that is in the key
-        # this filters out interacted contracts (we dont need the permissions of them)
-        # does not exclude inherited contracts
-        target_contract = [contract for contract in contracts if contract.name == contract_name]
-
-        if len(target_contract) == 0:
-            raise Exception(f"\033[31m\n \nThe contract name supplied in contract.json does not match any of the found contract names for this address: {contract_address}\033[0m")
-        
-        srs = SlitherReadStorage(target_contract, args.max_depth, rpc_info)
-        srs.unstructured = False
-        # Remove target prefix "mainnet:" e.g. mainnet:0x0 -> 0x0.
-        address = target[target.find(":") + 1 :]
-        srs.storage_address = address
-
-        if isProxy:
-            # step 1: create slither object again, but with implementation address
-            #    -> run analysis of storage layout and permissions of implementation address
-            # step 2: read storage from proxy contract (location of storage) contract_address["address"]
-
-            # scan the implementation address
-            slither = Slither(f'{chain_name}:{implementation_address}', **vars(args))
-            
-            # get all the instantiated contracts (includes also interacted contracts) from the implementation contract
-            implementation_contracts = slither.contracts_derived
-
-            # find the instantiated/main implementation contract
-            
-            target_contract.extend([contract for contract in implementation_contracts if contract.name == implementation_name])
-            if len(target_contract) == 1:
-                raise Exception(f"\033[31m\n \nThe implementation name supplied in contract.json does not match any of the found implementation contract names for this address: {contract_address['address']}\033[0m")
-            temp_global["Implementation_Address"] = implementation_address
-            temp_global["Proxy_Address"] = contract_address
-
-        if not isProxy:
-            temp_global["Address"] = contract_address
-
-        # end setup
-        ##################################################
-        ##################################################
-        ##################################################
-
-        ##################################################
-        ##################################################
-        ##################################################
-        # start analysis
-
-
-        # start analysis of main contract (can be proxy, then also the implementation contract is analysed)
-        for i, contract in enumerate(target_contract):
-            # get permissions and store inside target_storage_vars
-            get_permissions(contract, temp_global, target_storage_vars, isProxy, i)
-
-        target_storage_vars = list(set(target_storage_vars)) # remove duplicates
-
-        # Three steps to retrieve storage variables with slither
-        # 1. set target variables
-        # 2. compute storage keys
-        # 3. retrieve slots from the keys
-
-        # sets target variables
-        # adapted logic, extracted from method `get_all_storage_variables` of SlitherReadStorage class
-        for contract in srs._contracts:
-            for var in contract.state_variables_ordered:
-                if var.name in target_storage_vars:
-                    # achieve step 1.
-                    srs._target_variables.append((contract, var))
-                
-                # add all constant and immutable variable to a list to do the required look-up
-                if not var.is_stored:
-                    
-                    # functionData is a dict
-                    for functionData in temp_global["permissions"]["Functions"]:
-                        # check if e.g storage variable owner is part of this function 
-                        if var.name in functionData["state_variables_read"]:
-                            # check if already added some constants/immutables
-
-                            # Ensure key exists
-                            if "immutables_and_constants" not in functionData:
-                                functionData["immutables_and_constants"] = []
-                            
-                            # Check if the variable has an expression and is not the proxy marker
-                            if var.expression and str(var.expression) != "0x360894a13ba1a3210667c828492db98dca3e2076cc3735a920a3ca505d382bbc":
-                                try:
-                                    raw_value = get_storage_data(
-                                        srs.rpc_info.web3, contract_address, 
-                                        str(var.expression), srs.rpc_info.block
-                                    )
-                                    value = srs.convert_value_to_type(raw_value, 160, 0, "address")
-                                    functionData["immutables_and_constants"].append(
-                                        {"name": var.name, "slot": str(var.expression), "value": value}
-                                    )
-                                except Exception:
-                                    functionData["immutables_and_constants"].append(
-                                        {"name": var.name, "slot": str(var.expression)}
-                                    )
-                            else:
-                                functionData["immutables_and_constants"].append({"name": var.name})
-
-        # step 2. computes storage keys for target variables 
-        srs.get_target_variables()
-
-        # step 3. get the values of the target variables and their slots
-        try:
-            srs.walk_slot_info(srs.get_slot_values)
-        except urllib.error.HTTPError as e:
-            print(f"\033[33mFailed to fetch storage from contract at {contract_address} due to HTTP error: {e}\033[0m")
-            continue  # Skip this contract and move to the next one
-        except Exception as e:
-            print(f"\033[33mAn error occurred while fetching storage slots from contract {contract_address}: {e}\033[0m")
-            continue
-        
-        storageValues = {}
-        # merge storage retrieval with contracts
-        for key, value in srs.slot_info.items():
-            contractDict = temp_global["permissions"]
-            storageValues[value.name] = value.value
-            # contractDict["Functions"] is a list, functionData a dict
-            for functionData in contractDict["Functions"]:
-                # check if e.g storage variable owner is part of this function 
-                if value.name in functionData["state_variables_read"]:
-                    # if so, add a key value pair to the functionData object, to improve readability of report
-                    functionData[value.name] = value.value
-
-        if len(storageValues.values()):
-            contractDict["storage_values"] = storageValues
-    
-        if len(implementation_name) > 0:
-            result[implementation_name] = temp_global
-        else:
-            result[contract_name] = temp_global
-
-    with open("permissions.json","w") as file:
-        json.dump(result, file, indent=4)
-
-    content = generate_full_markdown("", contract_data_for_markdown, result)
-
-    with open("markdown.md", "w") as file:
-        file.write(content)
-
-
-main()
+def fetch_main(argv: Optional[List[str]] = None) -> None:
+    run(fetch, argv)
+
+
+def read_storage_main(argv: Optional[List[str]] = None) -> None:
+    run(read_storage, argv)
+
+
+def refresh_main(argv: Optional[List[str]] = None) -> None:
+    run(refresh, argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    run(scan, argv)
+
+
+if __name__ == "__main__":
+    main()
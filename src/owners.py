@@ -0,0 +1,237 @@
+import re
+import asyncio
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from eth_abi import decode
+from eth_utils import to_checksum_address
+
+from rpc import JsonRpcClient, parse_slot, decode_storage_value, DEFAULT_BATCH_SIZE, DEFAULT_CONCURRENCY
+
+DEFAULT_OWNER_DEPTH = 3
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+# view functions probed on every owner contract, all in one batch
+PROBES = {
+    "getThreshold": "0xe75235b8",  # Safe
+    "getOwners": "0xa0e67e2b",  # Safe
+    "getMinDelay": "0xf27a0c92",  # OpenZeppelin TimelockController
+    "delay": "0x6a42b8f8",  # Compound Timelock
+    "admin": "0xf851a440",  # Compound Timelock
+    "owner": "0x8da5cb5b",  # Ownable
+}
+
+
+def _decode(types: List[str], result) -> Optional[tuple]:
+    """ABI decode an eth_call result, None if the call failed or did not return the expected data."""
+    if not isinstance(result, str) or len(result) <= 2:
+        return None
+    try:
+        return decode(types, bytes.fromhex(result[2:]))
+    except Exception:
+        return None
+
+
+def classify(address: str, code, probes: Dict[str, object]) -> dict:
+    """Kind of an owner from its code and the results of the probe calls, with the addresses it is controlled by."""
+    info = {"address": to_checksum_address(address)}
+    if isinstance(code, str) and code in ("0x", "0x0", ""):
+        info["type"] = "EOA"
+        return info
+
+    threshold = _decode(["uint256"], probes["getThreshold"])
+    owners = _decode(["address[]"], probes["getOwners"])
+    if threshold is not None and owners is not None:
+        info.update(type="Safe", threshold=threshold[0], owners=[to_checksum_address(o) for o in owners[0]])
+        return info
+
+    min_delay = _decode(["uint256"], probes["getMinDelay"])
+    if min_delay is not None:
+        info.update(type="Timelock", min_delay=min_delay[0])
+        return info
+
+    delay = _decode(["uint256"], probes["delay"])
+    admin = _decode(["address"], probes["admin"])
+    if delay is not None and admin is not None:
+        info.update(type="Timelock", min_delay=delay[0], admin=to_checksum_address(admin[0]))
+        return info
+
+    owner = _decode(["address"], probes["owner"])
+    if owner is not None:
+        info.update(type="Ownable", owner=to_checksum_address(owner[0]))
+        return info
+
+    info["type"] = "Contract"
+    return info
+
+
+def _controllers(info: dict) -> List[str]:
+    """Addresses controlling an owner, resolved at the next depth."""
+    return info.get("owners", []) + [info[key] for key in ["admin", "owner"] if key in info]
+
+
+def _format_delay(seconds: int) -> str:
+    for unit, length in [("d", 86400), ("h", 3600), ("m", 60)]:
+        if seconds >= length and seconds % length == 0:
+            return f"{seconds // length}{unit}"
+    return f"{seconds}s"
+
+
+def label(info: dict) -> str:
+    """Short description of an owner for the report, e.g. "Safe 3/5" or "Timelock 2d"."""
+    if info["type"] == "Safe":
+        return f"Safe {info['threshold']}/{len(info['owners'])}"
+    if info["type"] == "Timelock":
+        return f"Timelock {_format_delay(info['min_delay'])}"
+    return info["type"]
+
+
+class OwnerResolver:
+    """
+    Classifies owner addresses as EOA, Safe, Timelock, Ownable or other contract, following the addresses
+    controlling them (Safe owners, timelock admin, owner) up to `depth` levels.
+    Every level is probed with one batch of eth_getCode and eth_call at `block`, and every address is probed
+    only once per run, however many contracts it owns.
+    """
+
+    def __init__(self, rpc_url: str, block: int, depth: int = DEFAULT_OWNER_DEPTH, batch_size: int = DEFAULT_BATCH_SIZE, concurrency: int = DEFAULT_CONCURRENCY):
+        self.rpc_url = rpc_url
+        self.block = block
+        self.depth = depth
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        # lowercase address -> classification
+        self.resolved: Dict[str, dict] = {}
+
+    def resolve(self, addresses: Iterable[str]) -> Dict[str, dict]:
+        asyncio.run(self._resolve(list(addresses)))
+        return self.resolved
+
+    async def _resolve(self, addresses: List[str]) -> None:
+        async with JsonRpcClient(self.rpc_url, self.batch_size, self.concurrency) as client:
+            level = addresses
+            for _ in range(self.depth):
+                level = [
+                    a for a in dict.fromkeys(a.lower() for a in level)
+                    if a not in self.resolved and a != ZERO_ADDRESS
+                ]
+                if not level:
+                    break
+                await self._probe(client, level)
+                level = [c for a in level for c in _controllers(self.resolved[a])]
+
+    async def _probe(self, client: JsonRpcClient, addresses: List[str]) -> None:
+        block = hex(self.block)
+        calls = []
+        for address in addresses:
+            target = to_checksum_address(address)
+            calls.append(("eth_getCode", [target, block]))
+            calls += [("eth_call", [{"to": target, "data": data}, block]) for data in PROBES.values()]
+
+        results = await client.batch(calls)
+        step = len(PROBES) + 1
+        for i, address in enumerate(addresses):
+            code = results[i * step]
+            if isinstance(code, Exception):
+                print(f"\033[33mFailed to read the code of owner {address}: {code}\033[0m")
+                continue
+            probes = dict(zip(PROBES, results[i * step + 1:(i + 1) * step]))
+            self.resolved[address] = classify(address, code, probes)
+
+    def tree(self, address: str, depth: Optional[int] = None) -> Optional[dict]:
+        """Classification of an address, with the addresses controlling it replaced by their own classification."""
+        depth = self.depth if depth is None else depth
+        info = self.resolved.get(address.lower())
+        if info is None or depth <= 0:
+            return None
+        info = dict(info)
+        for key in ["admin", "owner"]:
+            if key in info:
+                info[key] = self.tree(info[key], depth - 1) or info[key]
+        if "owners" in info:
+            info["owners"] = [self.tree(o, depth - 1) or o for o in info["owners"]]
+        return info
+
+
+def _is_address_slot(slot_info: dict) -> bool:
+    # contract typed variables (e.g. `IERC20 token`) are stored as addresses too
+    return slot_info["size"] == 160 and "int" not in slot_info["type"]
+
+
+def caller_variables(functionData: dict) -> List[str]:
+    """
+    Variables a permissioned function checks the caller against, the candidates for its owners.
+    Other variables it reads (tokens, oracles, routers) are not owners.
+    """
+    if "msg.sender_variables" in functionData:
+        return functionData["msg.sender_variables"]
+    # permissions.json of scans before the variables were recorded: the variables named in the conditions
+    names = functionData.get("state_variables_read", []) + [c["name"] for c in functionData.get("immutables_and_constants", [])]
+    conditions = " ".join(functionData.get("msg.sender_conditions", []))
+    return [name for name in names if re.search(rf"\b{re.escape(name)}\b", conditions)]
+
+
+def _caller_variables_of(permissions: dict) -> set:
+    return {
+        var
+        for key in ["proxy_permissions", "permissions"] if key in permissions
+        for functionData in permissions[key]["Functions"]
+        for var in caller_variables(functionData)
+    }
+
+
+def owner_addresses(scanned: dict, values: Dict[Tuple[str, int], bytes], immutable_values: Optional[Dict[Tuple[str, str], object]] = None) -> List[str]:
+    """
+    Addresses stored in the variables the caller is checked against, i.e. the candidates for owners:
+    storage slots, constants holding a slot and immutables (from `read_immutable_values`).
+    """
+    storage = scanned["storage"]
+    if storage is None:
+        return []
+    address = storage["address"].lower()
+    owner_variables = _caller_variables_of(scanned["permissions"])
+    found = []
+    for slot_info in storage["slots"]:
+        raw = values.get((address, slot_info["slot"]))
+        if raw is not None and _is_address_slot(slot_info) and slot_info["name"] in owner_variables:
+            found.append(decode_storage_value(raw, 160, slot_info["offset"], "address"))
+    for functionData in scanned["permissions"]["permissions"]["Functions"]:
+        for constant in functionData.get("immutables_and_constants", []):
+            slot = parse_slot(constant.get("slot", ""))
+            if slot is not None and (address, slot) in values and constant["name"] in owner_variables:
+                found.append(decode_storage_value(values[(address, slot)], 160, 0, "address"))
+    for immutable in storage.get("immutables", []):
+        value = (immutable_values or {}).get((immutable["address"].lower(), immutable["name"]))
+        if isinstance(value, str) and _is_address_slot(immutable) and immutable["name"] in owner_variables:
+            found.append(value)
+    return list(dict.fromkeys(found))
+
+
+def annotate_owners(temp_global: dict, resolver: OwnerResolver) -> None:
+    """
+    Add the classification of the owners to the permissions of a contract, after `apply_storage_values`:
+    `Owners` maps each owner variable to its resolution, and each function lists its owners in `owners`,
+    the resolved values of the variables it checks the caller against.
+    """
+    owners = {}
+    for key in ["proxy_permissions", "permissions"]:
+        if key not in temp_global:
+            continue
+        for functionData in temp_global[key]["Functions"]:
+            checked = caller_variables(functionData)
+            values = {var: functionData.get(var) for var in functionData.get("state_variables_read", []) if var in checked}
+            values.update({c["name"]: c.get("value") for c in functionData.get("immutables_and_constants", []) if c["name"] in checked})
+
+            function_owners = []
+            for var, value in values.items():
+                if not isinstance(value, str) or value.lower() not in resolver.resolved:
+                    continue
+                if var not in owners:
+                    owners[var] = resolver.tree(value)
+                info = resolver.resolved[value.lower()]
+                function_owners.append({"name": var, "address": info["address"], "type": info["type"], "label": label(info)})
+            if function_owners:
+                functionData["owners"] = function_owners
+
+    if owners:
+        temp_global["Owners"] = owners
@@ -1,12 +1,26 @@
-from crytic_compile import cryticparser
-from argparse import ArgumentParser, Namespace
+import os
+from argparse import ArgumentParser, ArgumentTypeError, Namespace
+from typing import List, Optional, Tuple
 
+from cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_SIZE, DEFAULT_METADATA_TTL
+from etherscan import API_TIERS
+from checkpoint import DEFAULT_CHECKPOINT
+from incremental import DEFAULT_MANIFEST, DEFAULT_DIFF
+from rpc import DEFAULT_BATCH_SIZE, DEFAULT_CONCURRENCY
+from owners import DEFAULT_OWNER_DEPTH
+from access_control import DEFAULT_CHUNK_SIZE
+from report import REPORT_FILES
 
-def init_args(project_name: str, contract_address: str, chain_name: str, rpc_url: str, platform_key: str, contract_name: str) -> Namespace:
+DEFAULT_TRIAGE_REPORT = "triage.json"
+
+
+def init_args(project_name: str, contract_address: str, chain_name: str, rpc_url: str, platform_key: str, contract_name: str, argv: Optional[List[str]] = None) -> Namespace:
     """Parse the underlying arguments for the program.
+    `argv` are extra crytic-compile flags (e.g. --solc-args), the command line is not read.
     Returns:
         The arguments for the program.
     """
+    from crytic_compile import cryticparser
 
     # create a ArgumentParser for cryticparser.init
     parser = ArgumentParser(
@@ -39,4 +53,110 @@ def init_args(project_name: str, contract_address: str, chain_name: str, rpc_url
     # requires a ArgumentParser instance
     cryticparser.init(parser)
 
-    return parser.parse_args()
+    # the flags were checked by `crytic_compile_args`, an unknown one is an error
+    return parser.parse_args(argv or [])
+
+
+def crytic_compile_args(parser: ArgumentParser, argv: Optional[List[str]]) -> Tuple[Namespace, List[str]]:
+    """
+    Parse the scanner flags of `parser`, and keep the other flags for crytic-compile.
+    Flags crytic-compile does not know either (e.g. a misspelled scanner flag) are an error of `parser`.
+    """
+    args, crytic_args = parser.parse_known_args(argv)
+    if crytic_args:
+        # only imported when needed, crytic-compile is slow to import
+        from crytic_compile import cryticparser
+
+        crytic_parser = ArgumentParser(add_help=False)
+        cryticparser.init(crytic_parser)
+        _, unknown = crytic_parser.parse_known_args(crytic_args)
+        if unknown:
+            parser.error(f"unrecognized arguments: {' '.join(unknown)}")
+    return args, crytic_args
+
+
+def add_scan_arguments(parser: ArgumentParser) -> None:
+    """Arguments shared by a single scan and the batch mode."""
+    parser.add_argument("--offline", action="store_true", help="Run from the local cache only, without calling the block explorer")
+    parser.add_argument("--cache-dir", help="Directory of the explorer cache", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--cache-ttl", type=float, help="Seconds after which cached explorer data is fetched again (default: never)", default=None)
+    parser.add_argument("--cache-metadata-ttl", type=float, help="Seconds after which the cached proxy and implementation of a contract are fetched again", default=DEFAULT_METADATA_TTL)
+    parser.add_argument("--cache-max-size", type=int, help="Maximum size of the explorer cache in MB", default=DEFAULT_MAX_SIZE // (1024 * 1024))
+    parser.add_argument("--invalidate-cache", action="store_true", help="Drop the cached explorer data of the configured chain before scanning")
+    parser.add_argument("--no-compilation-cache", action="store_true", help="Always compile the contracts, instead of loading unchanged ones from the previous compilation")
+    parser.add_argument("--etherscan-tier", choices=API_TIERS.keys(), help="Etherscan api plan, sets the maximum request rate", default="free")
+    parser.add_argument("--rpc-batch-size", type=int, help="Number of storage reads per JSON-RPC batch request", default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--rpc-concurrency", type=int, help="Number of JSON-RPC batch requests in flight", default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--resume", action="store_true", help="Continue an interrupted scan, skipping the contracts already in the checkpoint")
+    parser.add_argument("--jobs", "-j", type=int, help="Number of contracts to scan in parallel worker processes", default=1)
+    parser.add_argument("--solc-mirror", help="Directory or url mirroring binaries.soliditylang.org, to install the compilers from (default: solc-select)")
+    parser.add_argument("--owner-depth", type=int, help="Levels of owners to resolve (owners of a Safe, admin of a timelock, ...), 0 to skip", default=DEFAULT_OWNER_DEPTH)
+    parser.add_argument("--triage", choices=["off", "skip", "defer"], help="Look for access control patterns in the sources first, and skip the contracts without any, or analyse them last", default="off")
+    parser.add_argument("--no-roles", action="store_true", help="Do not read the members of AccessControl roles from the role logs")
+    parser.add_argument("--roles-from-block", type=int, help="First block of the role logs of contracts without a role cursor yet", default=0)
+    parser.add_argument("--logs-chunk-size", type=int, help="Initial number of blocks per eth_getLogs request, adapted to what the rpc accepts", default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--trace", help="Export the duration of every stage and request to this file, in Chrome trace-event format")
+    parser.add_argument("--report-format", nargs="+", choices=REPORT_FILES.keys(), help="Formats of the report written next to permissions.json (markdown.md, permissions.csv, ...)", default=["markdown"])
+
+
+def init_scanner_args(argv: Optional[List[str]] = None) -> Namespace:
+    """Parse the arguments of the permission scanner itself, from `argv` or the command line.
+    Flags of crytic-compile (e.g. --solc-remaps) are kept in `crytic_args` and passed on to it, any other flag is an error.
+    Returns:
+        The arguments for the scanner.
+    """
+    parser = ArgumentParser(
+        description="Scan a set of deployed contracts for permissioned functions",
+        usage=("\nProvide secrets in env file\n"),
+    )
+
+    add_scan_arguments(parser)
+    parser.add_argument("--config", help="Project to scan: chain, project name and contract addresses", default="contracts.json")
+    parser.add_argument("--checkpoint", help="File where each scanned contract is saved as soon as it is done", default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--previous", help="permissions.json of a previous scan, only contracts changed since then are analysed again")
+    parser.add_argument("--output-dir", help="Directory of permissions.json and the reports, read by refresh (e.g. results/{Project_Name} of a batch)", default=".")
+    parser.add_argument("--manifest", help=f"Manifest of code hashes and implementations, written by every scan and read with --previous (default: {DEFAULT_MANIFEST} in --output-dir)")
+    parser.add_argument("--diff", help=f"Where to write the differences to the --previous scan (default: {DEFAULT_DIFF} in --output-dir)")
+    parser.add_argument("--triage-report", help="Where to write the triage decision of every contract", default=DEFAULT_TRIAGE_REPORT)
+    parser.add_argument("--block", type=int, help="Read the storage, immutables, roles and owners at this block instead of the latest one. Requires an archive node for old blocks.")
+
+    args, crytic_args = crytic_compile_args(parser, argv)
+    args.crytic_args = crytic_args
+    args.manifest = args.manifest or os.path.join(args.output_dir, DEFAULT_MANIFEST)
+    args.diff = args.diff or os.path.join(args.output_dir, DEFAULT_DIFF)
+    return args
+
+
+def parse_chain_limit(value: str) -> tuple:
+    chain_name, _, limit = value.partition("=")
+    if not limit.isdigit():
+        raise ArgumentTypeError(f"Expected CHAIN=N, got {value}")
+    return chain_name, int(limit)
+
+
+def init_batch_args(argv: Optional[List[str]] = None) -> Namespace:
+    """Parse the arguments of the batch mode, from `argv` or the command line.
+    Returns:
+        The arguments for the batch of projects.
+    """
+    parser = ArgumentParser(
+        description="Scan several projects (contracts.json style configs) in one run, sharing caches and clients",
+        usage=("\nProvide secrets in env file\n"),
+    )
+
+    parser.add_argument("projects", nargs="+", help="Project configs, or directories of project configs (*.json)")
+    add_scan_arguments(parser)
+    parser.add_argument("--results-dir", help="Directory of the per project outputs, results/{Project_Name}", default="results")
+    parser.add_argument(
+        "--chain-rpc-concurrency",
+        type=parse_chain_limit,
+        action="append",
+        default=[],
+        metavar="CHAIN=N",
+        help="JSON-RPC batch requests in flight for one chain (e.g. mainnet=8), overrides --rpc-concurrency, can be repeated"
+    )
+
+    args, crytic_args = crytic_compile_args(parser, argv)
+    args.crytic_args = crytic_args
+    args.chain_rpc_concurrency = dict(args.chain_rpc_concurrency)
+    return args
@@ -0,0 +1,151 @@
+from typing import Dict, List, NamedTuple, Tuple
+
+from slither.core.declarations.function import Function
+
+
+class FunctionSummary(NamedTuple):
+    """What a function does, including everything it calls (internal calls, library calls and modifiers)."""
+    # modifiers applied anywhere in the call graph, can also be contracts for base constructor calls
+    modifiers: Tuple
+    # expressions of the conditions on msg.sender, deduplicated, in call graph order
+    msg_sender_conditions: Tuple[str, ...]
+    # names of all variables read (state, local and solidity variables)
+    variables_read: Tuple[str, ...]
+    # names of the state variables read
+    state_variables_read: Tuple[str, ...]
+    # names of the state variables the caller is checked against, read by the conditions on msg.sender or _msgSender(),
+    # also through the functions called in the condition (e.g. `owner()` in `require(owner() == _msgSender())`)
+    caller_variables: Tuple[str, ...]
+
+
+# context functions returning the caller (OpenZeppelin Context, ERC-2771), what they read is not an owner
+CALLER_FUNCTIONS = ["_msgSender", "msgSender"]
+
+
+def _checks_caller(node) -> bool:
+    if not (node.contains_if() or node.contains_require_or_assert()):
+        return False
+    if "msg.sender" in [v.name for v in node.solidity_variables_read]:
+        return True
+    return any(isinstance(c, Function) and c.name in CALLER_FUNCTIONS for c in node.internal_calls)
+
+
+def _caller_variables(function: Function) -> List[str]:
+    names = []
+    for node in function.nodes:
+        if not _checks_caller(node):
+            continue
+        names += [v.name for v in node.state_variables_read if v.name]
+        for callee in node.internal_calls:
+            if isinstance(callee, Function) and callee.name not in CALLER_FUNCTIONS:
+                names += [v.name for v in callee.all_state_variables_read() if v.name]
+    return names
+
+
+def _local_summary(function: Function) -> FunctionSummary:
+    """Summary of the function body alone, without its callees."""
+    msg_sender_conditions = [
+        str(n.expression)
+        for n in function.nodes
+        if (n.contains_if() or n.contains_require_or_assert())
+        and "msg.sender" in [v.name for v in n.solidity_variables_read]
+    ]
+    return FunctionSummary(
+        modifiers=tuple(function.modifiers),
+        msg_sender_conditions=tuple(dict.fromkeys(msg_sender_conditions)),
+        variables_read=tuple(dict.fromkeys(v.name for v in function.variables_read if v is not None and v.name)),
+        state_variables_read=tuple(dict.fromkeys(v.name for v in function.state_variables_read if v.name)),
+        caller_variables=tuple(dict.fromkeys(_caller_variables(function))),
+    )
+
+
+def _callees(function: Function) -> List[Function]:
+    callees = [c for c in function.internal_calls if isinstance(c, Function)]
+    # library calls are (library, function) pairs
+    callees += [f for (_, f) in function.library_calls if isinstance(f, Function)]
+    callees += [m for m in function.modifiers if isinstance(m, Function)]
+    return list(dict.fromkeys(callees))
+
+
+def _merge(summaries: List[FunctionSummary]) -> FunctionSummary:
+    return FunctionSummary(*[
+        tuple(dict.fromkeys(item for s in summaries for item in s[field]))
+        for field in range(len(FunctionSummary._fields))
+    ])
+
+
+class PermissionIndex:
+    """
+    Per compilation index of function summaries.
+    Every function body is looked at once; summaries are composed bottom-up over the call graph
+    (strongly connected components for recursion) and memoized, so functions sharing internal
+    helpers do not walk them again.
+    """
+
+    def __init__(self):
+        self._summaries: Dict[Function, FunctionSummary] = {}
+
+    def summary(self, function: Function) -> FunctionSummary:
+        if function not in self._summaries:
+            self._build(function)
+        return self._summaries[function]
+
+    def variables_read_by(self, functions) -> List[str]:
+        """Names of the variables read by the given functions (e.g. modifiers) and their callees."""
+        return list(dict.fromkeys(
+            name
+            for f in functions if isinstance(f, Function)
+            for name in self.summary(f).variables_read
+        ))
+
+    def _build(self, root: Function) -> None:
+        # iterative Tarjan, components are completed callees first
+        index: Dict[Function, int] = {}
+        lowlink: Dict[Function, int] = {}
+        stack: List[Function] = []
+        on_stack = set()
+        work = [(root, iter(_callees(root)))]
+        index[root] = lowlink[root] = 0
+        stack.append(root)
+        on_stack.add(root)
+
+        while work:
+            function, callees = work[-1]
+            callee = next(callees, None)
+            if callee is not None:
+                if callee in self._summaries:
+                    continue
+                if callee not in index:
+                    index[callee] = lowlink[callee] = len(index)
+                    stack.append(callee)
+                    on_stack.add(callee)
+                    work.append((callee, iter(_callees(callee))))
+                elif callee in on_stack:
+                    lowlink[function] = min(lowlink[function], index[callee])
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[function])
+
+            if lowlink[function] == index[function]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == function:
+                        break
+                self._summarize_component(component)
+
+    def _summarize_component(self, component: List[Function]) -> None:
+        members = set(component)
+        # keep the order of the call graph: the function itself first, then its callees
+        component.reverse()
+        summaries = [_local_summary(f) for f in component]
+        for f in component:
+            summaries += [self._summaries[c] for c in _callees(f) if c not in members]
+        summary = _merge(summaries)
+        for f in component:
+            self._summaries[f] = summary
@@ -0,0 +1,193 @@
+import csv
+import sys
+import json
+import html
+from abc import ABC, abstractmethod
+from argparse import ArgumentParser, Namespace
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# file written for each format by a scan, markdown.md is the report template for defiscan
+REPORT_FILES = {
+    "markdown": "markdown.md",
+    "csv": "permissions.csv",
+    "html": "permissions.html",
+    "jsonl": "permissions.jsonl",
+}
+
+PERMISSION_COLUMNS = ["contract", "address", "function", "impact", "owner"]
+
+
+def get_owner(permissioned_function: dict) -> str:
+    """
+    Owner column of a function: the resolved owners (e.g. 0x... (Safe 3/5)), else the members of its roles
+    (e.g. MINTER_ROLE: 0x... (EOA)), else `_owner`, else the modifiers
+    """
+    if "owners" in permissioned_function:
+        return ", ".join(f"{o['address']} ({o['label']})" for o in permissioned_function["owners"])
+    if "roles" in permissioned_function:
+        return "; ".join(
+            f"{role['name']}: " + ", ".join(f"{m['address']} ({m['label']})" if "label" in m else m["address"] for m in role["members"])
+            for role in permissioned_function["roles"]
+        )
+    try:
+        return permissioned_function['_owner']
+    except KeyError:
+        # no simple owner found
+        return permissioned_function['Modifiers']
+
+
+def _sections(entries: dict) -> Iterator[Tuple[dict, str]]:
+    # the proxy itself first, then the normal contract or the implementation contract
+    if "proxy_permissions" in entries:
+        yield entries["proxy_permissions"], entries.get("Proxy_Address")
+        yield entries["permissions"], entries.get("Implementation_Address")
+    else:
+        yield entries["permissions"], entries.get("Address")
+
+
+def contract_rows(permissions_items: Iterable[Tuple[str, dict]]) -> Iterator[dict]:
+    """Name and address of every contract of permissions.json entries, for reports regenerated without the scan."""
+    for _, entries in permissions_items:
+        for section, address in _sections(entries):
+            yield {"name": section["Contract_Name"], "address": address}
+
+
+def permission_rows(permissions_items: Iterable[Tuple[str, dict]]) -> Iterator[dict]:
+    """One row per permissioned function, streamed from (contract, entries) pairs, e.g. a generator over a checkpoint."""
+    for _, entries in permissions_items:
+        for section, address in _sections(entries):
+            for permissioned_function in section["Functions"]:
+                yield {
+                    "contract": section["Contract_Name"],
+                    "address": address,
+                    "function": permissioned_function["Function"],
+                    "impact": "...",
+                    "owner": get_owner(permissioned_function),
+                }
+
+
+class ReportWriter(ABC):
+    """Writes the contracts and then the permissions of a report to `file`, one row at a time."""
+
+    def __init__(self, file):
+        self.file = file
+
+    @abstractmethod
+    def write_contracts(self, rows: Iterable[dict]) -> None:
+        ...
+
+    @abstractmethod
+    def write_permissions(self, rows: Iterable[dict]) -> None:
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class MarkdownWriter(ReportWriter):
+    def write_contracts(self, rows: Iterable[dict]) -> None:
+        self.file.write("## Contracts\n| Contract Name | Address |\n")
+        self.file.write("|--------------|--------------|\n")
+        for row in rows:
+            self.file.write(f"| {row['name']} | {row['address']} |\n")
+
+    def write_permissions(self, rows: Iterable[dict]) -> None:
+        self.file.write("\n\n## Permission\n| Contract | Function | Impact | Owner |\n")
+        self.file.write("|-------------|------------|-------------------------|-------------------|\n")
+        for row in rows:
+            self.file.write(f"| {row['contract']} | {row['function']} | {row['impact']} | {row['owner']} |\n")
+
+
+class CsvWriter(ReportWriter):
+    """Only the permissions, the contracts are in their address column."""
+
+    def write_contracts(self, rows: Iterable[dict]) -> None:
+        for _ in rows:
+            pass
+
+    def write_permissions(self, rows: Iterable[dict]) -> None:
+        writer = csv.DictWriter(self.file, fieldnames=PERMISSION_COLUMNS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({**row, "owner": _text(row["owner"])})
+
+
+class HtmlWriter(ReportWriter):
+    def __init__(self, file):
+        super().__init__(file)
+        self.file.write("<!DOCTYPE html>\n<html>\n<head><meta charset=\"utf-8\"><title>Permissions</title></head>\n<body>\n")
+
+    def _table(self, title: str, header: List[str], cells: Iterator[List[str]]) -> None:
+        self.file.write(f"<h2>{title}</h2>\n<table>\n<tr>{''.join(f'<th>{html.escape(h)}</th>' for h in header)}</tr>\n")
+        for row in cells:
+            self.file.write(f"<tr>{''.join(f'<td>{html.escape(_text(c))}</td>' for c in row)}</tr>\n")
+        self.file.write("</table>\n")
+
+    def write_contracts(self, rows: Iterable[dict]) -> None:
+        self._table("Contracts", ["Contract Name", "Address"], ([r["name"], r["address"]] for r in rows))
+
+    def write_permissions(self, rows: Iterable[dict]) -> None:
+        self._table("Permission", ["Contract", "Function", "Impact", "Owner"], ([r["contract"], r["function"], r["impact"], r["owner"]] for r in rows))
+
+    def close(self) -> None:
+        self.file.write("</body>\n</html>\n")
+
+
+class JsonlWriter(ReportWriter):
+    def write_contracts(self, rows: Iterable[dict]) -> None:
+        for row in rows:
+            self.file.write(json.dumps({"type": "contract", **row}) + "\n")
+
+    def write_permissions(self, rows: Iterable[dict]) -> None:
+        for row in rows:
+            self.file.write(json.dumps({"type": "permission", **row}) + "\n")
+
+
+WRITERS: Dict[str, type] = {
+    "markdown": MarkdownWriter,
+    "csv": CsvWriter,
+    "html": HtmlWriter,
+    "jsonl": JsonlWriter,
+}
+
+
+def _text(value) -> str:
+    # the owner falls back to the list of modifiers
+    return ", ".join(value) if isinstance(value, list) else str(value)
+
+
+def write_report(file, report_format: str, contracts: Iterable[dict], permissions_items: Iterable[Tuple[str, dict]]) -> None:
+    """Stream a report in `report_format` (see WRITERS) to `file`; memory does not grow with the number of functions."""
+    writer = WRITERS[report_format](file)
+    writer.write_contracts(contracts)
+    writer.write_permissions(permission_rows(permissions_items))
+    writer.close()
+
+
+def init_report_args(argv: Optional[List[str]] = None) -> Namespace:
+    parser = ArgumentParser(description="Regenerate the reports of a scan from its permissions.json, without scanning again")
+    parser.add_argument("permissions", help="permissions.json of a scan")
+    parser.add_argument("--format", nargs="+", choices=WRITERS.keys(), help="Formats to write", default=["markdown"])
+    parser.add_argument("--output", help="Output file, or - for stdout (default: the file of the format, e.g. markdown.md)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = init_report_args(argv)
+    with open(args.permissions, "r") as file:
+        permissions = json.load(file)
+
+    if args.output is not None and len(args.format) > 1:
+        raise ValueError("--output can only be used with a single --format")
+    for report_format in args.format:
+        path = args.output or REPORT_FILES[report_format]
+        if path == "-":
+            write_report(sys.stdout, report_format, contract_rows(permissions.items()), permissions.items())
+            continue
+        with open(path, "w", newline="" if report_format == "csv" else None) as file:
+            write_report(file, report_format, contract_rows(permissions.items()), permissions.items())
+        print(f"Wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
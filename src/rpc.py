@@ -0,0 +1,197 @@
+import time
+import random
+import asyncio
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import aiohttp
+from eth_utils import to_checksum_address, to_int, to_text
+
+from instrumentation import record_request
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_CONCURRENCY = 4
+
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5  # seconds
+BACKOFF_CAP = 8  # seconds
+
+
+class RpcError(Exception):
+    pass
+
+
+class JsonRpcClient:
+    """
+    Sends JSON-RPC calls as batch requests of at most `batch_size` calls,
+    with at most `concurrency` batches in flight. Use as `async with JsonRpcClient(...) as client:`.
+    """
+
+    def __init__(self, rpc_url: str, batch_size: int = DEFAULT_BATCH_SIZE, concurrency: int = DEFAULT_CONCURRENCY):
+        self.rpc_url = rpc_url
+        self.batch_size = batch_size
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._connections = concurrency
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self) -> "JsonRpcClient":
+        connector = aiohttp.TCPConnector(limit=self._connections)
+        self._session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=120))
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self._session.close()
+
+    async def call(self, method: str, params: list) -> Any:
+        result = (await self.batch([(method, params)]))[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def batch(self, calls: List[Tuple[str, list]]) -> List[Union[Any, RpcError]]:
+        """Run all calls, returns their results in order. A failed call yields an RpcError instead of a result."""
+        chunks = [calls[i:i + self.batch_size] for i in range(0, len(calls), self.batch_size)]
+        results = await asyncio.gather(*[self._send_chunk(chunk) for chunk in chunks])
+        return [r for chunk_results in results for r in chunk_results]
+
+    async def _send_chunk(self, calls: List[Tuple[str, list]]) -> List[Union[Any, RpcError]]:
+        payload = [
+            {"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+            for i, (method, params) in enumerate(calls)
+        ]
+        # named after the method, e.g. eth_getStorageAt, or "batch" for mixed methods
+        methods = set(method for method, _ in calls)
+        name = methods.pop() if len(methods) == 1 else "batch"
+        async with self._semaphore:
+            for attempt in range(MAX_RETRIES + 1):
+                started = time.perf_counter()
+                try:
+                    async with self._session.post(self.rpc_url, json=payload) as response:
+                        if response.status == 429 or response.status >= 500:
+                            raise RpcError(f"HTTP error {response.status}")
+                        response.raise_for_status()
+                        data = await response.json(content_type=None)
+                    record_request("rpc", name, started, "ok", calls=len(calls), attempt=attempt)
+                    break
+                except (RpcError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    record_request("rpc", name, started, type(e).__name__, calls=len(calls), attempt=attempt)
+                    if attempt == MAX_RETRIES:
+                        return [RpcError(f"Batch request failed: {e}")] * len(calls)
+                    await asyncio.sleep(random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt)))
+
+        # some nodes answer a rejected batch with a single error object
+        if not isinstance(data, list):
+            return [RpcError(f"Batch request failed: {data.get('error')}")] * len(calls)
+
+        responses = {r.get("id"): r for r in data}
+        results = []
+        for i in range(len(calls)):
+            response = responses.get(i)
+            if response is None:
+                results.append(RpcError("Missing response"))
+            elif "error" in response:
+                results.append(RpcError(str(response["error"])))
+            else:
+                results.append(response.get("result"))
+        return results
+
+
+def batch_call(rpc_url: str, calls: List[Tuple[str, list]], batch_size: int = DEFAULT_BATCH_SIZE, concurrency: int = DEFAULT_CONCURRENCY) -> List[Union[Any, RpcError]]:
+    """Blocking version of JsonRpcClient.batch, for callers outside of an event loop."""
+    async def run() -> List[Union[Any, RpcError]]:
+        async with JsonRpcClient(rpc_url, batch_size, concurrency) as client:
+            return await client.batch(calls)
+
+    return asyncio.run(run())
+
+
+def get_block_number(rpc_url: str) -> int:
+    async def fetch() -> int:
+        async with JsonRpcClient(rpc_url) as client:
+            return int(await client.call("eth_blockNumber", []), 16)
+
+    return asyncio.run(fetch())
+
+
+class StorageReader:
+    """
+    Collects the (address, slot) pairs to read for a whole scan, dedupes them,
+    and reads them with batched eth_getStorageAt calls, all at the same block.
+    """
+
+    def __init__(self, rpc_url: str, block: int, batch_size: int = DEFAULT_BATCH_SIZE, concurrency: int = DEFAULT_CONCURRENCY):
+        self.rpc_url = rpc_url
+        self.block = block
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self._slots: Dict[Tuple[str, int], None] = {}
+
+    def add(self, address: str, slot: int) -> None:
+        self._slots[(address.lower(), slot)] = None
+
+    def add_all(self, address: str, slots: Iterable[int]) -> None:
+        for slot in slots:
+            self.add(address, slot)
+
+    def read(self) -> Dict[Tuple[str, int], bytes]:
+        """Return the raw 32 bytes of every collected slot, keyed by (lowercase address, slot). Failed reads are left out."""
+        return asyncio.run(self._read())
+
+    async def _read(self) -> Dict[Tuple[str, int], bytes]:
+        keys = list(self._slots)
+        calls = [
+            ("eth_getStorageAt", [to_checksum_address(address), hex(slot), hex(self.block)])
+            for address, slot in keys
+        ]
+        async with JsonRpcClient(self.rpc_url, self.batch_size, self.concurrency) as client:
+            results = await client.batch(calls)
+
+        values = {}
+        for key, result in zip(keys, results):
+            if isinstance(result, Exception) or not isinstance(result, str):
+                print(f"\033[33mFailed to read slot {key[1]} of {key[0]}: {result}\033[0m")
+                continue
+            values[key] = bytes.fromhex(result[2:].rjust(64, "0"))
+        return values
+
+
+def parse_slot(slot: Union[int, str]) -> Optional[int]:
+    """Slot number from an int, a hex literal or a decimal literal, None if it is not a literal."""
+    if isinstance(slot, int):
+        return slot
+    try:
+        return int(slot, 16) if slot.startswith("0x") else int(slot)
+    except ValueError:
+        return None
+
+
+def decode_storage_value(hex_bytes: bytes, size: int, offset: int, type_string: str) -> Union[int, bool, str]:
+    """
+    Convert the raw 32 bytes of a slot to the value of a variable of `size` bits at `offset` bits.
+    Same conversion as SlitherReadStorage.convert_value_to_type, without having to load Slither.
+    """
+    # Account for storage packing
+    size_bytes = size // 8
+    offset_bytes = offset // 8
+    if offset_bytes == 0:
+        value = hex_bytes[-size_bytes:]
+    else:
+        value = hex_bytes[-(size_bytes + offset_bytes):-offset_bytes]
+
+    try:
+        return _coerce_type(type_string, value)
+    except ValueError:
+        return _coerce_type("int", value)
+
+
+def _coerce_type(type_string: str, value: bytes) -> Union[int, bool, str]:
+    if "int" in type_string:
+        return to_int(value)
+    if "bool" in type_string:
+        return bool(to_int(value))
+    if "string" in type_string:
+        # length * 2 is stored in lower end bits
+        length = int(int.from_bytes(value[-2:], "big") / 2)
+        return to_text(value[:length])
+    if "address" in type_string:
+        return to_checksum_address(value)
+    return value.hex()
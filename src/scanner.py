@@ -0,0 +1,462 @@
+from eth_utils import to_checksum_address
+
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from argparse import Namespace
+import urllib.error
+import json
+import re
+import os
+
+from parse import init_args
+from etherscan import fetch_contract_metadata, fetch_contract_source
+from cache import ScanCache, CompilationCache
+from instrumentation import stage
+from rpc import StorageReader, batch_call, parse_slot, decode_storage_value
+from immutables import decode_immutable
+
+if TYPE_CHECKING:
+    from slither.core.declarations.contract import Contract
+    from permission_index import PermissionIndex
+
+
+def is_valid_eth_address(address: str) -> bool:
+    return bool(re.fullmatch(r"0x[a-fA-F0-9]{40}", address))
+
+def get_permissions(contract: "Contract", result: dict, all_state_variables_read: List[str], isProxy: bool, index: int, permission_index: "PermissionIndex"):
+    
+    temp = {
+        "Contract_Name": contract.name,
+        "Functions": []
+    }
+
+    for function in contract.functions:
+        summary = permission_index.summary(function)
+
+        # 1) list all modifiers in function
+        # for output analysis
+        modifiers = summary.modifiers
+
+        listOfModifiers = sorted(set(m.name for m in modifiers))
+
+        
+        # 2) detect conditions on msg.sender
+        # in the full function scope
+        msg_sender_condition = list(summary.msg_sender_conditions)
+
+        if (len(modifiers) == 0 and len(msg_sender_condition) == 0):
+            # no permission detected
+            continue
+
+        # list all state variables that are read
+        # the variables available in storage will be read
+        state_variables_read_inside_modifiers = permission_index.variables_read_by(modifiers)
+
+        state_variables_read_inside_function = summary.state_variables_read
+        
+        all_state_variables_read_this_func = []
+        all_state_variables_read_this_func.extend(state_variables_read_inside_modifiers)
+        all_state_variables_read_this_func.extend(state_variables_read_inside_function)
+        all_state_variables_read_this_func = list(set(all_state_variables_read_this_func))
+
+        all_state_variables_read.extend(all_state_variables_read_this_func)
+
+        # 3) list all state variables that are written to inside this function
+        state_variables_written = [
+            v.name for v in function.all_state_variables_written() if v.name
+        ]
+
+        # 4) write everything to dict
+        temp['Functions'].append({
+            "Function": function.name,
+            "Modifiers": listOfModifiers,
+            "msg.sender_conditions": msg_sender_condition,
+            "state_variables_read": all_state_variables_read_this_func,
+            "state_variables_written": state_variables_written,
+            # the candidates for owners, see owners.owner_addresses
+            "msg.sender_variables": list(summary.caller_variables)
+        })
+    
+    # dump to result dict
+    if isProxy and index == 0:
+        result["proxy_permissions"] = temp
+    elif isProxy and index == 1:
+        result["permissions"] = temp
+    else:
+        # is normal contract
+        result["permissions"] = temp
+
+
+# per process state, set up once by `init_worker`
+_settings: Optional[Namespace] = None
+_cache: Optional[ScanCache] = None
+_compilation_cache: Optional[CompilationCache] = None
+
+
+def init_worker(settings: Namespace) -> None:
+    """Set up the explorer and compilation caches of the current (worker) process."""
+    global _settings, _cache, _compilation_cache
+    _settings = settings
+    _cache = ScanCache(
+        settings.cache_dir,
+        ttl=settings.cache_ttl,
+        metadata_ttl=settings.cache_metadata_ttl,
+        max_size=settings.cache_max_size * 1024 * 1024,
+        offline=settings.offline
+    )
+    if not settings.no_compilation_cache:
+        _compilation_cache = CompilationCache(
+            os.path.join(settings.cache_dir, "compilations"),
+            max_size=settings.cache_max_size * 1024 * 1024
+        )
+
+
+def scan_contract(contract_address: str, project: Optional[Namespace] = None) -> dict:
+    """
+    Analyse one configured address (and its implementation, if it is a proxy).
+    `project` (project_name, chain_name, chain_id, rpc_url, platform_key) defaults to the settings of the worker.
+    Only returns plain JSON-serializable data, so it can run in a worker process:
+        name: key of the contract in permissions.json, None if the analysis failed
+        permissions: the permissions of the contract (and its implementation)
+        contracts: name and address of the analysed contracts, for the report
+        storage: address and layout of the storage slots to read, see `read_storage_values`,
+                 and where the immutables are in the runtime code, see `read_immutable_values`
+    """
+    with stage("scan contract", contract_address) as info:
+        scanned = _scan_contract(contract_address, project or _settings)
+        if scanned["name"] is None:
+            info["outcome"] = "failed"
+    return scanned
+
+
+def _scan_contract(contract_address: str, project: Namespace) -> dict:
+    # Slither and crytic-compile take seconds to import, only the processes analysing contracts need them
+    from slither.core.declarations.contract import Contract
+    from slither.core.solidity_types import UserDefinedType
+    from slither.tools.read_storage.read_storage import SlitherReadStorage
+    from compilation import load_slither
+    from permission_index import PermissionIndex
+
+    project_name = project.project_name
+    chain_name = project.chain_name
+    chain_id = project.chain_id
+    rpc_url = project.rpc_url
+    platform_key = project.platform_key
+    cache = _cache
+
+    scanned = {"name": None, "permissions": None, "contracts": [], "storage": None}
+
+    with stage("fetch metadata", contract_address):
+        contract_result = fetch_contract_metadata(address=contract_address, apikey=platform_key, chainid=chain_id, cache=cache)
+    contract_name = contract_result["ContractName"]
+    isProxy = contract_result["Proxy"] == 1
+    implementation_address = contract_result["Implementation"]
+    implementation_name = ""
+    scanned["contracts"].append({"name": contract_name, "address": contract_address})
+
+    if isProxy and implementation_address:
+        if not isinstance(implementation_address, str) or not is_valid_eth_address(implementation_address):
+            raise ValueError(f"Invalid implementation address for proxy: {implementation_address}")
+        try:
+            with stage("fetch metadata", implementation_address):
+                implementation_result = fetch_contract_metadata(
+                    address=implementation_address,
+                    apikey=platform_key,
+                    chainid=chain_id,
+                    cache=cache
+                )
+            implementation_name = implementation_result.get("ContractName") or ""
+            scanned["contracts"].append({"name": implementation_name, "address": implementation_address})
+        except Exception as e:
+            raise RuntimeError(f"Failed to get Implementation contract from Etherscan. \n\n\n  + {e}") from e
+
+
+    target_storage_vars = [] # target storage variables of this contract
+    temp_global = {}
+
+    # setup args for slither
+    args = init_args(project_name, contract_address, chain_name, rpc_url, platform_key, contract_name, _settings.crytic_args)
+    target = args.contract_source
+
+    try:
+        # compile from the cached source bundle, crytic-compile does not need to download it again
+        slither = load_slither(target, fetch_contract_source(contract_address, platform_key, chain_id, cache), args, _compilation_cache, _settings.solc_binaries, _settings.crytic_args)
+        immutable_references = slither.immutable_references.get(contract_name, {})
+    except urllib.error.HTTPError as e:
+        print(f"\033[33mFailed to compile contract at {contract_address} due to HTTP error: {e}\033[0m")
+        return scanned  # Skip this contract, only list it in the report
+    except Exception as e:
+        print(f"\033[33mAn error occurred while analyzing {contract_address}: {e}\033[0m")
+        return scanned
+
+    # retrieved contracts from the address (inherited and interacted contracts)
+    contracts = slither.contracts
+
+    # only take the one contract that is in the key
+    # this filters out interacted contracts (we dont need the permissions of them)
+    # does not exclude inherited contracts
+    target_contract = [contract for contract in contracts if contract.name == contract_name]
+
+    if len(target_contract) == 0:
+        raise Exception(f"\033[31m\n \nThe contract name supplied in contract.json does not match any of the found contract names for this address: {contract_address}\033[0m")
+
+    # each target contract with the address whose runtime code holds its immutables, and where they are in it
+    immutable_sources = [(contract, contract_address, immutable_references) for contract in target_contract]
+
+    # only the slot computation of SlitherReadStorage is used, no rpc needed
+    srs = SlitherReadStorage(target_contract, args.max_depth)
+    srs.unstructured = False
+    # Remove target prefix "mainnet:" e.g. mainnet:0x0 -> 0x0.
+    address = target[target.find(":") + 1 :]
+    srs.storage_address = address
+
+    if isProxy:
+        # step 1: create slither object again, but with implementation address
+        #    -> run analysis of storage layout and permissions of implementation address
+        # step 2: read storage from proxy contract (location of storage) contract_address["address"]
+
+        # scan the implementation address
+        slither = load_slither(
+            f'{chain_name}:{implementation_address}',
+            fetch_contract_source(implementation_address, platform_key, chain_id, cache),
+            args,
+            _compilation_cache,
+            _settings.solc_binaries,
+            _settings.crytic_args
+        )
+
+        # get all the instantiated contracts (includes also interacted contracts) from the implementation contract
+        implementation_contracts = slither.contracts_derived
+
+        # find the instantiated/main implementation contract
+        implementation_targets = [contract for contract in implementation_contracts if contract.name == implementation_name]
+        immutable_references = slither.immutable_references.get(implementation_name, {})
+        immutable_sources.extend((contract, implementation_address, immutable_references) for contract in implementation_targets)
+
+        target_contract.extend(implementation_targets)
+        if len(implementation_targets) == 0:
+            raise Exception(f"\033[31m\n \nThe implementation name supplied in contract.json does not match any of the found implementation contract names for this address: {contract_address}\033[0m")
+        temp_global["Implementation_Address"] = implementation_address
+        temp_global["Proxy_Address"] = contract_address
+
+    if not isProxy:
+        temp_global["Address"] = contract_address
+
+    # end setup
+    ##################################################
+    ##################################################
+    ##################################################
+
+    ##################################################
+    ##################################################
+    ##################################################
+    # start analysis
+
+
+    # one index per compilation, shared by all functions of its contracts
+    permission_indexes = {}
+
+    # start analysis of main contract (can be proxy, then also the implementation contract is analysed)
+    with stage("permissions", contract_address):
+        for i, contract in enumerate(target_contract):
+            permission_index = permission_indexes.setdefault(contract.compilation_unit, PermissionIndex())
+            # get permissions and store inside target_storage_vars
+            get_permissions(contract, temp_global, target_storage_vars, isProxy, i, permission_index)
+
+    target_storage_vars = list(set(target_storage_vars)) # remove duplicates
+
+    # Three steps to retrieve storage variables with slither
+    # 1. set target variables
+    # 2. compute storage keys
+    # 3. retrieve slots from the keys
+
+    # sets target variables
+    # adapted logic, extracted from method `get_all_storage_variables` of SlitherReadStorage class
+    immutables = []
+    # srs._contracts is target_contract, every one of them is in immutable_sources
+    for contract, code_address, references in immutable_sources:
+        for var in contract.state_variables_ordered:
+            if var.name in target_storage_vars:
+                # achieve step 1.
+                srs._target_variables.append((contract, var))
+
+            # add all constant and immutable variable to a list to do the required look-up
+            if not var.is_stored:
+
+                # immutables live in the runtime code, their value is decoded from it after the scan
+                is_immutable = var.is_immutable and var.name in references
+                if is_immutable:
+                    # contract typed immutables hold an address
+                    is_contract = isinstance(var.type, UserDefinedType) and isinstance(var.type.type, Contract)
+                    immutables.append({
+                        "address": code_address,
+                        "name": var.name,
+                        "type": "address" if is_contract else str(var.type),
+                        "size": var.type.storage_size[0] * 8,
+                        "offsets": references[var.name],
+                    })
+
+                # functionData is a dict
+                for functionData in temp_global["permissions"]["Functions"]:
+                    # check if e.g storage variable owner is part of this function 
+                    if var.name in functionData["state_variables_read"]:
+                        # check if already added some constants/immutables
+
+                        # Ensure key exists
+                        if "immutables_and_constants" not in functionData:
+                            functionData["immutables_and_constants"] = []
+
+                        if is_immutable:
+                            functionData["immutables_and_constants"].append({"name": var.name, "immutable": True})
+                        # Check if the variable has an expression and is not the proxy marker
+                        elif var.expression and str(var.expression) != "0x360894a13ba1a3210667c828492db98dca3e2076cc3735a920a3ca505d382bbc":
+                            # the value is read later, together with all other slots of the scan
+                            functionData["immutables_and_constants"].append(
+                                {"name": var.name, "slot": str(var.expression)}
+                            )
+                        else:
+                            functionData["immutables_and_constants"].append({"name": var.name})
+
+    # step 2. computes storage keys for target variables 
+    with stage("storage layout", contract_address):
+        srs.get_target_variables()
+
+    # step 3. only record where the values are, they are read in batches for all contracts at once
+    scanned["storage"] = {
+        "address": address,
+        "slots": [
+            {"name": value.name, "slot": value.slot, "size": value.size, "offset": value.offset, "type": value.type_string}
+            for value in srs.slot_info.values()
+        ],
+        "immutables": immutables,
+    }
+
+    scanned["name"] = implementation_name if len(implementation_name) > 0 else contract_name
+    scanned["permissions"] = temp_global
+    return scanned
+
+
+def group_by_code(addresses: List[str], state: Dict[str, dict], implementations: Dict[str, Optional[str]]) -> Dict[str, List[str]]:
+    """
+    Group addresses with the same runtime code hash and, for proxies, the same implementation.
+    Returns the first address of each group with all addresses of the group; addresses without a code hash stay alone.
+    """
+    groups: Dict[tuple, List[str]] = {}
+    for address in addresses:
+        code_hash = state.get(address.lower(), {}).get("code_hash")
+        implementation = (implementations.get(address) or "").lower()
+        key = (code_hash, implementation) if code_hash is not None else (address,)
+        groups.setdefault(key, []).append(address)
+    return {members[0]: members for members in groups.values()}
+
+
+def scanned_for_address(scanned: dict, contract_address: str) -> dict:
+    """Copy of the scan result of a contract with the same code, for another address."""
+    scanned = json.loads(json.dumps(scanned))
+    original_address = scanned["contracts"][0]["address"]
+    scanned["contracts"][0]["address"] = contract_address
+    if scanned["storage"] is not None:
+        scanned["storage"]["address"] = contract_address
+        # the same code means the same immutables, they are still read from the code of the address itself
+        for immutable in scanned["storage"].get("immutables", []):
+            if immutable["address"] == original_address:
+                immutable["address"] = contract_address
+    permissions = scanned["permissions"]
+    if permissions is not None:
+        for key in ["Address", "Proxy_Address"]:
+            if key in permissions:
+                permissions[key] = contract_address
+    return scanned
+
+
+def read_storage_values(scanned_contracts: List[dict], rpc_url: str, block: int, batch_size: int, concurrency: int) -> Dict[Tuple[str, int], bytes]:
+    """Read the slots of all scanned contracts with deduplicated, batched calls at `block`."""
+    reader = StorageReader(rpc_url, block, batch_size, concurrency)
+    for scanned in scanned_contracts:
+        storage = scanned["storage"]
+        if storage is None:
+            continue
+        reader.add_all(storage["address"], [s["slot"] for s in storage["slots"]])
+        for functionData in scanned["permissions"]["permissions"]["Functions"]:
+            for constant in functionData.get("immutables_and_constants", []):
+                slot = parse_slot(constant.get("slot", ""))
+                if slot is not None:
+                    reader.add(storage["address"], slot)
+    return reader.read()
+
+
+def read_immutable_values(scanned_contracts: List[dict], rpc_url: str, block: int, batch_size: int, concurrency: int) -> Dict[Tuple[str, str], object]:
+    """
+    Decode the immutables of all scanned contracts from their runtime code at `block`,
+    with one eth_getCode per address however many immutables it has. Keyed by (lowercase address, name).
+    """
+    immutables = []
+    for scanned in scanned_contracts:
+        if scanned["storage"] is not None:
+            immutables.extend(scanned["storage"].get("immutables", []))
+    addresses = list(dict.fromkeys(i["address"].lower() for i in immutables))
+    results = batch_call(rpc_url, [("eth_getCode", [to_checksum_address(a), hex(block)]) for a in addresses], batch_size, concurrency)
+
+    code = {}
+    for address, result in zip(addresses, results):
+        if isinstance(result, Exception) or not isinstance(result, str):
+            print(f"\033[33mFailed to read the code of {address}: {result}\033[0m")
+            continue
+        code[address] = bytes.fromhex(result[2:])
+
+    values = {}
+    for immutable in immutables:
+        address = immutable["address"].lower()
+        if address in code:
+            values[(address, immutable["name"])] = decode_immutable(code[address], immutable["offsets"], immutable["size"], immutable["type"])
+    return values
+
+
+def apply_immutable_values(scanned: dict, values: Dict[Tuple[str, str], object]) -> None:
+    """Merge the immutable values read by `read_immutable_values` into the permissions of a scanned contract."""
+    storage = scanned["storage"]
+    if storage is None:
+        return
+    # the implementation's immutables are named as in its code, the proxy's own ones as in the proxy
+    addresses = {i["name"]: i["address"].lower() for i in storage.get("immutables", [])}
+    for functionData in scanned["permissions"]["permissions"]["Functions"]:
+        for immutable in functionData.get("immutables_and_constants", []):
+            if not immutable.get("immutable") or immutable["name"] not in addresses:
+                continue
+            key = (addresses[immutable["name"]], immutable["name"])
+            if key in values:
+                immutable["value"] = values[key]
+
+
+def apply_storage_values(scanned: dict, values: Dict[Tuple[str, int], bytes], block: int) -> None:
+    """Merge the storage values read by `read_storage_values` into the permissions of a scanned contract."""
+    storage = scanned["storage"]
+    if storage is None:
+        return
+    address = storage["address"].lower()
+    temp_global = scanned["permissions"]
+    contractDict = temp_global["permissions"]
+    temp_global["Block_Number"] = block
+
+    # constants holding a slot, e.g. eip-1967 style admin slots, read as address
+    for functionData in contractDict["Functions"]:
+        for constant in functionData.get("immutables_and_constants", []):
+            slot = parse_slot(constant.get("slot", ""))
+            if slot is not None and (address, slot) in values:
+                constant["value"] = decode_storage_value(values[(address, slot)], 160, 0, "address")
+
+    storageValues = {}
+    # merge storage retrieval with contracts
+    for slot_info in storage["slots"]:
+        if (address, slot_info["slot"]) not in values:
+            continue
+        value = decode_storage_value(values[(address, slot_info["slot"])], slot_info["size"], slot_info["offset"], slot_info["type"])
+        storageValues[slot_info["name"]] = value
+        # contractDict["Functions"] is a list, functionData a dict
+        for functionData in contractDict["Functions"]:
+            # check if e.g storage variable owner is part of this function 
+            if slot_info["name"] in functionData["state_variables_read"]:
+                # if so, add a key value pair to the functionData object, to improve readability of report
+                functionData[slot_info["name"]] = value
+
+    if len(storageValues.values()):
+        contractDict["storage_values"] = storageValues
@@ -0,0 +1,240 @@
+"""
+History of the owner and admin slots of a scan between two blocks: every block where one of their values changed.
+Changes are found by bisection with batched historical eth_getStorageAt calls (requires an archive node),
+about log2(blocks) reads per change instead of one read per block.
+"""
+import os
+import sys
+import json
+import asyncio
+from argparse import ArgumentParser, Namespace
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from eth_utils import to_checksum_address
+from prettytable import PrettyTable
+
+from cache import DEFAULT_CACHE_DIR
+from get_rpc_url import get_rpc_url
+from incremental import DEFAULT_MANIFEST, load_json
+from rpc import JsonRpcClient, RpcError, decode_storage_value, get_block_number, DEFAULT_BATCH_SIZE, DEFAULT_CONCURRENCY
+from watch import load_watch_slots
+
+DEFAULT_TIMELINE = "timeline.json"
+DEFAULT_SAMPLES = 16  # evenly spaced reads before the bisection, to catch values changed and changed back
+
+SlotKey = Tuple[str, int]
+
+
+class ProbeCache:
+    """
+    Raw values of storage slots at past blocks, one JSON file per contract under `directory`/<chain>/.
+    The value of a slot at a past block never changes, so the probes of a run are reused by the next runs.
+    """
+
+    def __init__(self, directory: str, chain_name: str):
+        self.directory = os.path.join(directory, chain_name)
+        # lowercase address -> slot (hex) -> block (decimal) -> raw value
+        self._probes: Dict[str, Dict[str, Dict[str, str]]] = {}
+        self._changed = set()
+
+    def _path(self, address: str) -> str:
+        return os.path.join(self.directory, f"{address}.json")
+
+    def _contract(self, address: str) -> Dict[str, Dict[str, str]]:
+        if address not in self._probes:
+            try:
+                self._probes[address] = load_json(self._path(address))
+            except (OSError, ValueError):
+                self._probes[address] = {}
+        return self._probes[address]
+
+    def get(self, key: SlotKey, block: int) -> Optional[str]:
+        return self._contract(key[0]).get(hex(key[1]), {}).get(str(block))
+
+    def put(self, key: SlotKey, block: int, raw: str) -> None:
+        self._contract(key[0]).setdefault(hex(key[1]), {})[str(block)] = raw
+        self._changed.add(key[0])
+
+    def save(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        for address in self._changed:
+            tmp_path = f"{self._path(address)}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as file:
+                json.dump(self._probes[address], file)
+            os.replace(tmp_path, self._path(address))
+        self._changed = set()
+
+
+class SlotTimeline:
+    """
+    Finds the blocks between `start` and `end` where the raw value of storage slots changed.
+    The slots are first read at `samples` evenly spaced blocks. Then every round reads the middle block of all
+    intervals whose bounds differ, for all slots in one batch, and keeps the halves whose bounds still differ.
+    A value changed and changed back within an interval between two reads is not seen.
+    """
+
+    def __init__(self, rpc_url: str, probes: Optional[ProbeCache] = None, batch_size: int = DEFAULT_BATCH_SIZE, concurrency: int = DEFAULT_CONCURRENCY):
+        self.rpc_url = rpc_url
+        self.probes = probes
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.values: Dict[Tuple[SlotKey, int], str] = {}
+        self.reads = 0
+        self.rounds = 0
+
+    def changes(self, keys: List[SlotKey], start: int, end: int, samples: int = DEFAULT_SAMPLES) -> Dict[SlotKey, List[int]]:
+        """Blocks where each slot changed, in order. The value at a block is in `values`."""
+        return asyncio.run(self._changes(keys, start, end, samples))
+
+    async def _read(self, client: JsonRpcClient, points: List[Tuple[SlotKey, int]]) -> None:
+        missing = []
+        for key, block in dict.fromkeys(points):
+            if (key, block) in self.values:
+                continue
+            cached = self.probes.get(key, block) if self.probes is not None else None
+            if cached is not None:
+                self.values[(key, block)] = cached
+            else:
+                missing.append((key, block))
+        if not missing:
+            return
+
+        self.rounds += 1
+        self.reads += len(missing)
+        results = await client.batch([
+            ("eth_getStorageAt", [to_checksum_address(address), hex(slot), hex(block)])
+            for (address, slot), block in missing
+        ])
+        for (key, block), result in zip(missing, results):
+            if isinstance(result, Exception) or not isinstance(result, str):
+                raise RpcError(f"Failed to read slot {key[1]} of {key[0]} at block {block}, is the rpc an archive node? {result}")
+            raw = "0x" + result[2:].rjust(64, "0")
+            self.values[(key, block)] = raw
+            if self.probes is not None:
+                self.probes.put(key, block, raw)
+
+    async def _changes(self, keys: List[SlotKey], start: int, end: int, samples: int) -> Dict[SlotKey, List[int]]:
+        blocks = sorted({start, end} | {start + (end - start) * i // (samples + 1) for i in range(1, samples + 1)})
+        changes: Dict[SlotKey, List[int]] = {key: [] for key in keys}
+        try:
+            await self._bisect(keys, blocks, changes)
+        finally:
+            # keep what was read, also when a read failed
+            if self.probes is not None:
+                self.probes.save()
+        return {key: sorted(found) for key, found in changes.items()}
+
+    async def _bisect(self, keys: List[SlotKey], blocks: List[int], changes: Dict[SlotKey, List[int]]) -> None:
+        async with JsonRpcClient(self.rpc_url, self.batch_size, self.concurrency) as client:
+            await self._read(client, [(key, block) for key in keys for block in blocks])
+            intervals = [
+                (key, low, high)
+                for key in keys
+                for low, high in zip(blocks, blocks[1:])
+                if self.values[(key, low)] != self.values[(key, high)]
+            ]
+            while intervals:
+                pending = []
+                for key, low, high in intervals:
+                    if high == low + 1:
+                        changes[key].append(high)
+                    else:
+                        pending.append((key, low, high))
+                await self._read(client, [(key, (low + high) // 2) for key, low, high in pending])
+                intervals = []
+                for key, low, high in pending:
+                    middle = (low + high) // 2
+                    if self.values[(key, low)] != self.values[(key, middle)]:
+                        intervals.append((key, low, middle))
+                    if self.values[(key, middle)] != self.values[(key, high)]:
+                        intervals.append((key, middle, high))
+
+
+def _decode(raw: str, slot_info: dict):
+    return decode_storage_value(bytes.fromhex(raw[2:]), slot_info["size"], slot_info["offset"], slot_info["type"])
+
+
+def variable_history(slot_info: dict, timeline: SlotTimeline, changed_blocks: List[int], start: int, end: int) -> dict:
+    """Changes of one variable, from the changes of its slot: a packed variable only changes with some of them."""
+    key = (slot_info["address"].lower(), slot_info["slot"])
+    value = _decode(timeline.values[(key, start)], slot_info)
+    history = {
+        "address": slot_info["address"],
+        "contract": slot_info["contract"],
+        "name": slot_info["name"],
+        "slot": hex(slot_info["slot"]),
+        "type": slot_info["type"],
+        "value_at_start": value,
+        "value_at_end": _decode(timeline.values[(key, end)], slot_info),
+        "changes": [],
+    }
+    for block in changed_blocks:
+        new = _decode(timeline.values[(key, block)], slot_info)
+        if new != value:
+            history["changes"].append({"block": block, "old": value, "new": new})
+        value = new
+    return history
+
+
+def init_timeline_args(argv: Optional[List[str]] = None) -> Namespace:
+    parser = ArgumentParser(description="Find every block where the owner and admin slots found by a scan changed, between two blocks")
+    parser.add_argument("--manifest", help="Manifest written by the scan", default=DEFAULT_MANIFEST)
+    parser.add_argument("--permissions", help="permissions.json of the same scan, with the variables each function checks the caller against", default="permissions.json")
+    parser.add_argument("--rpc-url", help="RPC endpoint URL of an archive node, defaults to the one of the manifest's chain in .env")
+    parser.add_argument("--from-block", type=int, help="First block of the timeline", default=0)
+    parser.add_argument("--to-block", type=int, help="Last block of the timeline (default: the block of the scan, or latest with --latest)")
+    parser.add_argument("--latest", action="store_true", help="End the timeline at the latest block instead of the block of the scan")
+    parser.add_argument("--samples", type=int, help="Evenly spaced reads of every slot before the bisection, more catch more values changed and changed back", default=DEFAULT_SAMPLES)
+    parser.add_argument("--output", help="Where to write the history of every variable", default=DEFAULT_TIMELINE)
+    parser.add_argument("--cache-dir", help="Directory of the cache, the reads at past blocks are kept under timeline/", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--no-probe-cache", action="store_true", help="Do not reuse or keep the reads of previous timelines")
+    parser.add_argument("--rpc-batch-size", type=int, help="Number of storage reads per JSON-RPC batch request", default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--rpc-concurrency", type=int, help="Number of JSON-RPC batch requests in flight", default=DEFAULT_CONCURRENCY)
+    return parser.parse_args(argv)
+
+
+def print_timeline(histories: List[dict]) -> None:
+    table = PrettyTable()
+    table.field_names = ["Contract", "Variable", "Changes", "Last change", "Value at end"]
+    table.align = "l"
+    for history in histories:
+        last = history["changes"][-1]["block"] if history["changes"] else "-"
+        table.add_row([history["contract"], history["name"], len(history["changes"]), last, history["value_at_end"]])
+    print(table)
+
+
+def main(argv: Optional[List[str]] = None):
+    load_dotenv()
+    args = init_timeline_args(argv)
+
+    manifest = load_json(args.manifest)
+    permissions = load_json(args.permissions)
+    slots = load_watch_slots(manifest, permissions)
+    rpc_url = args.rpc_url or get_rpc_url(manifest["Chain_Name"])
+    end = args.to_block
+    if end is None:
+        end = get_block_number(rpc_url) if args.latest else manifest["Block_Number"]
+    if end < args.from_block:
+        raise ValueError(f"--to-block {end} is before --from-block {args.from_block}")
+
+    probes = None if args.no_probe_cache else ProbeCache(os.path.join(args.cache_dir, "timeline"), manifest["Chain_Name"])
+    timeline = SlotTimeline(rpc_url, probes, args.rpc_batch_size, args.rpc_concurrency)
+    # packed variables sharing a slot are bisected once
+    keys = list(dict.fromkeys((s["address"].lower(), s["slot"]) for s in slots))
+    print(f"Following {len(slots)} variables in {len(keys)} slots from block {args.from_block} to {end}", file=sys.stderr)
+    changes = timeline.changes(keys, args.from_block, end, args.samples)
+
+    histories = [
+        variable_history(slot_info, timeline, changes[(slot_info["address"].lower(), slot_info["slot"])], args.from_block, end)
+        for slot_info in slots
+    ]
+    with open(args.output, "w") as file:
+        json.dump({"Chain_Name": manifest["Chain_Name"], "From_Block": args.from_block, "To_Block": end, "Variables": histories}, file, indent=4)
+
+    print_timeline(histories)
+    print(f"{timeline.reads} storage reads in {timeline.rounds} rounds, wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
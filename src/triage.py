@@ -0,0 +1,82 @@
+"""
+Source level triage before the analysis. Access control is built from modifiers, conditions on msg.sender, or
+Ownable/AccessControl bases; a contract whose verified sources contain none of them cannot have permissioned
+functions, so it does not need to be compiled and analysed.
+"""
+import re
+import json
+from typing import Dict, List, Optional
+
+# comments and string literals can mention msg.sender or onlyOwner without using them
+COMMENTS = re.compile(r"//[^\n]*|/\*.*?\*/", re.DOTALL)
+STRINGS = re.compile(r'"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'')
+
+# patterns of access control, a contract without any of them is skipped
+PATTERNS = {
+    "modifier": re.compile(r"\bmodifier\s+\w+"),
+    "msg.sender condition": re.compile(r"\b(?:require|assert|if)\s*\([^;{]*?\b(?:msg\.sender|_msgSender\s*\(\s*\))", re.DOTALL),
+    "onlyOwner": re.compile(r"\bonlyOwner\b"),
+    "onlyRole": re.compile(r"\bonlyRole\b|\bhasRole\s*\(|\b_checkRole\s*\("),
+    "Ownable": re.compile(r"\bis\s+[^{;]*\bOwnable\w*"),
+    "AccessControl": re.compile(r"\bis\s+[^{;]*\bAccessControl\w*"),
+}
+
+SKIPPED = "skipped, no access control pattern in the sources"
+
+
+def source_files(contract_info: dict) -> Dict[str, str]:
+    """Solidity files of a getsourcecode result: a single file, or the sources of a standard json input."""
+    source_code = contract_info.get("SourceCode") or ""
+    # etherscan might return standard json input with two curly braces, {{ content }}, or the sources with one
+    for candidate in [source_code[1:-1], source_code]:
+        try:
+            sources = json.loads(candidate)
+        except ValueError:
+            continue
+        if isinstance(sources, dict):
+            sources = sources.get("sources", sources)
+            return {path: entry.get("content") or "" for path, entry in sources.items() if isinstance(entry, dict)}
+    return {f"{contract_info.get('ContractName') or 'Contract'}.sol": source_code}
+
+
+def find_patterns(source: str) -> List[str]:
+    code = STRINGS.sub('""', COMMENTS.sub(" ", source))
+    return [name for name, pattern in PATTERNS.items() if pattern.search(code)]
+
+
+def triage_contract(contract_infos: List[Optional[dict]]) -> dict:
+    """
+    Decision for one address from its sources, and those of its implementation for proxies (None if not fetched).
+    `candidate` is False only if every source is available and none has an access control pattern,
+    `patterns` lists the patterns found per file.
+    """
+    patterns = {}
+    for info in contract_infos:
+        for path, source in (source_files(info) if info else {}).items():
+            found = find_patterns(source)
+            if found:
+                patterns[path] = found
+    # without the sources there is nothing to look at, the analysis reports what is wrong
+    verified = all(info and info.get("SourceCode") for info in contract_infos)
+    return {"candidate": bool(patterns) or not verified, "patterns": patterns}
+
+
+def skipped_record(contract_address: str, contract_info: dict, implementation_address: Optional[str] = None, implementation_info: Optional[dict] = None) -> dict:
+    """Scan result of a contract skipped by the triage: what the analysis finds, no permissioned functions and nothing to read."""
+    contract_name = contract_info.get("ContractName") or ""
+    scanned = {"name": contract_name, "contracts": [{"name": contract_name, "address": contract_address}]}
+    if implementation_address and implementation_info is not None:
+        implementation_name = implementation_info.get("ContractName") or ""
+        scanned["name"] = implementation_name or contract_name
+        scanned["contracts"].append({"name": implementation_name, "address": implementation_address})
+        scanned["permissions"] = {
+            "Implementation_Address": implementation_address,
+            "Proxy_Address": contract_address,
+            "proxy_permissions": {"Contract_Name": contract_name, "Functions": []},
+            "permissions": {"Contract_Name": implementation_name, "Functions": []},
+        }
+    else:
+        scanned["permissions"] = {"Address": contract_address, "permissions": {"Contract_Name": contract_name, "Functions": []}}
+    scanned["permissions"]["Triage"] = SKIPPED
+    scanned["storage"] = {"address": contract_address, "slots": [], "immutables": []}
+    return scanned
@@ -0,0 +1,158 @@
+import sys
+import json
+import time
+import asyncio
+from argparse import ArgumentParser, Namespace
+from typing import Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from eth_utils import to_checksum_address
+
+from get_rpc_url import get_rpc_url
+from incremental import DEFAULT_MANIFEST, load_json
+from owners import caller_variables
+from rpc import JsonRpcClient, RpcError, parse_slot, decode_storage_value, DEFAULT_BATCH_SIZE, DEFAULT_CONCURRENCY
+
+DEFAULT_INTERVAL = 2.0  # seconds between two eth_blockNumber polls
+
+
+def load_watch_slots(manifest: dict, permissions: dict) -> List[dict]:
+    """
+    Slots holding owners, admins and roles: the variables permissioned functions check the caller against
+    (`caller_variables`), from the storage layout of a scan manifest and the permissions.json of the same scan.
+    Constants holding a slot (e.g. EIP-1967 admin) are watched as well.
+    """
+    slots = []
+    for address, entry in manifest["Contracts"].items():
+        storage = entry.get("storage")
+        if not storage or entry["name"] not in permissions:
+            continue
+        functions = [
+            function
+            for key in ["proxy_permissions", "permissions"]
+            for function in permissions[entry["name"]].get(key, {}).get("Functions", [])
+        ]
+        owner_variables = {var for function in functions for var in caller_variables(function)}
+        for slot_info in storage["slots"]:
+            if slot_info["name"] in owner_variables:
+                slots.append({"address": storage["address"], "contract": entry["name"], **slot_info})
+
+        constants = {}
+        for function in functions:
+            for constant in function.get("immutables_and_constants", []):
+                slot = parse_slot(constant.get("slot", ""))
+                if slot is not None:
+                    constants[constant["name"]] = slot
+        for name, slot in constants.items():
+            slots.append({"address": storage["address"], "contract": entry["name"], "name": name, "slot": slot, "size": 160, "offset": 0, "type": "address"})
+    return slots
+
+
+class SlotWatcher:
+    """
+    Polls a set of storage slots at new blocks with batched eth_getStorageAt calls
+    and calls `emit` with an event whenever a decoded value changes.
+    Packed variables sharing a slot are read once.
+    """
+
+    def __init__(self, rpc_url: str, slots: List[dict], emit: Callable[[dict], None], every: int = 1, interval: float = DEFAULT_INTERVAL,
+                 batch_size: int = DEFAULT_BATCH_SIZE, concurrency: int = DEFAULT_CONCURRENCY):
+        self.rpc_url = rpc_url
+        self.slots = slots
+        self.emit = emit
+        self.every = every
+        self.interval = interval
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.values: Dict[Tuple[str, str], object] = {}
+        self.last_block: Optional[int] = None
+        # (address, slot) -> variables stored in it
+        self._by_slot: Dict[Tuple[str, int], List[dict]] = {}
+        for slot_info in slots:
+            self._by_slot.setdefault((slot_info["address"].lower(), slot_info["slot"]), []).append(slot_info)
+
+    async def run(self, max_polls: Optional[int] = None) -> None:
+        polls = 0
+        async with JsonRpcClient(self.rpc_url, self.batch_size, self.concurrency) as client:
+            while max_polls is None or polls < max_polls:
+                polls += 1
+                try:
+                    head = int(await client.call("eth_blockNumber", []), 16)
+                    if self.last_block is None or head >= self.last_block + self.every:
+                        await self.poll(client, head)
+                except RpcError as e:
+                    print(f"\033[33mFailed to poll the rpc: {e}\033[0m", file=sys.stderr)
+                if max_polls is None or polls < max_polls:
+                    await asyncio.sleep(self.interval)
+
+    async def poll(self, client: JsonRpcClient, block: int) -> None:
+        keys = list(self._by_slot)
+        results = await client.batch([
+            ("eth_getStorageAt", [to_checksum_address(address), hex(slot), hex(block)])
+            for address, slot in keys
+        ])
+        for key, result in zip(keys, results):
+            if isinstance(result, Exception) or not isinstance(result, str):
+                continue
+            raw = bytes.fromhex(result[2:].rjust(64, "0"))
+            for slot_info in self._by_slot[key]:
+                value = decode_storage_value(raw, slot_info["size"], slot_info["offset"], slot_info["type"])
+                value_key = (key[0], slot_info["name"])
+                # the first poll only sets the baseline
+                if value_key in self.values and self.values[value_key] != value:
+                    self.emit({
+                        "block": block,
+                        "timestamp": int(time.time()),
+                        "address": slot_info["address"],
+                        "contract": slot_info["contract"],
+                        "name": slot_info["name"],
+                        "slot": hex(slot_info["slot"]),
+                        "old": self.values[value_key],
+                        "new": value,
+                    })
+                self.values[value_key] = value
+        self.last_block = block
+
+
+def init_watch_args(argv: Optional[List[str]] = None) -> Namespace:
+    parser = ArgumentParser(description="Watch the storage slots of permission owners found by a scan, and report every change")
+    parser.add_argument("--manifest", help="Manifest written by the scan", default=DEFAULT_MANIFEST)
+    parser.add_argument("--permissions", help="permissions.json of the same scan, with the variables each function checks the caller against", default="permissions.json")
+    parser.add_argument("--rpc-url", help="RPC endpoint URL, defaults to the one of the manifest's chain in .env")
+    parser.add_argument("--every", type=int, help="Read the slots every N blocks", default=1)
+    parser.add_argument("--interval", type=float, help="Seconds between two polls of the latest block", default=DEFAULT_INTERVAL)
+    parser.add_argument("--output", help="Append events to this JSONL file instead of stdout")
+    parser.add_argument("--rpc-batch-size", type=int, help="Number of storage reads per JSON-RPC batch request", default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--rpc-concurrency", type=int, help="Number of JSON-RPC batch requests in flight", default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--max-polls", type=int, help="Stop after N polls (default: run forever)", default=None)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    load_dotenv()
+    args = init_watch_args(argv)
+
+    manifest = load_json(args.manifest)
+    permissions = load_json(args.permissions)
+    slots = load_watch_slots(manifest, permissions)
+    rpc_url = args.rpc_url or get_rpc_url(manifest["Chain_Name"])
+
+    output = open(args.output, "a") if args.output else sys.stdout
+
+    def emit(event: dict) -> None:
+        output.write(json.dumps(event) + "\n")
+        output.flush()
+
+    print(f"Watching {len(slots)} variables of {len(manifest['Contracts'])} contracts", file=sys.stderr)
+    watcher = SlotWatcher(rpc_url, slots, emit, args.every, args.interval, args.rpc_batch_size, args.rpc_concurrency)
+    try:
+        asyncio.run(watcher.run(args.max_polls))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()